@@ -1,13 +1,14 @@
+import os
+import time
 import streamlit as st
-from ui.geometry import geometry_section
-from ui.clearance import clearance_section
-from ui.effectiveness import effectiveness_section
-from ui.ml import fouling_prediction_section
-from ui.summary import summary_section
 from utils.session import init_session_state
-import base64
+from utils.metrics import begin_rerun, end_rerun, observe, timed
+
+# Section modules (and through them ht, pandas, ReportLab, joblib/xgboost)
+# are imported when their page is first shown, not at startup.
 
 st.set_page_config(page_title="Suite de Conception d'Échangeur de Chaleur", layout="wide")
+begin_rerun()
 
 # --- CUSTOM GRADIENT BACKGROUND ---
 gradient_css = '''
@@ -40,7 +41,31 @@ with st.sidebar:
     )
     # Button under the navigation options
     run_all = st.button("🚀 Calculer tout")
+    if run_all:
+        from utils.pipeline import run_pipeline
+        # Only the stages whose inputs changed since the last run are recomputed.
+        with timed("pipeline"):
+            timings = run_pipeline(st.session_state)
+        for t in timings:
+            if t["error"]:
+                st.error(f"{t['stage']} : {t['error']}")
+    if st.session_state.pipeline_timings:
+        with st.expander("⏱️ Dernier calcul complet", expanded=False):
+            st.dataframe(st.session_state.pipeline_timings, hide_index=True)
+            from utils.result_store import store_stats
+            stats = store_stats()
+            st.caption(
+                f"Stockage des résultats : {stats['hits']} trouvés, {stats['misses']} calculés "
+                f"({stats['hit_rate']:.0%}), {stats['rows'] or 0} entrées"
+            )
+            from utils.prediction_cache import cache_stats
+            stats = cache_stats()
+            st.caption(
+                f"Cache des prédictions : {stats['hits']} trouvées, {stats['misses']} calculées "
+                f"({stats['hit_rate']:.0%}), {stats['size']}/{stats['capacity']} entrées"
+            )
 
+page_start = time.perf_counter()
 if selection == "Accueil":
     st.markdown("""
     <style>
@@ -138,15 +163,21 @@ if selection == "Accueil":
     </div>
     """, unsafe_allow_html=True)
 elif selection == "Géométrie":
+    from ui.geometry import geometry_section
     geometry_section(run_all)
 elif selection == "Jeu Calandre":
+    from ui.clearance import clearance_section
     clearance_section(run_all)
 elif selection == "Efficacité":
+    from ui.effectiveness import effectiveness_section
     effectiveness_section(run_all)
 elif selection == "Prédiction ML":
-    fouling_prediction_section()
+    from ui.ml import fouling_prediction_section
+    fouling_prediction_section(run_all)
 elif selection == "Résumé":
+    from ui.summary import summary_section
     summary_section(run_all)
+observe(f"page.{selection}", time.perf_counter() - page_start)
 
 # --- FOOTER ---
 footer = '''
@@ -156,3 +187,16 @@ footer = '''
 <div class="footer">Version 1.0.0 | © 2025 HX_Project | Made with Streamlit</div>
 '''
 st.markdown(footer, unsafe_allow_html=True)
+
+# Models are loaded once per process and shared by every session. Loading
+# starts in the background after the first page has been sent, so neither
+# startup nor the home page waits for joblib/xgboost.
+if os.environ.get("HX_WARM_UP", "1") != "0":
+    from utils.models import warm_up_async
+    warm_up_async()
+
+record = end_rerun(selection)
+# Developer profiling panel: HX_DEV=1 or ?dev=1 in the URL.
+if os.environ.get("HX_DEV") == "1" or st.query_params.get("dev") == "1":
+    from ui.profiling import profiling_panel
+    profiling_panel(record)
@@ -0,0 +1,401 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+# Concurrent-session load test of one Streamlit worker. A real
+# `streamlit run app.py` server is started once; each simulated user is a
+# websocket client speaking Streamlit's protocol, as the browser does: it
+# picks pages in the sidebar menu, fills and submits the forms, runs
+# "Calculer tout" and downloads the summary PDF. All sessions of a level
+# start together. For each session count it reports step latency
+# percentiles, throughput and the RSS of the server process, so the model
+# registry, caches and GIL are shared exactly as in production.
+#
+#   python benchmarks/load_test.py --sessions 1 2 4 8 --journeys 3
+#
+# The clients run in this process (one event loop); they only parse
+# protobufs, but on a small machine they share the CPU with the server.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STEPS = ["geometry", "clearance", "effectiveness", "ml", "summary", "pdf"]
+STARTUP_TIMEOUT_S = 120.0
+# Upper bound on one rerun or download; a dead server is reported as soon
+# as its process exits.
+STEP_TIMEOUT_S = 600.0
+POLL_S = 0.5
+RSS_SAMPLE_S = 0.2
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_bytes(pid: int) -> int | None:
+    # Resident set of the server process (Linux /proc; None elsewhere).
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])*1024
+    except OSError:
+        pass
+    return None
+
+
+class Server:
+    def __init__(self, port: int):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        # A file rather than a pipe: nobody reads the log while the server runs.
+        self.log = tempfile.TemporaryFile("w+", encoding="utf-8")
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", os.path.join(ROOT, "app.py"),
+             "--server.headless", "true", "--server.port", str(port),
+             "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false",
+             "--logger.level", "error"],
+            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=self.log,
+        )
+
+    def check(self) -> None:
+        code = self.proc.poll()
+        if code is not None:
+            self.log.seek(0)
+            raise RuntimeError(f"Serveur arrêté (code {code}) : {self.log.read()[-2000:].strip()}")
+
+    def wait_ready(self, timeout: float = STARTUP_TIMEOUT_S) -> None:
+        deadline = time.monotonic() + timeout
+        while True:
+            self.check()
+            try:
+                with urllib.request.urlopen(f"{self.url}/_stcore/health", timeout=POLL_S) as r:
+                    if r.read() == b"ok":
+                        return
+            except OSError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Serveur non prêt après {timeout:.0f} s")
+            time.sleep(POLL_S)
+
+    def rss(self) -> int | None:
+        return _rss_bytes(self.proc.pid)
+
+    def stop(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+        self.log.close()
+
+
+class Session:
+    # One browser tab. Widget values persist across reruns, as in the
+    # browser; button triggers are sent with a single rerun.
+
+    def __init__(self, server: Server):
+        self.server = server
+        self.ws = None
+        self.session_id = ""
+        self.values: dict[str, object] = {}
+        self.elements: list[tuple[str, object]] = []
+        self.requests = 0
+
+    async def __aenter__(self):
+        import websockets
+        self.ws = await websockets.connect(
+            f"ws://127.0.0.1:{self.server.port}/_stcore/stream",
+            subprotocols=["streamlit"], max_size=None,
+        )
+        await self.rerun()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.ws.close()
+
+    async def _receive(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        deadline = time.monotonic() + STEP_TIMEOUT_S
+        while True:
+            self.server.check()
+            try:
+                data = await asyncio.wait_for(self.ws.recv(), POLL_S)
+            except asyncio.TimeoutError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"Pas de réponse du serveur après {STEP_TIMEOUT_S:.0f} s")
+                continue
+            msg = ForwardMsg()
+            msg.ParseFromString(data)
+            return msg
+
+    async def rerun(self, *triggers) -> None:
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        back = BackMsg()
+        back.rerun_script.SetInParent()
+        states = back.rerun_script.widget_states.widgets
+        for wid, value in self.values.items():
+            state = WidgetState(id=wid)
+            kind, value = value
+            if kind == "json_value":
+                state.json_value = value
+            elif kind == "double_array_value":
+                state.double_array_value.data.extend(value)
+            else:
+                setattr(state, kind, value)
+            states.append(state)
+        for wid in triggers:
+            states.append(WidgetState(id=wid, trigger_value=True))
+        await self.ws.send(back.SerializeToString())
+        elements = []
+        while True:
+            msg = await self._receive()
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":
+                self.session_id = msg.new_session.initialize.session_id
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element = msg.delta.new_element
+                elements.append((element.WhichOneof("type"), getattr(element, element.WhichOneof("type"))))
+            elif kind == "script_finished":
+                break
+        errors = [e.message for k, e in elements if k == "exception"]
+        if errors:
+            raise RuntimeError(errors[0])
+        self.elements = elements
+
+    def widget(self, kind: str, label: str, index: int = 0):
+        return [e for k, e in self.elements if k == kind and e.label == label][index]
+
+    def set(self, kind: str, label: str, value) -> None:
+        element = self.widget(kind, label)
+        if kind == "slider":
+            self.values[element.id] = ("double_array_value", [float(value)])
+        elif kind == "number_input" and element.data_type == element.INT:
+            self.values[element.id] = ("int_value", int(value))
+        else:
+            self.values[element.id] = ("double_value", float(value))
+
+    async def click(self, label: str, index: int = 0) -> None:
+        await self.rerun(self.widget("button", label, index).id)
+
+    async def page(self, name: str) -> None:
+        menu = next(e for k, e in self.elements if k == "component_instance")
+        self.values[menu.id] = ("json_value", json.dumps(name))
+        await self.rerun()
+
+    async def download(self, label: str) -> int:
+        # The browser asks the server to run the deferred callable, then
+        # fetches the file from the returned media URL.
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        button = self.widget("download_button", label)
+        self.requests += 1
+        back = BackMsg()
+        request = back.backend_operation_request
+        request.request_id = str(self.requests)
+        request.session_id = self.session_id
+        request.deferred_file.file_id = button.deferred_file_id
+        await self.ws.send(back.SerializeToString())
+        while True:
+            msg = await self._receive()
+            if msg.WhichOneof("type") == "backend_operation_response":
+                response = msg.backend_operation_response
+                if response.request_id == request.request_id:
+                    break
+        if response.error_msg:
+            raise RuntimeError(response.error_msg)
+        url = response.deferred_file.url
+        if url.startswith("/"):
+            url = self.server.url + url
+
+        def fetch():
+            with urllib.request.urlopen(url, timeout=STEP_TIMEOUT_S) as r:
+                return len(r.read())
+
+        return await asyncio.to_thread(fetch)
+
+
+async def run_journey(session: Session, rng: random.Random, record) -> None:
+    async def step(name, page, *actions):
+        start = time.perf_counter()
+        await session.page(page)
+        for action in actions:
+            await action()
+        record(name, time.perf_counter() - start)
+
+    async def geometry():
+        # Different users size different bundles.
+        session.set("slider", "Nombre de tubes", rng.randint(100, 2000))
+        await session.click("Calculer géométrie")
+
+    async def effectiveness():
+        # Basic and TEMA E tabs, then the P-NTU solver (last "Calculer").
+        for index in (0, 1, -1):
+            await session.click("Calculer", index)
+
+    async def ml():
+        session.set("number_input", "Heures depuis dernier nettoyage", rng.randint(0, 20_000))
+        await session.click("🔍 Prédire")
+
+    await step("geometry", "Géométrie", geometry)
+    await step("clearance", "Jeu Calandre", lambda: session.click("Calculer jeu"))
+    await step("effectiveness", "Efficacité", effectiveness)
+    await step("ml", "Prédiction ML", ml)
+    await step("summary", "Résumé", lambda: session.click("🚀 Calculer tout"))
+    start = time.perf_counter()
+    if not await session.download("📄 Télécharger le PDF du Résumé"):
+        raise RuntimeError("PDF vide")
+    record("pdf", time.perf_counter() - start)
+
+
+async def session_task(server: Server, index: int, journeys: int, seed: int,
+                       connected: list, go: asyncio.Event) -> dict:
+    # One simulated user: connects (first render of "Accueil"), waits for
+    # the level to start, then runs its journeys.
+    rng = random.Random(seed*1000 + index)
+    latencies: dict[str, list[float]] = {s: [] for s in STEPS}
+    errors = []
+    async with Session(server) as session:
+        connected.append(index)
+        await go.wait()
+        start = time.perf_counter()
+        for _ in range(journeys):
+            try:
+                await run_journey(session, rng, lambda name, seconds: latencies[name].append(seconds))
+            except Exception as e:
+                server.check()
+                errors.append(f"{type(e).__name__}: {e}")
+                # A fresh page, as a user reloading the tab.
+                await session.page("Accueil")
+        return {"latencies": latencies, "errors": errors, "seconds": time.perf_counter() - start}
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    k = (len(values) - 1)*q
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo])*(k - lo)
+
+
+async def _level(server: Server, sessions: int, journeys: int, seed: int) -> tuple[list[dict], float, list[int]]:
+    connected = []
+    go = asyncio.Event()
+    tasks = [asyncio.create_task(session_task(server, i, journeys, seed, connected, go))
+             for i in range(sessions)]
+    rss = []
+
+    async def sample():
+        while True:
+            value = server.rss()
+            if value is not None:
+                rss.append(value)
+            await asyncio.sleep(RSS_SAMPLE_S)
+
+    # The level starts once every session is connected and has rendered its
+    # first page (or one of them failed to).
+    while len(connected) < sessions and not any(t.done() for t in tasks):
+        server.check()
+        await asyncio.sleep(0.05)
+    go.set()
+    sampler = asyncio.create_task(sample())
+    start = time.perf_counter()
+    try:
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        sampler.cancel()
+    for i, outcome in enumerate(outcomes):
+        if isinstance(outcome, BaseException):
+            raise RuntimeError(f"Session {i} interrompue : {type(outcome).__name__}: {outcome}")
+    return outcomes, time.perf_counter() - start, rss
+
+
+def run_level(server: Server, sessions: int, journeys: int, seed: int) -> dict:
+    rss_start = server.rss()
+    outcomes, elapsed, rss = asyncio.run(_level(server, sessions, journeys, seed))
+    latencies = {s: [v for o in outcomes for v in o["latencies"][s]] for s in STEPS}
+    all_steps = [v for s in STEPS for v in latencies[s]]
+    done = len(latencies["pdf"])
+    rss_peak = max(rss, default=rss_start or 0)
+    return {
+        "sessions": sessions,
+        "journeys": done,
+        "errors": [e for o in outcomes for e in o["errors"]],
+        "seconds": elapsed,
+        "journeys_per_s": done/elapsed if elapsed > 0 else 0.0,
+        "steps_per_s": len(all_steps)/elapsed if elapsed > 0 else 0.0,
+        "latency_s": {
+            name: {
+                "p50": percentile(values, 0.50),
+                "p90": percentile(values, 0.90),
+                "p99": percentile(values, 0.99),
+                "max": max(values) if values else float("nan"),
+            }
+            for name, values in [*latencies.items(), ("all", all_steps)]
+        },
+        "rss_start_mb": (rss_start or 0)/2**20,
+        "rss_peak_mb": rss_peak/2**20,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Test de charge multi-sessions d'un serveur Streamlit.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--journeys", type=int, default=3, help="Parcours par session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=None, help="Port du serveur (libre par défaut)")
+    parser.add_argument("--json", default=None, help="Écrit les résultats dans ce fichier")
+    args = parser.parse_args(argv)
+
+    server = Server(args.port or _free_port())
+    levels = []
+    try:
+        server.wait_ready()
+        # One untimed journey warms the server (imports, models, caches).
+        warm = run_level(server, 1, 1, args.seed + 1)
+        if warm["errors"]:
+            print(f"Préchauffage : {warm['errors'][0]}")
+        print(f"Serveur prêt (pid {server.proc.pid}), RSS après préchauffage {warm['rss_peak_mb']:.0f} Mo")
+        for n in args.sessions:
+            r = run_level(server, n, args.journeys, args.seed)
+            levels.append(r)
+            lat = r["latency_s"]
+            print(f"\n{n} session(s) : {r['journeys']} parcours en {r['seconds']:.1f} s, "
+                  f"{r['journeys_per_s']:.2f} parcours/s, {r['steps_per_s']:.1f} étapes/s, "
+                  f"RSS du serveur {r['rss_start_mb']:.0f} → {r['rss_peak_mb']:.0f} Mo")
+            for name in [*STEPS, "all"]:
+                q = lat[name]
+                print(f"  {name:14s} p50 {q['p50']*1000:8.0f} ms   p90 {q['p90']*1000:8.0f} ms   "
+                      f"p99 {q['p99']*1000:8.0f} ms   max {q['max']*1000:8.0f} ms")
+            if r["errors"]:
+                print(f"  {len(r['errors'])} erreur(s), ex. {r['errors'][0]}")
+    except RuntimeError as e:
+        print(f"\n{e}")
+        return 1
+    finally:
+        server.stop()
+
+    if levels:
+        print("\nsessions  parcours/s  p50 (ms)  p90 (ms)  RSS max (Mo)")
+        for r in levels:
+            q = r["latency_s"]["all"]
+            print(f"{r['sessions']:8d}  {r['journeys_per_s']:10.2f}  {q['p50']*1000:8.0f}  "
+                  f"{q['p90']*1000:8.0f}  {r['rss_peak_mb']:12.0f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"cpu_count": os.cpu_count(), "levels": levels}, f, indent=1)
+    return 1 if any(r["errors"] for r in levels) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Sustained-rate check of the live fouling monitor: a writer thread appends
+# sensor rows to a CSV file at --rate rows/s while utils.monitor tails and
+# scores it. Reports the scoring lag, the monitor's capacity and the RSS over
+# time; fails if the monitor falls behind or memory keeps growing.
+#
+#   python benchmarks/monitor.py --rate 1000 --seconds 60
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+TICK_S = 0.01
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1])*os.sysconf("SC_PAGE_SIZE")/2**20
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Débit soutenu de la surveillance en continu.")
+    parser.add_argument("--rate", type=int, default=1000, help="Lignes écrites par seconde")
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--window", type=int, default=None)
+    parser.add_argument("--json", default=None)
+    args = parser.parse_args(argv)
+
+    import numpy as np
+    from utils.calc import ML_DEFAULTS
+    from utils.models import FEATURE_COLUMNS, get_models
+    from utils.monitor import POLL_S, WINDOW_ROWS, Monitor
+    get_models()
+
+    fd, path = tempfile.mkstemp(prefix="hx_capteurs_", suffix=".csv")
+    os.close(fd)
+    rng = np.random.default_rng(0)
+    base = np.array([float(ML_DEFAULTS[c]) for c in FEATURE_COLUMNS])
+    with open(path, "w") as f:
+        f.write(",".join(FEATURE_COLUMNS) + "\n")
+
+    written = 0
+    stop = threading.Event()
+
+    def writer():
+        nonlocal written
+        start = time.perf_counter()
+        with open(path, "a") as f:
+            while not stop.is_set():
+                due = int((time.perf_counter() - start)*args.rate) - written
+                if due > 0:
+                    rows = base*(1 + 0.05*rng.standard_normal((due, len(base))))
+                    f.write("\n".join(",".join(f"{v:.4f}" for v in r) for r in rows) + "\n")
+                    f.flush()
+                    written += due
+                time.sleep(TICK_S)
+
+    monitor = Monitor(path, args.window or WINDOW_ROWS)
+    samples = []
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    monitor.start()
+    start = time.perf_counter()
+    try:
+        while time.perf_counter() - start < args.seconds:
+            time.sleep(1.0)
+            samples.append({"t": time.perf_counter() - start, "written": written,
+                            "scored": monitor.rows, "rss_mb": _rss_mb()})
+            s = samples[-1]
+            print(f"{s['t']:6.1f} s  écrites {s['written']:>9,}  prédites {s['scored']:>9,}  RSS {s['rss_mb']:6.1f} Mo")
+    finally:
+        stop.set()
+        thread.join()
+        time.sleep(2*POLL_S)
+        monitor.stop()
+        os.remove(path)
+
+    stats = monitor.stats()
+    lag = written - stats["rows"]
+    # Memory after the first quarter of the run (imports, model, window
+    # filled) must not keep growing.
+    settled = samples[len(samples)//4:] or samples
+    growth = settled[-1]["rss_mb"] - settled[0]["rss_mb"]
+    ok = lag <= args.rate and stats["errors"] == 0 and growth < 20
+    result = {
+        "rate": args.rate, "seconds": args.seconds, "written": written, "scored": stats["rows"],
+        "lag_rows": lag, "capacity_rows_per_s": stats["capacity_rows_per_s"],
+        "rss_growth_mb": growth, "samples": samples, "ok": ok,
+    }
+    print(f"\nCapacité : {stats['capacity_rows_per_s']:,.0f} lignes/s, retard final {lag:,} lignes, "
+          f"RSS +{growth:.1f} Mo après stabilisation -> {'OK' if ok else 'ÉCHEC'}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=1)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Fused fouling + TTC inference (utils.models.predict_fouling_ttc) against
+# the previous path, two XGBRegressor.predict() calls on a DataFrame, for
+# 1 row (interactive prediction), 1k rows and 1M rows (batch scoring).
+# Also times loading the pickles against the native UBJSON/JSON exports.
+#
+#   python benchmarks/predict.py                 # 1, 1 000 and 1 000 000 rows
+#   python benchmarks/predict.py --rows 1 1000 --json predict.json
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+ROWS = (1, 1_000, 1_000_000)
+MIN_TIME_S = 1.0
+
+
+def best_time(fn, min_time: float = MIN_TIME_S, repeats: int = 3) -> float:
+    # Best over `repeats` of the mean time of a loop lasting at least min_time.
+    fn()
+    best = float("inf")
+    for _ in range(repeats):
+        loops, start = 0, time.perf_counter()
+        while True:
+            fn()
+            loops += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = min(best, elapsed/loops)
+    return best
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Latence et débit de la prédiction fusionnée.")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(ROWS))
+    parser.add_argument("--min-time", type=float, default=MIN_TIME_S)
+    parser.add_argument("--json", default=None)
+    args = parser.parse_args(argv)
+
+    import numpy as np
+    import pandas as pd
+    from utils.calc import ML_DEFAULTS
+    from utils.models import (
+        FEATURE_COLUMNS, MODEL_FILES, NATIVE_FORMATS, export_native, get_models, load_model_file, model_path,
+        predict_fouling_ttc,
+    )
+    m_foul, m_ttc = get_models()
+    rng = np.random.default_rng(0)
+    base = np.array([ML_DEFAULTS[c] for c in FEATURE_COLUMNS])
+    results = {"predict": [], "load": []}
+
+    print(f"{'lignes':>10}  {'actuel':>12}  {'fusionné':>12}  {'gain':>6}  {'débit fusionné':>18}")
+    for n in args.rows:
+        X = pd.DataFrame(base*rng.uniform(0.8, 1.2, (n, len(base))), columns=FEATURE_COLUMNS)
+
+        def current():
+            features = X[FEATURE_COLUMNS].astype(np.float32)
+            return m_foul.predict(features), np.maximum(m_ttc.predict(features), 0)
+
+        a, b = current(), predict_fouling_ttc(X, m_foul, m_ttc)
+        if not (np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1])):
+            print("Les deux chemins ne donnent pas les mêmes prédictions.")
+            return 1
+        t_current = best_time(current, args.min_time)
+        t_fused = best_time(lambda: predict_fouling_ttc(X, m_foul, m_ttc), args.min_time)
+        results["predict"].append({"rows": n, "current_s": t_current, "fused_s": t_fused,
+                                   "speedup": t_current/t_fused, "fused_rows_per_s": n/t_fused})
+        print(f"{n:>10,}  {t_current*1e3:>9.3f} ms  {t_fused*1e3:>9.3f} ms  {t_current/t_fused:>5.2f}x  "
+              f"{n/t_fused:>12,.0f} l/s")
+
+    with tempfile.TemporaryDirectory(prefix="hx_native_") as tmp:
+        for fmt in NATIVE_FORMATS:
+            export_native(tmp, fmt, (m_foul, m_ttc))
+        print(f"\n{'modèle':>8}  {'format':>6}  {'taille':>10}  {'chargement':>11}")
+        for name in MODEL_FILES:
+            for fmt, path in [("pickle", model_path(name))] + [
+                    (fmt, os.path.join(tmp, f"model_{name}.{fmt}")) for fmt in NATIVE_FORMATS]:
+                t = best_time(lambda: load_model_file(path), args.min_time/4)
+                results["load"].append({"model": name, "format": fmt, "bytes": os.path.getsize(path), "load_s": t})
+                print(f"{name:>8}  {fmt:>6}  {os.path.getsize(path)/1e6:>7.2f} Mo  {t*1e3:>8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
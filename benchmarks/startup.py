@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Cold-start benchmark for app.py: each sample is a fresh interpreter that
+# renders the home page once through Streamlit's AppTest. Reports the
+# wall-clock time of that first render, an `-X importtime` breakdown of the
+# modules it imported, and fails when the budget is exceeded.
+#
+#   python benchmarks/startup.py [--runs 5] [--budget-s 1.5] [--json out.json]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+MARKER = "--- first render ---"
+RENDER_BUDGET_S = 1.5
+# Heavy dependencies that only some pages need; none may load on "Accueil".
+DEFERRED_MODULES = ["ht", "scipy", "reportlab", "joblib", "xgboost", "plotly", "matplotlib"]
+
+
+def _child() -> None:
+    # The Streamlit harness is imported before the marker so that only the
+    # app's own imports are attributed to the first render.
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP, default_timeout=120)
+    before = set(sys.modules)
+    print(MARKER, file=sys.stderr, flush=True)
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    loaded = sorted({m.split(".")[0] for m in set(sys.modules) - before})
+    print(json.dumps({
+        "render_s": elapsed,
+        "exceptions": [str(e.value) for e in at.exception],
+        "modules": loaded,
+    }))
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    # Top-level imports only (no indentation in the package column), after
+    # the marker. Values in the trace are microseconds.
+    lines = stderr.split(MARKER, 1)[-1].splitlines()
+    rows = []
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        head, cumulative_us, name = line.split("|")
+        self_us = head.split(":")[1]
+        # Nested imports are indented under their parent.
+        if name.startswith("  ") or not self_us.strip().isdigit():
+            continue
+        rows.append({"module": name.strip(), "self_ms": int(self_us)/1000, "cumulative_ms": int(cumulative_us)/1000})
+    return sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)
+
+
+def sample() -> tuple[dict, list[dict], float]:
+    env = dict(os.environ, HX_WARM_UP="0")
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    wall = time.perf_counter() - start
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return result, parse_importtime(proc.stderr), wall
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Temps de démarrage de app.py (premier rendu).")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-s", type=float, default=RENDER_BUDGET_S)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", default=None, help="Écrit les résultats dans ce fichier")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        _child()
+        return 0
+
+    samples = [sample() for _ in range(args.runs)]
+    renders = [s[0]["render_s"] for s in samples]
+    walls = [s[2] for s in samples]
+    first, breakdown, _ = samples[0]
+    median = statistics.median(renders)
+
+    print(f"Premier rendu : médiane {median*1000:.0f} ms "
+          f"(min {min(renders)*1000:.0f}, max {max(renders)*1000:.0f}, {args.runs} essais)")
+    print(f"Processus complet (interpréteur + Streamlit + rendu) : médiane {statistics.median(walls):.2f} s")
+    print(f"\nImports pendant le premier rendu (top {args.top}, cumulé) :")
+    for row in breakdown[:args.top]:
+        print(f"  {row['cumulative_ms']:9.1f} ms  {row['module']}")
+
+    failures = []
+    if first["exceptions"]:
+        failures.append(f"exceptions : {first['exceptions']}")
+    if median > args.budget_s:
+        failures.append(f"premier rendu {median:.3f} s > budget {args.budget_s:.3f} s")
+    eager = [m for m in DEFERRED_MODULES if m in first["modules"]]
+    if eager:
+        failures.append(f"modules chargés dès l'accueil : {', '.join(eager)}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "render_s": renders,
+                "render_median_s": median,
+                "process_s": walls,
+                "budget_s": args.budget_s,
+                "imports": breakdown,
+                "modules": first["modules"],
+                "failures": failures,
+            }, f, indent=1)
+
+    if failures:
+        print("\nÉCHEC : " + " ; ".join(failures))
+        return 1
+    print(f"\nOK (budget {args.budget_s:.2f} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+# Micro-benchmarks of the computational hot paths. Each benchmark is timed
+# with timeit (auto-ranged loop count, several repeats); results go to a JSON
+# file named after the current commit so runs can be compared:
+#
+#   python benchmarks/suite.py                      # all benchmarks
+#   python benchmarks/suite.py -k pntu -k geometry  # name filters
+#   python benchmarks/suite.py --baseline .cache/benchmarks/<commit>.json --threshold 0.2
+#
+# With --baseline, a benchmark whose median is more than `threshold` slower
+# than in the baseline is reported as a regression and the exit code is 1.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+RESULTS_DIR = os.path.join(ROOT, ".cache", "benchmarks")
+REPEATS = 5
+MIN_TIME_S = 0.2
+THRESHOLD = 0.20
+
+BENCHMARKS: dict = {}
+
+
+def benchmark(name: str):
+    # Registers a setup function that returns the callable to time.
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+# --- Geometry -----------------------------------------------------------------
+
+def _geometry_benchmarks():
+    from ht.hx import (
+        size_bundle_from_tubecount, Ntubes, DBundle_for_Ntubes_HEDH, DBundle_for_Ntubes_Phadkeb,
+        D_for_Ntubes_VDI, DBundle_min, D_baffle_holes, L_unsupported_max,
+    )
+    from utils.calc import GEOMETRY_DEFAULTS, compute_geometry
+    g = GEOMETRY_DEFAULTS
+    Do, pitch, angle, Ntp = g["Do"], g["pitch"], g["angle"], g["Ntp"]
+
+    def ntubes(N):
+        D = size_bundle_from_tubecount(N, Do, pitch, Ntp, angle)
+        return lambda: Ntubes(D, Do, pitch, Ntp, angle)
+
+    for N in (50, 2000):
+        benchmark(f"geometry.size_bundle_from_tubecount[N={N}]")(
+            lambda N=N: lambda: size_bundle_from_tubecount(N, Do, pitch, Ntp, angle))
+        benchmark(f"geometry.Ntubes[N={N}]")(lambda N=N: ntubes(N))
+        benchmark(f"geometry.DBundle_for_Ntubes_HEDH[N={N}]")(
+            lambda N=N: lambda: DBundle_for_Ntubes_HEDH(N, Do, pitch, angle))
+        benchmark(f"geometry.DBundle_for_Ntubes_Phadkeb[N={N}]")(
+            lambda N=N: lambda: DBundle_for_Ntubes_Phadkeb(N, Do, pitch, Ntp, angle))
+        benchmark(f"geometry.D_for_Ntubes_VDI[N={N}]")(
+            lambda N=N: lambda: D_for_Ntubes_VDI(N, Ntp, Do, pitch, angle))
+        benchmark(f"geometry.section[N={N}]")(
+            lambda N=N: lambda: compute_geometry(dict(g, N=N)))
+    benchmark("geometry.DBundle_min")(lambda: lambda: DBundle_min(Do))
+    benchmark("geometry.D_baffle_holes")(lambda: lambda: D_baffle_holes(Do, g["L_unsupported"]))
+    benchmark("geometry.L_unsupported_max")(lambda: lambda: L_unsupported_max(Do, g["material"]))
+
+
+def _clearance_benchmarks():
+    from ht.hx import shell_clearance
+    benchmark("clearance.shell_clearance[DBundle]")(lambda: lambda: shell_clearance(DBundle=1.05))
+    benchmark("clearance.shell_clearance[DShell]")(lambda: lambda: shell_clearance(DShell=1.25))
+
+
+# --- Effectiveness ------------------------------------------------------------
+
+EFFECTIVENESS_CASES = [
+    ("basic[counterflow]", "temperature_effectiveness_basic", {"subtype": "counterflow"}),
+    ("basic[crossflow]", "temperature_effectiveness_basic", {"subtype": "crossflow"}),
+    ("TEMA_E[Ntp=2]", "temperature_effectiveness_TEMA_E", {"Ntp": 2, "optimal": True}),
+    ("TEMA_G[Ntp=1]", "temperature_effectiveness_TEMA_G", {"Ntp": 1, "optimal": True}),
+    ("TEMA_H[Ntp=2]", "temperature_effectiveness_TEMA_H", {"Ntp": 2, "optimal": True}),
+    ("TEMA_J[Ntp=1]", "temperature_effectiveness_TEMA_J", {"Ntp": 1}),
+    ("air_cooler[rows=4,passes=2]", "temperature_effectiveness_air_cooler", {"rows": 4, "passes": 2}),
+    ("plate[2x2]", "temperature_effectiveness_plate",
+     {"Np1": 2, "Np2": 2, "counterflow": True, "passes_counterflow": True}),
+]
+
+
+def _effectiveness_benchmarks():
+    import numpy as np
+    from ht import hx
+    from utils.effectiveness_np import vectorized
+    from utils.eff_tables import effectiveness
+    from utils.helpers import effectiveness_chart
+    NTU = np.linspace(0.1, 10.0, 50)
+
+    def numpy_kernel(func, kwargs):
+        kernel = vectorized(func)
+        return lambda: kernel(0.5, NTU, **kwargs)
+
+    def table(func, kwargs):
+        effectiveness(func, 0.5, NTU, **kwargs)  # builds or loads the table
+        return lambda: effectiveness(func, 0.5, NTU, **kwargs)
+
+    for label, name, kwargs in EFFECTIVENESS_CASES:
+        func = getattr(hx, name)
+        benchmark(f"effectiveness.ht.{label}")(
+            lambda func=func, kwargs=kwargs: lambda: func(0.5, 1.0, **kwargs))
+        benchmark(f"effectiveness.numpy_50pts.{label}")(
+            lambda func=func, kwargs=kwargs: numpy_kernel(func, kwargs))
+        benchmark(f"effectiveness.table_50pts.{label}")(
+            lambda func=func, kwargs=kwargs: table(func, kwargs))
+        benchmark(f"effectiveness_chart.{label}")(
+            lambda func=func, kwargs=kwargs: lambda: effectiveness_chart(func, 0.5, **kwargs))
+
+
+def _pntu_benchmarks():
+    from utils.calc import PNTU_DEFAULTS, compute_pntu
+    for subtype in ("E", "G", "H", "J", "crossflow", "counterflow", "parallel"):
+        p = dict(PNTU_DEFAULTS, subtype=subtype, Ntp=1 if subtype in ("G", "J") else PNTU_DEFAULTS["Ntp"])
+        benchmark(f"pntu.P_NTU_method[{subtype}]")(lambda p=p: lambda: compute_pntu(p))
+
+
+@benchmark("pntu.monte_carlo_100k")
+def _monte_carlo():
+    from utils.calc import PNTU_DEFAULTS
+    from utils.uncertainty import run_monte_carlo
+    # Fixed sample count: convergence would otherwise change the work done.
+    return lambda: run_monte_carlo(PNTU_DEFAULTS, max_samples=100_000, min_samples=100_000, seed=0)
+
+
+@benchmark("pntu.degradation[5 years hourly]")
+def _degradation():
+    from utils.degradation import simulate
+    from utils.models import get_models
+    m_foul, m_ttc = get_models()
+    return lambda: simulate(horizon_years=5, step_h=1, m_foul=m_foul, m_ttc=m_ttc)
+
+
+# --- ML -----------------------------------------------------------------------
+
+def _ml_benchmarks():
+    import numpy as np
+    import pandas as pd
+    from utils.calc import ML_DEFAULTS, predict_fouling
+    from utils.models import (
+        FEATURE_COLUMNS, MODEL_FILES, get_models, load_model_file, model_path, predict_fouling_ttc,
+    )
+
+    def load(name):
+        path = model_path(name)
+        return lambda: load_model_file(path)
+
+    for name in MODEL_FILES:
+        benchmark(f"ml.load[{name}]")(lambda name=name: load(name))
+
+    def single():
+        m_foul, m_ttc = get_models()
+        return lambda: predict_fouling(ML_DEFAULTS, m_foul, m_ttc)
+
+    def batch(n):
+        m_foul, m_ttc = get_models()
+        rng = np.random.default_rng(0)
+        base = np.array([ML_DEFAULTS[c] for c in FEATURE_COLUMNS], dtype=np.float32)
+        X = pd.DataFrame(base*rng.uniform(0.8, 1.2, (n, len(base))).astype(np.float32), columns=FEATURE_COLUMNS)
+        return lambda: (m_foul.predict(X), m_ttc.predict(X))
+
+    def fused(n):
+        m_foul, m_ttc = get_models()
+        rng = np.random.default_rng(0)
+        base = np.array([ML_DEFAULTS[c] for c in FEATURE_COLUMNS], dtype=np.float32)
+        X = pd.DataFrame(base*rng.uniform(0.8, 1.2, (n, len(base))).astype(np.float32), columns=FEATURE_COLUMNS)
+        return lambda: predict_fouling_ttc(X, m_foul, m_ttc)
+
+    benchmark("ml.predict[1 row]")(single)
+    for n in (1_000, 100_000):
+        benchmark(f"ml.predict[{n} rows]")(lambda n=n: batch(n))
+    for n in (1, 1_000, 100_000):
+        benchmark(f"ml.predict_fused[{n} rows]")(lambda n=n: fused(n))
+
+    def cached(n):
+        from utils.prediction_cache import cached_predict
+        rng = np.random.default_rng(0)
+        base = np.array([ML_DEFAULTS[c] for c in FEATURE_COLUMNS])
+        X = base*rng.uniform(0.8, 1.2, (n, len(base)))
+        cached_predict(X)
+        return lambda: cached_predict(X)
+
+    for n in (1, 1_000):
+        benchmark(f"ml.predict_cached[{n} rows, hit]")(lambda n=n: cached(n))
+
+    @benchmark("ml.sensitivity[11 features, 55 pairs]")
+    def sensitivity():
+        from utils.sensitivity import analyze
+        m_foul, m_ttc = get_models()
+        return lambda: analyze(m_foul=m_foul, m_ttc=m_ttc)
+
+    @benchmark("ml.schedule[120 units, 3 years]")
+    def schedule():
+        from utils.schedule import optimize
+        m_foul, m_ttc = get_models()
+        rng = np.random.default_rng(0)
+        base = np.array([ML_DEFAULTS[c] for c in FEATURE_COLUMNS])
+        fleet = pd.DataFrame(base*rng.uniform(0.8, 1.2, (120, len(base))), columns=FEATURE_COLUMNS)
+        fleet["runtime_since_cleaning_hr"] = rng.uniform(0, 1000, 120)
+        return lambda: optimize(fleet, 3, 168, 2, m_foul=m_foul, m_ttc=m_ttc)
+
+
+# --- PDF ----------------------------------------------------------------------
+
+def _pdf_benchmarks():
+    def setup():
+        from utils.pdf_report import generate_pdf_report, report_values
+        from utils.pipeline import run_pipeline
+        state = {}
+        run_pipeline(state)
+        values = report_values(state)
+        return lambda: generate_pdf_report(values)
+    benchmark("pdf.generate_pdf_report")(setup)
+
+
+for _register in (_geometry_benchmarks, _clearance_benchmarks, _effectiveness_benchmarks,
+                  _pntu_benchmarks, _ml_benchmarks, _pdf_benchmarks):
+    _register()
+
+
+def measure(fn, repeats: int, min_time: float) -> dict:
+    # One untimed call first: lazy imports and caches are not part of the cost.
+    fn()
+    timer = timeit.Timer(fn)
+    # Auto-range the loop count so one repeat lasts at least min_time.
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number = max(number*2, int(number*min_time/max(elapsed, 1e-9)*1.1))
+    times = [t/number for t in timer.repeat(repeat=repeats, number=number)]
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "stdev_s": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "loops": number,
+        "repeats": repeats,
+    }
+
+
+def _commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _versions() -> dict:
+    import ht
+    import numpy
+    import reportlab
+    import xgboost
+    return {
+        "python": platform.python_version(),
+        "ht": ht.__version__,
+        "numpy": numpy.__version__,
+        "xgboost": xgboost.__version__,
+        "reportlab": reportlab.Version,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[dict]:
+    rows = []
+    for name, r in results.items():
+        b = baseline.get("results", {}).get(name)
+        if b is None:
+            continue
+        ratio = r["median_s"]/b["median_s"] if b["median_s"] > 0 else float("inf")
+        rows.append({"name": name, "baseline_s": b["median_s"], "current_s": r["median_s"],
+                     "ratio": ratio, "regression": ratio > 1 + threshold})
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks des chemins de calcul.")
+    parser.add_argument("-k", action="append", default=[], help="Filtre sur le nom (répétable)")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--min-time", type=float, default=MIN_TIME_S, help="Durée minimale d'une mesure [s]")
+    parser.add_argument("--output", default=None, help="Fichier JSON (défaut : .cache/benchmarks/<commit>.json)")
+    parser.add_argument("--baseline", default=None, help="Résultats JSON de référence")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Ralentissement toléré (0.2 = +20 %%)")
+    parser.add_argument("--list", action="store_true", help="Liste les benchmarks")
+    args = parser.parse_args(argv)
+
+    # effectiveness_chart draws through Streamlit, which warns outside a server.
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    names = [n for n in BENCHMARKS if not args.k or any(k in n for k in args.k)]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    results = {}
+    for name in names:
+        fn = BENCHMARKS[name]()
+        r = measure(fn, args.repeats, args.min_time)
+        results[name] = r
+        print(f"{name:60s} {r['median_s']*1e6:12.1f} µs  (±{r['stdev_s']*1e6:.1f}, {r['loops']} boucles)")
+
+    commit = _commit()
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "versions": _versions(),
+            "results": results,
+        }, f, indent=1)
+    print(f"\nRésultats : {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold)
+        regressions = [r for r in rows if r["regression"]]
+        print(f"\nComparaison avec {baseline.get('commit', args.baseline)} (seuil +{args.threshold:.0%}) :")
+        for r in rows:
+            flag = "RÉGRESSION" if r["regression"] else ""
+            print(f"  {r['name']:60s} x{r['ratio']:.2f} {flag}")
+        if regressions:
+            print(f"\n{len(regressions)} régression(s)")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from utils.effectiveness_np import KERNELS, TOLERANCE, VERIFY_CASES, UnsupportedCase, max_deviation, verify_grid
+
+# The NumPy kernels against their scalar ht.hx counterparts, on the UI input
+# ranges: the effectiveness tables, the sweep, the Monte Carlo and the
+# degradation simulation all rely on them.
+R1, NTU1 = verify_grid()
+
+
+@pytest.mark.parametrize(
+    "func, kwargs", VERIFY_CASES,
+    ids=[f"{f.__name__}-{'-'.join(f'{k}={v}' for k, v in kw.items())}" for f, kw in VERIFY_CASES],
+)
+def test_kernel_matches_ht(func, kwargs):
+    try:
+        dev = max_deviation(func, R1, NTU1, **kwargs)
+    except UnsupportedCase as e:
+        pytest.skip(f"non supporté par ht : {e}")
+    assert dev <= TOLERANCE
+
+
+def test_kernel_errors_are_not_unsupported(monkeypatch):
+    func, kwargs = VERIFY_CASES[0]
+
+    def broken(R1, NTU1, **kwargs):
+        raise ValueError("kernel")
+
+    monkeypatch.setitem(KERNELS, func, broken)
+    with pytest.raises(ValueError, match="kernel"):
+        max_deviation(func, R1, NTU1, **kwargs)
+
+
+def test_kernels_broadcast_scalars():
+    for func, kwargs in VERIFY_CASES[:3]:
+        P1 = KERNELS[func](0.5, np.array([0.5, 1.0, 2.0]), **kwargs)
+        assert np.shape(P1) == (3,)
@@ -1,6 +1,7 @@
 import streamlit as st
 from utils.helpers import show_metric
-from ht.hx import shell_clearance
+from utils.calc import CLEARANCE_DEFAULTS
+from utils.result_store import stored_clearance
 
 def clearance_section(run_all: bool) -> None:
     st.subheader("Jeu Calandre-Faisceau")
@@ -28,19 +29,19 @@ def clearance_section(run_all: bool) -> None:
             else:
                 ds = st.slider(
                     "Diamètre de la calandre [m]",
-                    0.1, 3.0, 1.25,
+                    0.1, 3.0, CLEARANCE_DEFAULTS["DShell"],
                     help="Diamètre intérieur de la calandre. Utilisez la valeur recommandée ou saisissez manuellement."
                 )
                 if ds <= 0.1 or ds >= 3.0:
                     error = "Le diamètre de la calandre doit être compris entre 0.1 m et 3.0 m."
             submit = st.form_submit_button("Calculer jeu")
-    run = submit or run_all
-    if run:
+    if submit:
         if error:
             st.error(error)
         else:
-            result = shell_clearance(DBundle=db) if db else shell_clearance(DShell=ds)
-            st.session_state.clearance_result = result
+            c = {"mode": mode, "DBundle": db, "DShell": ds if ds is not None else CLEARANCE_DEFAULTS["DShell"]}
+            st.session_state.clearance_result = stored_clearance(c)
+            st.session_state.inputs_clearance = c
     # Results card now below the input form, full width and horizontal
     if st.session_state.get("clearance_result"):
         st.markdown("""
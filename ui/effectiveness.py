@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from utils.helpers import show_metric, effectiveness_chart
+from utils.rating import REQUIRED_COLUMNS, OPTIONAL_COLUMNS, rate_cases, read_cases
 from ht.hx import (
     temperature_effectiveness_basic,
     temperature_effectiveness_TEMA_E,
@@ -10,8 +11,14 @@ from ht.hx import (
     temperature_effectiveness_TEMA_J,
     temperature_effectiveness_air_cooler,
     temperature_effectiveness_plate,
-    P_NTU_method,
 )
+from utils.calc import ML_DEFAULTS, PNTU_DEFAULTS
+from utils.degradation import HORIZON_YEARS, RESISTANCE_RATIO, simulate
+from utils.schedule import DOWNTIME_H
+from utils.result_store import stored_pntu
+from utils.uncertainty import DEFAULT_UNCERTAINTY, MAX_SAMPLES, RELATIVE, UNCERTAIN_INPUTS, run_monte_carlo
+from ui.jobs import job_result, start_job
+from utils.jobs import WORKERS_PER_JOB
 
 def effectiveness_result_card(label, value):
     st.markdown(f"""
@@ -88,11 +95,171 @@ def tema_ui(tab, func, key_prefix: str, run_all: bool) -> None:
                 effectiveness_result_card("Efficacité estimée", eff)
                 effectiveness_chart(func, R1, Ntp=Ntp_local, optimal=optimal)
 
+def pntu_batch_ui(tab) -> None:
+    with tab:
+        st.markdown(
+            "Table de cas (CSV ou Parquet) avec les colonnes "
+            f"`{'`, `'.join(REQUIRED_COLUMNS)}` et, en option, "
+            f"`{'`, `'.join(OPTIONAL_COLUMNS)}`. Les cas sont répartis par blocs "
+            "sur un pool de processus ; une erreur sur une ligne n'interrompt pas le lot."
+        )
+        with st.form("pntu_batch_form"):
+            uploaded = st.file_uploader("Cas à évaluer", type=["csv", "parquet", "pq"])
+            c1, c2 = st.columns(2)
+            workers = c1.number_input(
+                "Processus", 1, WORKERS_PER_JOB, WORKERS_PER_JOB,
+                help="Nombre de processus de calcul en parallèle (plafonné par tâche pour partager le serveur)."
+            )
+            chunk_size = c2.number_input(
+                "Cas par bloc", 100, 100_000, 2_000, 100,
+                help="Nombre de cas envoyés à un processus en une fois."
+            )
+            submit = st.form_submit_button("Évaluer le lot")
+        if submit and uploaded is not None:
+            try:
+                cases = read_cases(uploaded, uploaded.name)
+            except Exception as e:
+                st.error(f"Erreur lors de la lecture : {e}")
+                return
+            start_job("pntu_batch_job", "pntu_batch", rate_cases,
+                      cases, workers=int(workers), chunk_size=int(chunk_size))
+        result = job_result("pntu_batch_job", "Évaluation")
+        if result is not None:
+            st.session_state.pntu_batch = result
+        if st.session_state.get("pntu_batch"):
+            results, stats = st.session_state.pntu_batch
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Cas", f"{stats['cases']:,}")
+            c2.metric("Erreurs", f"{stats['errors']:,}")
+            c3.metric("Débit", f"{stats['cases_per_s']:,.0f} cas/s")
+            c4.metric("Durée", f"{stats['seconds']:.2f} s")
+            st.dataframe(results.head(1000), use_container_width=True)
+            st.download_button(
+                label="📥 Télécharger les résultats",
+                data=results.to_csv(index=False),
+                file_name="pntu_lot.csv",
+                mime="text/csv",
+            )
+
+def pntu_uncertainty_ui() -> None:
+    # Monte Carlo around the inputs of the last P-NTU calculation.
+    with st.expander("🎲 Incertitudes (Monte Carlo)"):
+        p = st.session_state.inputs_pntu or PNTU_DEFAULTS
+        st.caption(
+            f"Autour des entrées du dernier calcul ({p['subtype']}, {p['Ntp']} passe(s)). "
+            "Loi normale : l'écart est un écart-type ; uniforme et triangulaire : une demi-largeur."
+        )
+        laws = {"Normale": "normal", "Uniforme": "uniform", "Triangulaire": "triangular", "Fixe": "fixed"}
+        with st.form("pntu_mc_form"):
+            spec = {}
+            for name in UNCERTAIN_INPUTS:
+                default = DEFAULT_UNCERTAINTY[name]
+                c1, c2 = st.columns(2)
+                law = c1.selectbox(
+                    f"Loi {name}", list(laws), list(laws.values()).index(default["dist"]), key=f"mc_law_{name}"
+                )
+                if name in RELATIVE:
+                    spread = c2.number_input(
+                        f"Écart {name} [%]", 0.0, 50.0, default["spread"]*100, 0.5, key=f"mc_spread_{name}"
+                    )/100
+                else:
+                    spread = c2.number_input(
+                        f"Écart {name} [°C]", 0.0, 50.0, default["spread"], 0.1, key=f"mc_spread_{name}"
+                    )
+                spec[name] = {"dist": laws[law], "spread": spread}
+            max_samples = st.select_slider(
+                "Échantillons max", [100_000, 200_000, 500_000, 1_000_000], MAX_SAMPLES,
+                help="L'échantillonnage s'arrête avant si les bandes 5-50-95 % sont stables."
+            )
+            submit = st.form_submit_button("Propager les incertitudes")
+        if submit:
+            try:
+                with st.spinner("Échantillonnage…"):
+                    st.session_state.pntu_uncertainty = run_monte_carlo(p, spec, max_samples=max_samples)
+            except Exception as e:
+                st.session_state.pntu_uncertainty = None
+                st.error(str(e))
+        mc = st.session_state.get("pntu_uncertainty")
+        if mc:
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Échantillons", f"{mc['samples']:,}")
+            c2.metric("Débit", f"{mc['samples_per_s']:,.0f} éch./s")
+            c3.metric("Convergence", "atteinte" if mc["converged"] else "non atteinte")
+            if mc["invalid"]:
+                st.warning(f"{mc['invalid']:,} échantillons hors domaine des corrélations ignorés.")
+            units = {"Q": "W", "T1o": "°C", "T2o": "°C"}
+            st.dataframe(pd.DataFrame([
+                {"Sortie": f"{name} [{units[name]}]", "P5": o["p5"], "P50": o["p50"], "P95": o["p95"],
+                 "Moyenne": o["mean"], "Écart-type": o["std"]}
+                for name, o in mc["outputs"].items()
+            ]).round(2), hide_index=True, use_container_width=True)
+            name = st.radio("Distribution", list(mc["outputs"]), horizontal=True, key="mc_hist")
+            h = mc["outputs"][name]["histogram"]
+            centers = [(a + b)/2 for a, b in zip(h["edges"], h["edges"][1:])]
+            st.bar_chart(pd.DataFrame({"échantillons": h["counts"]}, index=pd.Index(np.round(centers, 2), name=name)))
+            history = pd.DataFrame(mc["history"]).set_index("samples")
+            st.line_chart(history[[f"{name}_p5", f"{name}_p50", f"{name}_p95"]])
+
+def pntu_degradation_ui() -> None:
+    # Duty over time: the fouling model drives the UA of the last P-NTU case.
+    with st.expander("📉 Dégradation par encrassement"):
+        p = st.session_state.inputs_pntu or PNTU_DEFAULTS
+        features = st.session_state.inputs_ml or ML_DEFAULTS
+        st.caption(
+            f"UA propre = {p['UA']:,.0f} W/K ({p['subtype']}, {p['Ntp']} passe(s)), conditions d'opération de la "
+            "dernière prédiction ML. L'indice d'encrassement prédit devient une résistance en série : "
+            "1/UA = (1 + r·encrassement)/UA propre, puis chaque pas est recalculé en P-NTU."
+        )
+        policies = {"À l'échéance prédite (TTC)": "due", "Intervalle fixe": "interval", "Sans nettoyage": "never"}
+        with st.form("pntu_degradation_form"):
+            c1, c2, c3 = st.columns(3)
+            years = c1.number_input("Horizon (années)", 0.1, 10.0, HORIZON_YEARS, 0.5)
+            step_h = c2.number_input("Pas de temps (h)", 1.0, 168.0, 1.0, 1.0)
+            ratio = c3.number_input(
+                "r = R encrassement / R propre", 0.0, 5.0, RESISTANCE_RATIO, 0.05,
+                help="Résistance d'encrassement rapportée à la résistance propre, pour un indice de 1."
+            )
+            c1, c2, c3 = st.columns(3)
+            policy = c1.selectbox("Nettoyage", list(policies))
+            interval_h = c2.number_input("Intervalle (h de marche)", 1.0, 50_000.0, 1000.0, 50.0)
+            downtime_h = c3.number_input("Arrêt par nettoyage (h)", 0.0, 720.0, DOWNTIME_H, 1.0)
+            submit = st.form_submit_button("Simuler")
+        if submit:
+            try:
+                with st.spinner("Simulation…"):
+                    st.session_state.pntu_degradation = simulate(
+                        p, features, years, step_h, policies[policy], interval_h, downtime_h, ratio
+                    )
+            except Exception as e:
+                st.session_state.pntu_degradation = None
+                st.error(str(e))
+        sim = st.session_state.get("pntu_degradation")
+        if sim:
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Q propre", f"{sim['Q_clean']/1e3:,.1f} kW")
+            c2.metric("Q moyen", f"{sim['Q_mean']/1e3:,.1f} kW", f"{sim['Q_mean']/sim['Q_clean'] - 1:+.1%}")
+            c3.metric("Nettoyages", f"{len(sim['cleanings'])}",
+                      f"tous les {sim['cycle_h']:,.0f} h" if np.isfinite(sim["cycle_h"]) else None, delta_color="off")
+            c4.metric("Calcul", f"{sim['seconds']:.2f} s", f"{sim['steps']:,} pas", delta_color="off")
+            st.caption(
+                f"Énergie perdue : {sim['energy_lost_fouling_MWh']:,.1f} MWh par encrassement, "
+                f"{sim['energy_lost_downtime_MWh']:,.1f} MWh pendant les arrêts. "
+                f"Rendement moyen en marche : {sim['duty_ratio']:.1%} du propre."
+            )
+            if sim["invalid"]:
+                st.warning(f"{sim['invalid']:,} pas hors domaine des corrélations.")
+            df = sim["trajectory"]
+            # At most ~2000 points per chart.
+            df = df.iloc[::max(len(df)//2000, 1)]
+            st.line_chart(df[["Q"]])
+            st.line_chart(df[["fouling"]])
+            st.line_chart(df[["T1o", "T2o"]])
+
 def effectiveness_section(run_all: bool) -> None:
     st.subheader("Méthodes d'Efficacité Thermique")
     tabs = st.tabs([
         "Basique", "TEMA E", "TEMA G", "TEMA H", "TEMA J",
-        "Air Cooler", "Plaques", "Solveur P-NTU",
+        "Air Cooler", "Plaques", "Solveur P-NTU", "Lot P-NTU",
     ])
 
     with tabs[0]:
@@ -194,37 +361,37 @@ def effectiveness_section(run_all: bool) -> None:
         with st.form("pntu_form"):
             r1c1, r1c2 = st.columns(2)
             m1 = r1c1.number_input(
-                "Débit m1 [kg/s]", 0.1, 50.0, 5.2,
+                "Débit m1 [kg/s]", 0.1, 50.0, PNTU_DEFAULTS["m1"],
                 help="Débit massique du fluide 1 (kg/s)."
             )
             m2 = r1c2.number_input(
-                "Débit m2 [kg/s]", 0.1, 50.0, 1.45,
+                "Débit m2 [kg/s]", 0.1, 50.0, PNTU_DEFAULTS["m2"],
                 help="Débit massique du fluide 2 (kg/s)."
             )
 
             r2c1, r2c2 = st.columns(2)
             Cp1 = r2c1.number_input(
-                "Cp1 [J/kg.K]", 1000.0, 5000.0, 1860.0,
+                "Cp1 [J/kg.K]", 1000.0, 5000.0, PNTU_DEFAULTS["Cp1"],
                 help="Capacité thermique massique du fluide 1 (J/kg.K)."
             )
             Cp2 = r2c2.number_input(
-                "Cp2 [J/kg.K]", 1000.0, 5000.0, 1900.0,
+                "Cp2 [J/kg.K]", 1000.0, 5000.0, PNTU_DEFAULTS["Cp2"],
                 help="Capacité thermique massique du fluide 2 (J/kg.K)."
             )
 
             r3c1, r3c2 = st.columns(2)
             T1i = r3c1.number_input(
-                "T1 entrée [°C]", 0.0, 300.0, 130.0,
+                "T1 entrée [°C]", 0.0, 300.0, PNTU_DEFAULTS["T1i"],
                 help="Température d'entrée du fluide 1 (°C)."
             )
             T2i = r3c2.number_input(
-                "T2 entrée [°C]", 0.0, 300.0, 15.0,
+                "T2 entrée [°C]", 0.0, 300.0, PNTU_DEFAULTS["T2i"],
                 help="Température d'entrée du fluide 2 (°C)."
             )
 
             f1, f2, f3 = st.columns(3)
             UA = f1.number_input(
-                "UA [W/K]", 10.0, 10000.0, 3000.0,
+                "UA [W/K]", 10.0, 10000.0, PNTU_DEFAULTS["UA"],
                 help="Produit du coefficient global d'échange et de la surface (UA)."
             )
             subtype = f2.selectbox(
@@ -232,28 +399,12 @@ def effectiveness_section(run_all: bool) -> None:
                 help="Type/configuration de l'échangeur."
             )
             Ntp = f3.number_input(
-                "Passes tubes", 1, 2, 2,
+                "Passes tubes", 1, 2, PNTU_DEFAULTS["Ntp"],
                 help="Nombre de passes côté tubes (1 ou 2)."
             )
             submit = st.form_submit_button("Calculer")
-        run = submit or run_all
-        if run:
-            try:
-                result = P_NTU_method(
-                    m1,
-                    m2,
-                    Cp1,
-                    Cp2,
-                    T1i=T1i,
-                    T2i=T2i,
-                    UA=UA,
-                    subtype=subtype,
-                    Ntp=Ntp,
-                )
-                st.json(result)
-            except Exception as e:
-                st.error(str(e))
-            st.session_state.inputs_pntu = {
+        if submit:
+            p = {
                 "m1": m1,
                 "Cp1": Cp1,
                 "T1i": T1i,
@@ -263,4 +414,16 @@ def effectiveness_section(run_all: bool) -> None:
                 "UA": UA,
                 "subtype": subtype,
                 "Ntp": Ntp,
-            } 
\ No newline at end of file
+            }
+            st.session_state.inputs_pntu = p
+            try:
+                st.session_state.pntu_result = stored_pntu(p)
+            except Exception as e:
+                st.session_state.pntu_result = None
+                st.error(str(e))
+        if (submit or run_all) and st.session_state.pntu_result:
+            st.json(st.session_state.pntu_result)
+        pntu_uncertainty_ui()
+        pntu_degradation_ui()
+
+    pntu_batch_ui(tabs[8])
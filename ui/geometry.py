@@ -1,9 +1,15 @@
 import streamlit as st
+import os
+import pandas as pd
 from utils.helpers import show_metric
-from ht.hx import size_bundle_from_tubecount, Ntubes, DBundle_for_Ntubes_HEDH, DBundle_for_Ntubes_Phadkeb, D_for_Ntubes_VDI, DBundle_min, shell_clearance, D_baffle_holes, L_unsupported_max
+from utils.sweep import ANGLES, N_MAX, PASSES, PITCH_RATIOS, STANDARD_DO, query_sweep, run_sweep, sweep_N_max, sweep_path
+from utils.tube_index import max_tubes_in_shell
+from utils.calc import GEOMETRY_DEFAULTS, validate_geometry
+from utils.result_store import stored_geometry
+from ui.jobs import file_data, job_result, start_job
+from utils.jobs import WORKERS_PER_JOB
 
-def geometry_section(run_all: bool) -> None:
-    st.subheader(" Calculs de Géométrie")
+def geometry_calc_ui(run_all: bool) -> None:
     # Only input columns at the top
     col_input = st.columns([1])[0]
     with col_input:
@@ -11,12 +17,12 @@ def geometry_section(run_all: bool) -> None:
             r1c1, r1c2, r1c3 = st.columns(3)
             Do = r1c1.number_input(
                 "Ø extérieur [m]",
-                0.005, 0.1, 0.025,
+                0.005, 0.1, GEOMETRY_DEFAULTS["Do"],
                 help="Diamètre extérieur du tube (généralement entre 5 mm et 100 mm)."
             )
             pitch = r1c2.number_input(
                 "Pas triangulaire [m]",
-                0.01, 0.1, 0.03125,
+                0.01, 0.1, GEOMETRY_DEFAULTS["pitch"],
                 help="Distance entre les centres de deux tubes adjacents. Typiquement 1.25 × Ø extérieur."
             )
             angle = r1c3.selectbox(
@@ -35,12 +41,12 @@ def geometry_section(run_all: bool) -> None:
             )
             N = r2c2.slider(
                 "Nombre de tubes",
-                1, 2000, 928,
+                1, 2000, GEOMETRY_DEFAULTS["N"],
                 help="Nombre total de tubes dans le faisceau."
             )
             L_unsupported = r2c3.number_input(
                 "Longueur non supportée [m]",
-                0.1, 10.0, 0.75,
+                0.1, 10.0, GEOMETRY_DEFAULTS["L_unsupported"],
                 help="Longueur de tube entre supports (baffles). Trop long augmente le risque de vibration."
             )
 
@@ -51,37 +57,23 @@ def geometry_section(run_all: bool) -> None:
             )
             submit = st.form_submit_button("Calculer géométrie")
 
-    run = submit or run_all
-    error = None
-    # --- Input validation ---
-    if run:
-        if pitch <= Do:
-            error = "Le pas triangulaire doit être supérieur au diamètre extérieur du tube."
-        if L_unsupported < 0.1 or L_unsupported > 10.0:
-            error = "La longueur non supportée doit être comprise entre 0.1 m et 10 m."
-        if N < 1:
-            error = "Le nombre de tubes doit être au moins 1."
+    if submit:
+        g = {
+            "Do": Do,
+            "pitch": pitch,
+            "angle": angle,
+            "Ntp": Ntp,
+            "N": N,
+            "material": material,
+            "L_unsupported": L_unsupported,
+        }
+        error = validate_geometry(g)
         if error:
             st.error(error)
         else:
-            st.session_state.DB_Perry = size_bundle_from_tubecount(N, Do, pitch, Ntp, angle)
-            st.session_state.N_Perry = Ntubes(st.session_state.DB_Perry, Do, pitch, Ntp, angle)
-            st.session_state.DB_HEDH = DBundle_for_Ntubes_HEDH(N, Do, pitch, angle)
-            st.session_state.DB_Phadkeb = DBundle_for_Ntubes_Phadkeb(N, Do, pitch, Ntp, angle)
-            st.session_state.DB_VDI = D_for_Ntubes_VDI(N, Ntp, Do, pitch, angle)
-            st.session_state.DShell_min = DBundle_min(Do)
-            st.session_state.clearance_auto = shell_clearance(DBundle=st.session_state.DB_HEDH)
-            st.session_state.dB_hole = D_baffle_holes(Do, L_unsupported)
-            st.session_state.L_max = L_unsupported_max(Do, material)
-            st.session_state.inputs_geometry = {
-                "Do": Do,
-                "pitch": pitch,
-                "angle": angle,
-                "Ntp": Ntp,
-                "N": N,
-                "material": material,
-                "L_unsupported": L_unsupported,
-            }
+            for key, value in stored_geometry(g).items():
+                st.session_state[key] = value
+            st.session_state.inputs_geometry = g
     # Results card now below the input form, full width and horizontal
     if st.session_state.get("DB_Perry"):
         st.markdown("""
@@ -143,4 +135,115 @@ def geometry_section(run_all: bool) -> None:
             st.session_state.clearance_auto,
             st.session_state.dB_hole,
             st.session_state.L_max
-        ), unsafe_allow_html=True) 
\ No newline at end of file
+        ), unsafe_allow_html=True)
+
+def sweep_ui() -> None:
+    st.markdown(
+        "Balayage de toutes les combinaisons Ø tube × rapport de pas × angle × passes × N "
+        "pour les quatre corrélations de diamètre de faisceau. Les résultats sont écrits "
+        "par blocs dans un fichier Parquet puis filtrés sans charger toute la grille."
+    )
+    with st.form("sweep_form"):
+        c1, c2 = st.columns(2)
+        Do_values = c1.multiselect(
+            "Ø extérieurs [m]", STANDARD_DO, STANDARD_DO,
+            help="Diamètres de tubes standards TEMA (1/4\" à 2\")."
+        )
+        ratios = c2.multiselect(
+            "Rapports pas / Ø", PITCH_RATIOS, PITCH_RATIOS,
+            help="Rapports pas/diamètre de 1.25 à 1.5."
+        )
+        c3, c4, c5 = st.columns(3)
+        angles = c3.multiselect("Angles [°]", ANGLES, ANGLES)
+        passes = c4.multiselect("Passes tubes", PASSES, PASSES)
+        N_max = c5.number_input("N max", 1, 5000, N_MAX, help="Nombre de tubes maximal du balayage.")
+        workers = st.number_input(
+            "Processus", 1, WORKERS_PER_JOB, WORKERS_PER_JOB,
+            help="Nombre de processus de calcul en parallèle (plafonné par tâche pour partager le serveur)."
+        )
+        submit = st.form_submit_button("Lancer le balayage")
+    if submit:
+        if not (Do_values and ratios and angles and passes):
+            st.error("Sélectionnez au moins une valeur pour chaque paramètre.")
+        else:
+            path = sweep_path(Do_values, ratios, angles, passes, int(N_max))
+            if os.path.exists(path):
+                st.session_state.sweep_path = path
+            else:
+                start_job(
+                    "sweep_job", "sweep", run_sweep,
+                    Do_values, ratios, angles, passes, int(N_max), output_path=path, workers=int(workers),
+                    outputs=(path + ".tmp",),
+                )
+    summary = job_result("sweep_job", "Balayage")
+    if summary is not None:
+        st.success(f"{summary['rows']:,} lignes en {summary['seconds']:.1f} s")
+        st.session_state.sweep_path = summary["path"]
+
+    path = st.session_state.get("sweep_path")
+    if path and os.path.exists(path):
+        st.markdown("**Filtrer les résultats**")
+        f1, f2, f3, f4 = st.columns(4)
+        Do_sel = f1.multiselect("Ø [m]", STANDARD_DO, key="sweep_f_Do")
+        ratio_sel = f2.multiselect("Pas / Ø", PITCH_RATIOS, key="sweep_f_ratio")
+        angle_sel = f3.multiselect("Angle", ANGLES, key="sweep_f_angle")
+        ntp_sel = f4.multiselect("Passes", PASSES, key="sweep_f_ntp")
+        n_max = sweep_N_max(path)
+        N_range = st.slider("Plage de N", 1, max(n_max, 2), (1, n_max), key=f"sweep_f_N_{n_max}")
+        view = query_sweep(path, Do_sel, ratio_sel, angle_sel, ntp_sel, N_range, limit=5000)
+        st.dataframe(view, use_container_width=True)
+        if len(Do_sel) == 1 and len(ratio_sel) == 1 and len(angle_sel) == 1 and len(ntp_sel) == 1:
+            st.line_chart(view.set_index("N")[["DB_HEDH", "DB_Phadkeb", "DB_VDI"]])
+        st.download_button(
+            label="📥 Télécharger le balayage (Parquet)",
+            data=file_data(path),
+            file_name=os.path.basename(path),
+            mime="application/octet-stream",
+        )
+
+def shell_to_tubes_ui() -> None:
+    st.markdown(
+        "Nombre maximal de tubes pour un diamètre de calandre donné, pour chaque corrélation. "
+        "Le faisceau disponible est la calandre moins le jeu recommandé (`shell_clearance`)."
+    )
+    with st.form("shell_tubes_form"):
+        c1, c2, c3 = st.columns(3)
+        DShell = c1.number_input(
+            "Ø calandre [m]", 0.1, 3.0, 0.889, 0.001, format="%.3f",
+            help="Diamètre intérieur de la calandre."
+        )
+        Do = c2.number_input(
+            "Ø extérieur [m]", 0.005, 0.1, 0.0254, format="%.4f",
+            help="Diamètre extérieur du tube."
+        )
+        pitch = c3.number_input(
+            "Pas [m]", 0.01, 0.1, 0.03175, format="%.5f",
+            help="Distance entre les centres de deux tubes adjacents."
+        )
+        c4, c5 = st.columns(2)
+        angle = c4.selectbox("Angle [°]", ANGLES, index=0)
+        Ntp = c5.selectbox("Passes tubes", PASSES, index=1)
+        submit = st.form_submit_button("Calculer le nombre de tubes")
+    if submit:
+        if pitch <= Do:
+            st.error("Le pas doit être supérieur au diamètre extérieur du tube.")
+            return
+        results = max_tubes_in_shell(DShell, Do, pitch, angle, Ntp)
+        df = pd.DataFrame(results).rename(columns={
+            "method": "Corrélation",
+            "N": "N max",
+            "DBundle_N": "Ø faisceau à N max [m]",
+            "DBundle": "Ø faisceau disponible [m]",
+            "saturated": "Hors table",
+        })
+        st.dataframe(df, use_container_width=True)
+
+def geometry_section(run_all: bool) -> None:
+    st.subheader(" Calculs de Géométrie")
+    tabs = st.tabs(["Calcul", "Balayage", "Calandre → tubes"])
+    with tabs[0]:
+        geometry_calc_ui(run_all)
+    with tabs[1]:
+        sweep_ui()
+    with tabs[2]:
+        shell_to_tubes_ui()
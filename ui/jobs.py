@@ -0,0 +1,78 @@
+import os
+import tempfile
+import uuid
+import streamlit as st
+from utils import jobs
+
+def session_owner() -> str:
+    if st.session_state.get("job_owner") is None:
+        st.session_state.job_owner = uuid.uuid4().hex
+    return st.session_state.job_owner
+
+def start_job(key: str, name: str, fn, *args, **kwargs) -> None:
+    # The job id lives in session state under `key`, so the job is found
+    # again after a rerun or a detour through another page.
+    try:
+        st.session_state[key] = jobs.submit(session_owner(), name, fn, *args, **kwargs)
+    except jobs.JobLimitError as e:
+        st.error(str(e))
+
+@st.fragment(run_every=1.0)
+def job_progress(key: str, label: str) -> None:
+    job = jobs.get(st.session_state.get(key))
+    if job is None or job.status not in jobs.ACTIVE:
+        # Finished: rerun the page so job_result() hands over the result.
+        st.rerun()
+    if job.status == jobs.QUEUED:
+        stats = jobs.queue_stats()
+        text = f"{label} : en attente ({stats['running']}/{stats['max_running']} tâches en cours sur le serveur)"
+    else:
+        text = f"{label} : {job.elapsed:.0f} s"
+        if job.progress is not None:
+            text += f", {job.progress:.0%}"
+        if job.count is not None:
+            text += f", {job.count:,} lignes"
+    c1, c2 = st.columns([5, 1])
+    c1.progress(job.progress or 0.0, text=text)
+    if c2.button("Annuler", key=f"{key}_cancel"):
+        jobs.cancel(job.id)
+
+def new_output(key: str, prefix: str, suffix: str) -> str:
+    # Temporary output file for a new job; the previous one of this session
+    # (path kept under `key`) is deleted.
+    previous = st.session_state.get(key)
+    if previous:
+        try:
+            os.remove(previous)
+        except OSError:
+            pass
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=suffix)
+    os.close(fd)
+    st.session_state[key] = path
+    return path
+
+def file_data(path: str):
+    # download_button data read only when the button is clicked, not on
+    # every rerun.
+    def read() -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+    return read
+
+def job_result(key: str, label: str):
+    # Shows the job stored under `key` while it runs and returns its result
+    # once, on the first rerun after it finished.
+    job = jobs.get(st.session_state.get(key))
+    if job is None:
+        return None
+    if job.status in jobs.ACTIVE:
+        job_progress(key, label)
+        return None
+    st.session_state[key] = None
+    if job.status == jobs.FAILED:
+        st.error(f"{label} : erreur — {job.error}")
+    elif job.status == jobs.CANCELLED:
+        st.warning(f"{label} : annulé.")
+    else:
+        return job.result
+    return None
@@ -1,6 +1,17 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
-import joblib
+import os
+from utils.models import FEATURE_COLUMNS, FOULING_CRITICAL, FOULING_WARNING, get_models, model_stats
+from utils.batch_scoring import detect_format, score_file
+from utils.calc import ML_DEFAULTS, ML_RANGES
+from utils.prediction_cache import cache_stats
+from utils.result_store import stored_prediction
+from utils.monitor import MONITOR_DIR, WINDOW_ROWS, allowed_path, find_monitor, release, set_session_check, watch
+from utils.rating import read_cases
+from utils.schedule import CREWS, DOWNTIME_H, HORIZON_YEARS, STEP_H, UNIT_COLUMN, optimize
+from utils.sensitivity import analyze
+from ui.jobs import file_data, job_result, new_output, start_job
 
 def ml_result_card(fouling, ttc, status):
     st.markdown(f"""
@@ -53,78 +64,334 @@ def ml_result_card(fouling, ttc, status):
     </div>
     """, unsafe_allow_html=True)
 
-def fouling_prediction_section() -> None:
+def batch_scoring_ui(tab, m_foul, m_ttc) -> None:
+    with tab:
+        st.markdown(
+            "Fichier CSV ou Parquet contenant les 11 colonnes de features "
+            f"(`{FEATURE_COLUMNS[0]}` … `{FEATURE_COLUMNS[-1]}`). "
+            "Le fichier est traité par blocs pour limiter la mémoire."
+        )
+        with st.form("batch_scoring_form"):
+            uploaded = st.file_uploader("Export historian", type=["csv", "parquet", "pq"])
+            chunk_rows = st.number_input(
+                "Lignes par bloc", 1_000, 1_000_000, 50_000, 1_000,
+                help="Taille des blocs lus et prédits en une fois."
+            )
+            submit = st.form_submit_button("Scorer le fichier")
+        if submit and uploaded is not None:
+            try:
+                fmt = detect_format(uploaded.name)
+                suffix = ".parquet" if fmt == "parquet" else ".csv"
+                output_path = new_output("batch_scoring_output", "hx_scores_", suffix)
+            except Exception as e:
+                st.error(f"Scoring impossible : {e}")
+            else:
+                start_job("batch_scoring_job", "batch_scoring", score_file,
+                          uploaded, output_path, m_foul, m_ttc, fmt=fmt, chunk_rows=int(chunk_rows),
+                          outputs=(output_path,))
+        result = job_result("batch_scoring_job", "Scoring")
+        if result is not None:
+            st.session_state.batch_scoring_result = result
+        summary = st.session_state.get("batch_scoring_result")
+        if summary and os.path.exists(summary["output_path"]):
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Lignes", f"{summary['rows']:,}")
+            c2.metric("Débit", f"{summary['rows_per_s']:,.0f} lignes/s")
+            c3.metric("Attention", f"{summary['status_counts']['Attention']:,}")
+            c4.metric("Critique", f"{summary['status_counts']['Critique']:,}")
+            st.download_button(
+                label="📥 Télécharger les prédictions",
+                data=file_data(summary["output_path"]),
+                file_name=os.path.basename(summary["output_path"]),
+                mime="application/octet-stream",
+            )
+
+@st.fragment(run_every=1.0)
+def monitor_live(path: str) -> None:
+    monitor = find_monitor(path)
+    if monitor is None:
+        st.info("Surveillance arrêtée.")
+        return
+    s = monitor.stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Lignes", f"{s['rows']:,}")
+    c2.metric("Débit", f"{s['rows_per_s']:,.0f} lignes/s")
+    c3.metric("Capacité", f"{s['capacity_rows_per_s']:,.0f} lignes/s")
+    c4.metric("Erreurs", f"{s['errors']:,}")
+    if s["status"] == "Critique":
+        st.error(f"🔴 Encrassement critique (≥ {FOULING_CRITICAL})")
+    elif s["status"] == "Attention":
+        st.warning(f"🟠 Encrassement à surveiller (≥ {FOULING_WARNING})")
+    else:
+        st.success("🟢 Encrassement OK")
+    if s["last_error"]:
+        st.caption(f"Dernière erreur : {s['last_error']}")
+    df = monitor.window_frame(max_points=2000)
+    if not df.empty:
+        df["seuil Attention"] = FOULING_WARNING
+        df["seuil Critique"] = FOULING_CRITICAL
+        st.line_chart(df[["fouling_prediction", "seuil Attention", "seuil Critique"]])
+        st.line_chart(df[["ttc_prediction"]])
+    alerts = list(monitor.alerts)[-20:][::-1]
+    if alerts:
+        st.markdown("**Dernières alertes** (changements de niveau)")
+        st.dataframe(pd.DataFrame(alerts), hide_index=True, use_container_width=True)
+    if not s["running"]:
+        st.info("Surveillance arrêtée.")
+
+def monitor_ui(tab) -> None:
+    with tab:
+        st.markdown(
+            "Suit un fichier CSV (avec en-tête) ou JSON lines alimenté en continu par un enregistreur, "
+            "avec les 11 colonnes de features et, en option, `timestamp`. Seules les nouvelles lignes "
+            "sont prédites, par micro-lots ; une fenêtre glissante de taille fixe est conservée."
+        )
+        with st.form("monitor_form"):
+            path = st.text_input("Fichier capteurs", st.session_state.get("monitor_path") or "",
+                                 help=f"Chemin dans {MONITOR_DIR} (HX_MONITOR_DIR).")
+            c1, c2 = st.columns(2)
+            window = c1.number_input("Fenêtre (lignes)", 1_000, 200_000, WINDOW_ROWS, 1_000)
+            from_end = c2.checkbox("Ignorer les lignes existantes", True)
+            b1, b2 = st.columns(2)
+            start = b1.form_submit_button("▶️ Démarrer")
+            stop = b2.form_submit_button("⏹️ Arrêter")
+        set_session_check(session_alive)
+        watcher = get_script_run_ctx().session_id
+        if start and path:
+            try:
+                full = allowed_path(path)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                if not os.path.exists(full):
+                    st.error(f"Fichier introuvable : {path}")
+                else:
+                    previous = st.session_state.get("monitor_path")
+                    if previous and previous != full:
+                        release(previous, watcher)
+                        st.session_state.monitor_path = None
+                    try:
+                        watch(full, watcher, int(window), from_start=not from_end)
+                    except Exception as e:
+                        st.error(f"Surveillance impossible : {e}")
+                    else:
+                        st.session_state.monitor_path = full
+        if stop and st.session_state.get("monitor_path"):
+            # Other sessions watching the same file keep their monitor.
+            release(st.session_state.monitor_path, watcher)
+            st.session_state.monitor_path = None
+        if st.session_state.get("monitor_path"):
+            monitor_live(st.session_state.monitor_path)
+
+def session_alive(session_id: str) -> bool:
+    from streamlit import runtime
+    return not runtime.exists() or runtime.get_instance().is_active_session(session_id)
+
+def schedule_ui(tab, m_foul, m_ttc) -> None:
+    with tab:
+        st.markdown(
+            "Fichier CSV ou Parquet avec une ligne par échangeur : les 11 colonnes de features "
+            f"(conditions actuelles), et en option `{UNIT_COLUMN}`, `downtime_h` (durée d'arrêt, "
+            f"{DOWNTIME_H:g} h par défaut) et `weight` (importance). L'encrassement et le TTC de chaque "
+            "échangeur sont projetés sur l'horizon, puis les nettoyages sont placés sous la contrainte "
+            "du nombre d'équipes."
+        )
+        with st.form("schedule_form"):
+            uploaded = st.file_uploader("Flotte", type=["csv", "parquet", "pq"])
+            c1, c2, c3, c4 = st.columns(4)
+            years = c1.number_input("Horizon (années)", 0.25, 10.0, HORIZON_YEARS, 0.25)
+            step_h = c2.number_input("Pas de temps (h)", 1.0, 720.0, STEP_H, 1.0)
+            crews = c3.number_input("Équipes de nettoyage", 1, 100, CREWS,
+                                    help="Nombre d'échangeurs pouvant être nettoyés en même temps.")
+            start = c4.date_input("Début")
+            submit = st.form_submit_button("📅 Planifier")
+        if submit and uploaded is not None:
+            try:
+                fleet = read_cases(uploaded, uploaded.name)
+            except Exception as e:
+                st.error(f"Lecture impossible : {e}")
+            else:
+                start_job("schedule_job", "schedule", optimize, fleet, float(years), float(step_h),
+                          int(crews), start, m_foul, m_ttc)
+        result = job_result("schedule_job", "Planification")
+        if result is not None:
+            st.session_state.schedule_result = result
+        r = st.session_state.get("schedule_result")
+        if not r:
+            return
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Nettoyages", f"{len(r['calendar']):,}",
+                  f"{len(r['calendar']) - r['reactive_cleanings']:+,} vs échéance", delta_color="off")
+        c2.metric("Heures perdues", f"{r['cost_h']:,.0f} h",
+                  f"{r['cost_h'] - r['reactive_cost_h']:+,.0f} h vs échéance", delta_color="inverse")
+        c3.metric("Pas en retard", f"{r['late_steps']:,}",
+                  f"{r['late_steps'] - r['reactive_late_steps']:+,} vs échéance", delta_color="inverse")
+        c4.metric("Calcul", f"{r['seconds']:.1f} s", f"{r['model_rows']:,} prédictions/modèle", delta_color="off")
+        st.caption(
+            "Heures perdues : encrassement × heures de marche + heures d'arrêt. "
+            "« Échéance » : nettoyage seulement quand le TTC prédit est atteint ou l'encrassement critique."
+        )
+        st.markdown("**Équipes occupées**")
+        st.bar_chart(pd.DataFrame({"occupées": r["crew_usage"], "disponibles": r["crews"]}))
+        unit = st.selectbox("Échangeur", r["units"][UNIT_COLUMN])
+        i = int(r["units"].index[r["units"][UNIT_COLUMN] == unit][0])
+        traj = pd.DataFrame({"fouling_prediction": r["trajectories"][i]})
+        traj.index = (traj.index*r["step_h"]).rename("heures")
+        traj["seuil Critique"] = FOULING_CRITICAL
+        st.line_chart(traj)
+        st.dataframe(r["units"], hide_index=True, use_container_width=True)
+        st.dataframe(r["calendar"], hide_index=True, use_container_width=True)
+        st.download_button(
+            label="📥 Télécharger le calendrier",
+            data=r["calendar"].to_csv(index=False).encode("utf-8"),
+            file_name="calendrier_nettoyage.csv",
+            mime="text/csv",
+        )
+
+def sensitivity_ui(tab, m_foul, m_ttc) -> None:
+    with tab:
+        features = st.session_state.inputs_ml or ML_DEFAULTS
+        st.markdown(
+            "Effet de chaque feature sur l'encrassement et le TTC autour du point de la dernière "
+            "prédiction (valeurs par défaut sinon) : chaque feature parcourt la plage de son curseur, "
+            "seule puis par paires, et toutes les grilles sont évaluées en un seul appel aux modèles."
+        )
+        if st.button("🔬 Analyser"):
+            try:
+                st.session_state.sensitivity = analyze(features, m_foul=m_foul, m_ttc=m_ttc)
+            except Exception as e:
+                st.error(f"Analyse impossible : {e}")
+        r = st.session_state.sensitivity
+        if not r:
+            return
+        import plotly.graph_objects as go
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Encrassement au point", f"{r['base']['fouling']:.3f}")
+        c2.metric("TTC au point", f"{r['base']['ttc_h']:,.0f} h")
+        c3.metric("Calcul", f"{r['seconds']:.2f} s", f"{r['rows']:,} prédictions", delta_color="off")
+        if r["features"] != features:
+            st.caption("Analyse faite pour un point différent de la dernière prédiction.")
+        label = st.radio("Sortie", ["Encrassement", "TTC (h)"], horizontal=True)
+        output = "fouling" if label == "Encrassement" else "ttc_h"
+        lo, hi = ("fouling_min", "fouling_max") if output == "fouling" else ("ttc_min_h", "ttc_max_h")
+
+        st.markdown("**Tornade** : plage de la sortie quand chaque feature parcourt sa plage")
+        t = r["tornado"].assign(swing=lambda d: d[hi] - d[lo]).sort_values("swing")
+        fig = go.Figure(go.Bar(y=t.index, x=t["swing"], base=t[lo], orientation="h"))
+        fig.add_vline(x=r["base"][output], line_dash="dash")
+        fig.update_layout(xaxis_title=label, height=400, margin=dict(l=0, r=0, t=10, b=0))
+        st.plotly_chart(fig, use_container_width=True)
+
+        name = st.selectbox("Courbe de dépendance", FEATURE_COLUMNS)
+        curve = r["one_way"][r["one_way"]["feature"] == name].set_index("value")[[output]]
+        st.line_chart(curve.rename_axis(name))
+
+        c1, c2 = st.columns(2)
+        x = c1.selectbox("Axe x", FEATURE_COLUMNS, index=FEATURE_COLUMNS.index("solids_ppm"))
+        others = [c for c in FEATURE_COLUMNS if c != x]
+        y = c2.selectbox("Axe y", others, index=others.index("hot_flow_kg_s") if "hot_flow_kg_s" in others else 0)
+        # Every pair is computed once, in FEATURE_COLUMNS order.
+        if (x, y) in r["two_way"]:
+            pair = r["two_way"][(x, y)]
+            gx, gy, z = pair["x"], pair["y"], pair[output]
+        else:
+            pair = r["two_way"][(y, x)]
+            gx, gy, z = pair["y"], pair["x"], pair[output].T
+        fig = go.Figure(go.Heatmap(x=gx, y=gy, z=z, colorbar=dict(title=label)))
+        fig.add_trace(go.Scatter(x=[r["features"][x]], y=[r["features"][y]], mode="markers",
+                                 marker=dict(symbol="x", size=12, color="white"), name="point"))
+        fig.update_layout(xaxis_title=x, yaxis_title=y, height=450, margin=dict(l=0, r=0, t=10, b=0))
+        st.plotly_chart(fig, use_container_width=True)
+
+        st.markdown("**Contributions au point** (SHAP, xgboost `pred_contribs`)")
+        contrib = r["contributions"][output]
+        st.bar_chart(contrib.drop("bias").rename("contribution").sort_values(), horizontal=True)
+        st.caption(f"Biais du modèle : {contrib['bias']:.4g} ; la somme des contributions donne la "
+                   "prédiction brute (avant la borne TTC ≥ 0).")
+        st.download_button(
+            label="📥 Télécharger les courbes",
+            data=r["one_way"].to_csv(index=False).encode("utf-8"),
+            file_name="sensibilite.csv",
+            mime="text/csv",
+        )
+
+
+def fouling_prediction_section(run_all: bool) -> None:
     st.subheader("Prédiction d'Encrassement")
-    
     try:
-        m_foul = joblib.load("model_fouling.pkl")
-        m_ttc = joblib.load("model_ttc.pkl")
-        
+        m_foul, m_ttc = get_models()
+    except Exception as e:
+        st.error(f"Erreur lors du chargement des modèles: {str(e)}")
+        st.info("Assurez-vous que les fichiers model_fouling.pkl et model_ttc.pkl sont présents.")
+        return
+    tabs = st.tabs(["Prédiction", "Scoring par lot", "Surveillance", "Planification", "Sensibilité"])
+
+    with tabs[0]:
         with st.form("fouling_form"):
             rtc = st.number_input(
-                "Heures depuis dernier nettoyage", 0, 7*365*24, 100,
+                "Heures depuis dernier nettoyage", *ML_RANGES["runtime_since_cleaning_hr"], ML_DEFAULTS["runtime_since_cleaning_hr"],
                 help="Nombre d'heures de fonctionnement depuis le dernier nettoyage (0 à 7 ans)."
             )
             a1, a2 = st.columns(2)
-            
+
             with a1:
                 with st.expander("Mesures de performance", expanded=False):
                     c1, c2 = st.columns(2)
                     with c1:
                         dTh = st.slider(
-                            "ΔT côté chaud (°C)", 0.0, 40.0, 18.0, 0.1,
+                            "ΔT côté chaud (°C)", *ML_RANGES["deltaT_hot_C"], ML_DEFAULTS["deltaT_hot_C"], 0.1,
                             help="Différence de température côté chaud (0 à 40°C)."
                         )
                     with c2:
                         dTc = st.slider(
-                            "ΔT côté froid (°C)", 0.0, 40.0, 16.0, 0.1,
+                            "ΔT côté froid (°C)", *ML_RANGES["deltaT_cold_C"], ML_DEFAULTS["deltaT_cold_C"], 0.1,
                             help="Différence de température côté froid (0 à 40°C)."
                         )
                     dp = st.slider(
-                        "ΔP calandre (kPa)", 0.0, 150.0, 20.0, 0.1,
+                        "ΔP calandre (kPa)", *ML_RANGES["deltaP_shell_kPa"], ML_DEFAULTS["deltaP_shell_kPa"], 0.1,
                         help="Perte de charge côté calandre (0 à 150 kPa)."
                     )
-            
+
             with a2:
                 with st.expander(" Conditions d'opération", expanded=False):
                     t1, t2 = st.columns(2)
                     with t1:
                         Tin_hot = st.slider(
-                            "T entrée chaud (°C)", 80, 180, 140,
+                            "T entrée chaud (°C)", *ML_RANGES["hot_inlet_temp_C"], ML_DEFAULTS["hot_inlet_temp_C"],
                             help="Température d'entrée du fluide chaud (80 à 180°C)."
                         )
                     with t2:
                         Tin_cold = st.slider(
-                            "T entrée froid (°C)", 5, 70, 30,
+                            "T entrée froid (°C)", *ML_RANGES["cold_inlet_temp_C"], ML_DEFAULTS["cold_inlet_temp_C"],
                             help="Température d'entrée du fluide froid (5 à 70°C)."
                         )
 
                     f1, f2 = st.columns(2)
                     with f1:
                         q_hot = st.slider(
-                            "Débit chaud (kg/s)", 5.0, 30.0, 15.0,
+                            "Débit chaud (kg/s)", *ML_RANGES["hot_flow_kg_s"], ML_DEFAULTS["hot_flow_kg_s"],
                             help="Débit massique du fluide chaud (5 à 30 kg/s)."
                         )
                     with f2:
                         q_cold = st.slider(
-                            "Débit froid (kg/s)", 5.0, 30.0, 15.0,
+                            "Débit froid (kg/s)", *ML_RANGES["cold_flow_kg_s"], ML_DEFAULTS["cold_flow_kg_s"],
                             help="Débit massique du fluide froid (5 à 30 kg/s)."
                         )
 
                     v1, v2 = st.columns(2)
                     with v1:
                         mu_hot = st.number_input(
-                            "Viscosité chaud (cP)", 0.1, 10.0, 0.4,
+                            "Viscosité chaud (cP)", *ML_RANGES["hot_visc_cP"], ML_DEFAULTS["hot_visc_cP"],
                             help="Viscosité dynamique du fluide chaud (0.1 à 10 cP)."
                         )
                     with v2:
                         mu_cold = st.number_input(
-                            "Viscosité froid (cP)", 0.1, 10.0, 0.9,
+                            "Viscosité froid (cP)", *ML_RANGES["cold_visc_cP"], ML_DEFAULTS["cold_visc_cP"],
                             help="Viscosité dynamique du fluide froid (0.1 à 10 cP)."
                         )
 
                     solids = st.slider(
-                        "Solides en suspension (ppm)", 0, 300, 50,
+                        "Solides en suspension (ppm)", *ML_RANGES["solids_ppm"], ML_DEFAULTS["solids_ppm"],
                         help="Concentration de solides en suspension (0 à 300 ppm)."
                     )
 
@@ -134,32 +401,42 @@ def fouling_prediction_section() -> None:
             # Input validation example: warn if cleaning interval is very high
             if rtc > 5*365*24:
                 st.warning("Attention : plus de 5 ans depuis le dernier nettoyage, risque élevé d'encrassement.")
-            features = pd.DataFrame([[
+            features = dict(zip(FEATURE_COLUMNS, [
                 rtc, dTh, dTc, dp,
                 Tin_hot, Tin_cold,
                 q_hot, q_cold,
                 mu_hot, mu_cold,
                 solids
-            ]], columns=[
-                "runtime_since_cleaning_hr",
-                "deltaT_hot_C", "deltaT_cold_C", "deltaP_shell_kPa",
-                "hot_inlet_temp_C", "cold_inlet_temp_C",
-                "hot_flow_kg_s", "cold_flow_kg_s",
-                "hot_visc_cP", "cold_visc_cP",
-                "solids_ppm"
-            ])
-
-            fouling = m_foul.predict(features)[0]
-            ttc = max(m_ttc.predict(features)[0], 0)
-            
-            st.session_state.fouling_prediction = fouling
-            st.session_state.ttc_prediction = ttc
-            
-            status = ("🟢 <b>OK</b>" if fouling < 0.60 else
-                      "🟠 <b>Attention</b>" if fouling < 0.85 else
+            ]))
+            try:
+                fouling, ttc = stored_prediction(features)
+            except Exception as e:
+                st.error(f"Erreur lors de la prédiction : {e}")
+                submit = False
+            else:
+                st.session_state.inputs_ml = features
+                st.session_state.fouling_prediction = fouling
+                st.session_state.ttc_prediction = ttc
+
+        if submit or (run_all and st.session_state.fouling_prediction is not None):
+            fouling = st.session_state.fouling_prediction
+            ttc = st.session_state.ttc_prediction
+            status = ("🟢 <b>OK</b>" if fouling < FOULING_WARNING else
+                      "🟠 <b>Attention</b>" if fouling < FOULING_CRITICAL else
                       "🔴 <b>Critique</b>")
             ml_result_card(fouling, ttc, status)
-            
-    except Exception as e:
-        st.error(f"Erreur lors du chargement des modèles: {str(e)}")
-        st.info("Assurez-vous que les fichiers model_fouling.pkl et model_ttc.pkl sont présents.") 
\ No newline at end of file
+
+    batch_scoring_ui(tabs[1], m_foul, m_ttc)
+    monitor_ui(tabs[2])
+    schedule_ui(tabs[3], m_foul, m_ttc)
+    sensitivity_ui(tabs[4], m_foul, m_ttc)
+
+    with st.expander("Modèles chargés", expanded=False):
+        st.dataframe(pd.DataFrame(model_stats()), use_container_width=True)
+        stats = cache_stats()
+        st.caption(
+            f"Cache des prédictions : {stats['hits']} trouvées, {stats['misses']} calculées "
+            f"({stats['hit_rate']:.0%}), {stats['size']}/{stats['capacity']} entrées, "
+            f"{stats['evictions']} évincées, {stats['invalidations']} invalidations"
+        )
+ 
\ No newline at end of file
@@ -0,0 +1,47 @@
+import streamlit as st
+import pandas as pd
+import time
+from utils.metrics import BUCKETS, export_errors, prometheus_text, snapshot
+
+def profiling_panel(record: dict | None) -> None:
+    with st.sidebar.expander("🛠️ Profilage", expanded=True):
+        if record:
+            st.markdown(f"**Dernier rerun : {record['total_s']*1000:.1f} ms** ({record['page']})")
+            df = pd.DataFrame(record["timings"])
+            if not df.empty:
+                breakdown = (
+                    df.groupby("name")["seconds"].agg(["count", "sum"])
+                    .rename(columns={"count": "appels", "sum": "ms"})
+                    .sort_values("ms", ascending=False)
+                )
+                breakdown["ms"] *= 1000
+                st.dataframe(breakdown.round(2), use_container_width=True)
+
+        error = export_errors()
+        if error:
+            st.warning(f"Export des métriques en échec ({time.strftime('%H:%M:%S', time.localtime(error[0]))}) : {error[1]}")
+        stats = snapshot()
+        if not stats:
+            return
+        rows = [
+            {"name": name, "appels": h["count"], "total_ms": h["sum"]*1000, "moyenne_ms": h["sum"]/h["count"]*1000}
+            for name, h in stats.items()
+        ]
+        st.markdown("**Cumul depuis le démarrage du serveur**")
+        st.dataframe(
+            pd.DataFrame(rows).sort_values("total_ms", ascending=False).round(2),
+            hide_index=True, use_container_width=True,
+        )
+        name = st.selectbox("Histogramme", sorted(stats), key="profiling_metric")
+        h = stats[name]
+        # Stored buckets are cumulative; the chart shows counts per interval.
+        counts = [h["buckets"][0]] + [b - a for a, b in zip(h["buckets"], h["buckets"][1:])]
+        counts.append(h["count"] - h["buckets"][-1])
+        labels = [f"≤ {b:g} s" for b in BUCKETS] + [f"> {BUCKETS[-1]:g} s"]
+        st.bar_chart(pd.DataFrame({"appels": counts}, index=pd.Index(labels, name="durée")), sort=False)
+        st.download_button(
+            "📈 Métriques (Prometheus)",
+            data=prometheus_text(),
+            file_name="hx_metrics.prom",
+            mime="text/plain",
+        )
@@ -1,41 +1,79 @@
 import streamlit as st
 import pandas as pd
-from utils.pdf_report import generate_pdf_report
+import os
+from utils.pdf_report import cached_pdf_report, report_values
+from utils.bulk_reports import CASE_COLUMNS, write_reports_zip
+from utils.rating import read_cases
+from ui.jobs import file_data, job_result, new_output, start_job
+from utils.jobs import WORKERS_PER_JOB
 
-def summary_section(run_all: bool) -> None:
-    st.subheader("Résumé Complet")
-    if run_all and st.session_state.inputs_geometry and st.session_state.inputs_pntu:
-        g = st.session_state.inputs_geometry
-        p = st.session_state.inputs_pntu
-        data = {
-            "Paramètre": [
-                "Do [m]", "pitch [m]", "angle [°]", "Ntp", "N", "Matériau", "L_unsupported [m]",
-                "DB_Perry [m]", "N_Perry", "DB_HEDH [m]", "DB_Phadkeb [m]", "DB_VDI [m]",
-                "DShell_min [m]", "Clearance auto [m]", "dB_hole [m]", "L_max [m]",
-                "Débit m1 [kg/s]", "Cp1 [J/kg.K]", "T1 entrée [°C]",
-                "Débit m2 [kg/s]", "Cp2 [J/kg.K]", "T2 entrée [°C]",
-                "UA [W/K]", "Subtype HX", "Ntp (P-NTU)",
-            ],
-            "Valeur": [
-                g["Do"], g["pitch"], g["angle"], g["Ntp"], g["N"], g["material"], g["L_unsupported"],
-                st.session_state.DB_Perry, st.session_state.N_Perry, st.session_state.DB_HEDH,
-                st.session_state.DB_Phadkeb, st.session_state.DB_VDI, st.session_state.DShell_min,
-                st.session_state.clearance_auto, st.session_state.dB_hole, st.session_state.L_max,
-                p["m1"], p["Cp1"], p["T1i"], p["m2"], p["Cp2"], p["T2i"], p["UA"], p["subtype"], p["Ntp"],
-            ],
-        }
+def bulk_reports_ui(tab) -> None:
+    with tab:
+        st.markdown(
+            "Table de conceptions (CSV ou Parquet), une ligne par échangeur, avec les colonnes "
+            f"`{'`, `'.join(CASE_COLUMNS)}` (passes P-NTU : `Ntp_pntu`) et, en option, `DShell` "
+            "et les features ML. Les colonnes absentes prennent les valeurs par défaut des formulaires. "
+            "Chaque rapport est produit dans un processus séparé puis ajouté à une archive ZIP."
+        )
+        with st.form("bulk_reports_form"):
+            uploaded = st.file_uploader("Conceptions", type=["csv", "parquet", "pq"])
+            workers = st.number_input(
+                "Processus", 1, WORKERS_PER_JOB, WORKERS_PER_JOB,
+                help="Nombre de rapports générés en parallèle (plafonné par tâche pour partager le serveur)."
+            )
+            submit = st.form_submit_button("Générer les rapports")
+        if submit and uploaded is not None:
+            try:
+                designs = read_cases(uploaded, uploaded.name)
+            except Exception as e:
+                st.error(f"Erreur lors de la lecture : {e}")
+                return
+            output_path = new_output("bulk_reports_output", "hx_rapports_", ".zip")
+            start_job("bulk_reports_job", "bulk_reports", write_reports_zip,
+                      designs, output_path, workers=int(workers), outputs=(output_path,))
+        result = job_result("bulk_reports_job", "Génération des rapports")
+        if result is not None:
+            st.session_state.bulk_reports = result
+        summary = st.session_state.get("bulk_reports")
+        if summary and os.path.exists(summary["output_path"]):
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Rapports", f"{summary['reports']:,}")
+            c2.metric("Erreurs", f"{summary['errors']:,}")
+            c3.metric("Débit", f"{summary['reports_per_s']:,.1f} rapports/s")
+            c4.metric("Durée", f"{summary['seconds']:.2f} s")
+            st.dataframe(pd.DataFrame(summary["manifest"]), use_container_width=True)
+            st.download_button(
+                label="📦 Télécharger l'archive ZIP",
+                data=file_data(summary["output_path"]),
+                file_name="rapports_echangeurs.zip",
+                mime="application/zip",
+            )
+
+def summary_view(run_all: bool) -> None:
+    # Built by the "Calculer tout" pipeline in app.py.
+    data = st.session_state.summary_table
+    if run_all and data is not None:
         df = pd.DataFrame(data)
         st.dataframe(df, use_container_width=True)
         st.markdown("""
         <br/>
         <b>Générez un rapport PDF de ce résumé :</b>
         """, unsafe_allow_html=True)
-        pdf_buffer = generate_pdf_report()
+        # The PDF is built only when the button is clicked, from a snapshot
+        # of the current values, and reused while they stay the same.
+        values = report_values(st.session_state)
         st.download_button(
             label="📄 Télécharger le PDF du Résumé",
-            data=pdf_buffer,
+            data=lambda: cached_pdf_report(values),
             file_name="resume_echangeur.pdf",
             mime="application/pdf"
         )
     else:
-        st.info("Cliquez sur 'Calculer tout' pour générer le résumé complet.") 
\ No newline at end of file
+        st.info("Cliquez sur 'Calculer tout' pour générer le résumé complet.")
+
+def summary_section(run_all: bool) -> None:
+    st.subheader("Résumé Complet")
+    tabs = st.tabs(["Résumé", "Rapports par lot"])
+    with tabs[0]:
+        summary_view(run_all)
+    bulk_reports_ui(tabs[1])
@@ -0,0 +1,101 @@
+import time
+import pandas as pd
+from utils.models import FEATURE_COLUMNS, STATUS_LABELS, fouling_status, predict_fouling_ttc
+
+CHUNK_ROWS = 50_000
+
+
+def detect_format(filename: str) -> str:
+    return "parquet" if filename.lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def iter_chunks(source, fmt: str, chunk_rows: int = CHUNK_ROWS):
+    # Yields (chunk, fraction_done). Only one chunk is materialised at a time.
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(source)
+        total = pf.metadata.num_rows or 1
+        done = 0
+        for batch in pf.iter_batches(batch_size=chunk_rows):
+            done += batch.num_rows
+            yield batch.to_pandas(), done / total
+    else:
+        size = None
+        if hasattr(source, "seek") and hasattr(source, "tell"):
+            source.seek(0, 2)
+            size = source.tell() or None
+            source.seek(0)
+        for chunk in pd.read_csv(source, chunksize=chunk_rows):
+            # The CSV reader buffers ahead, so this is an approximation.
+            yield chunk, min(source.tell() / size, 1.0) if size else None
+
+
+def score_chunk(chunk: pd.DataFrame, m_foul, m_ttc) -> pd.DataFrame:
+    missing = [c for c in FEATURE_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes : {', '.join(missing)}")
+    fouling, ttc = predict_fouling_ttc(chunk, m_foul, m_ttc)
+    out = chunk.copy()
+    out["fouling_prediction"] = fouling
+    out["ttc_prediction"] = ttc
+    out["status"] = fouling_status(fouling)
+    return out
+
+
+class _CsvSink:
+    def __init__(self, path: str):
+        self.path = path
+        self.header = True
+
+    def write(self, df: pd.DataFrame) -> None:
+        df.to_csv(self.path, mode="w" if self.header else "a", header=self.header, index=False)
+        self.header = False
+
+    def close(self) -> None:
+        if self.header:
+            pd.DataFrame(columns=FEATURE_COLUMNS).to_csv(self.path, index=False)
+
+
+class _ParquetSink:
+    def __init__(self, path: str):
+        self.path = path
+        self.writer = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+def score_file(source, output_path: str, m_foul, m_ttc, fmt: str = "csv",
+               chunk_rows: int = CHUNK_ROWS, progress=None) -> dict:
+    sink = _ParquetSink(output_path) if fmt == "parquet" else _CsvSink(output_path)
+    counts = dict.fromkeys(STATUS_LABELS, 0)
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for chunk, fraction in iter_chunks(source, fmt, chunk_rows):
+            scored = score_chunk(chunk, m_foul, m_ttc)
+            sink.write(scored)
+            rows += len(scored)
+            for label, n in scored["status"].value_counts().items():
+                counts[label] += int(n)
+            if progress is not None:
+                progress(fraction, rows)
+    finally:
+        sink.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_s": rows / elapsed if elapsed > 0 else 0.0,
+        "status_counts": counts,
+        "output_path": output_path,
+    }
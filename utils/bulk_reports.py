@@ -0,0 +1,126 @@
+import csv
+import io
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import pandas as pd
+from utils.calc import CLEARANCE_DEFAULTS, GEOMETRY_DEFAULTS, ML_DEFAULTS, PNTU_DEFAULTS
+from utils.engine import PNTU_COLUMNS
+from utils.pipeline import STAGES, run_pipeline
+
+# A design case is one row: geometry columns as in the geometry form, P-NTU
+# columns as in the P-NTU form (its pass count is `Ntp_pntu`, `Ntp` being the
+# geometry one), optional `DShell` and ML feature columns. Missing columns
+# take the form defaults; ML is skipped unless every feature is given.
+CASE_COLUMNS = ["name", *GEOMETRY_DEFAULTS, *PNTU_COLUMNS]
+MANIFEST_NAME = "rapports.csv"
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name).strip("._") or "design"
+
+
+def case_state(case: dict) -> dict:
+    g = {k: case.get(k, v) for k, v in GEOMETRY_DEFAULTS.items()}
+    g["angle"], g["Ntp"], g["N"] = int(g["angle"]), int(g["Ntp"]), int(g["N"])
+    p = {k: case.get(col, PNTU_DEFAULTS[k]) for col, k in PNTU_COLUMNS.items()}
+    p["Ntp"] = int(p["Ntp"])
+    state = {"inputs_geometry": g, "inputs_pntu": p}
+    if "DShell" in case:
+        state["inputs_clearance"] = {"mode": "Diamètre calandre", "DBundle": None, "DShell": case["DShell"]}
+    else:
+        state["inputs_clearance"] = dict(CLEARANCE_DEFAULTS)
+    if all(k in case for k in ML_DEFAULTS):
+        state["inputs_ml"] = {k: case[k] for k in ML_DEFAULTS}
+    return state
+
+
+def render_case(name: str, case: dict) -> dict:
+    # Runs in a worker process: same stages as "Calculer tout", then the PDF.
+    from utils.pdf_report import generate_pdf_report, report_values
+    start = time.perf_counter()
+    state = case_state(case)
+    stages = [s for s in STAGES if s.name != "ml" or "inputs_ml" in state]
+    errors = [f"{t['stage']} : {t['error']}" for t in run_pipeline(state, stages) if t["error"]]
+    pdf = None
+    if not errors:
+        try:
+            pdf = generate_pdf_report(report_values(state)).getvalue()
+        except Exception as e:
+            errors.append(f"PDF : {e}")
+    return {
+        "name": name,
+        "pdf": pdf,
+        "seconds": time.perf_counter() - start,
+        "error": "; ".join(errors),
+    }
+
+
+def iter_cases(df: pd.DataFrame):
+    seen = set()
+    for i, row in enumerate(df.to_dict("records")):
+        row = {k: v for k, v in row.items() if not (isinstance(v, float) and pd.isna(v))}
+        name = _safe_name(str(row.pop("name", f"design_{i + 1:04d}")))
+        # Duplicate names would overwrite each other in the archive.
+        if name in seen:
+            name = f"{name}_{i + 1}"
+        seen.add(name)
+        yield name, row
+
+
+def write_reports_zip(df: pd.DataFrame, output_path: str, workers: int | None = None,
+                      progress=None) -> dict:
+    workers = workers or os.cpu_count() or 1
+    total = len(df)
+    manifest = []
+    start = time.perf_counter()
+
+    with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        def write(result):
+            # Each PDF goes into the archive as soon as it is done and is
+            # then dropped, so memory holds at most the in-flight reports.
+            if result["pdf"] is not None:
+                zf.writestr(f"{result['name']}.pdf", result["pdf"])
+            manifest.append({
+                "name": result["name"],
+                "seconds": round(result["seconds"], 4),
+                "bytes": len(result["pdf"]) if result["pdf"] is not None else 0,
+                "error": result["error"],
+            })
+            if progress is not None:
+                progress(len(manifest)/total)
+
+        if workers == 1:
+            for name, case in iter_cases(df):
+                write(render_case(name, case))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = set()
+                for name, case in iter_cases(df):
+                    pending.add(pool.submit(render_case, name, case))
+                    if len(pending) >= 2*workers:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for f in finished:
+                            write(f.result())
+                for f in pending:
+                    write(f.result())
+
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=["name", "seconds", "bytes", "error"])
+        writer.writeheader()
+        writer.writerows(manifest)
+        zf.writestr(MANIFEST_NAME, buf.getvalue())
+
+    elapsed = time.perf_counter() - start
+    errors = sum(1 for m in manifest if m["error"])
+    return {
+        "reports": total - errors,
+        "errors": errors,
+        "workers": workers,
+        "seconds": elapsed,
+        "reports_per_s": total/elapsed if elapsed > 0 else 0.0,
+        "manifest": manifest,
+        "output_path": output_path,
+    }
@@ -0,0 +1,140 @@
+from ht.hx import (
+    size_bundle_from_tubecount, Ntubes, DBundle_for_Ntubes_HEDH, DBundle_for_Ntubes_Phadkeb,
+    D_for_Ntubes_VDI, DBundle_min, shell_clearance, D_baffle_holes, L_unsupported_max, P_NTU_method,
+)
+from utils.metrics import instrument
+
+# Form defaults, shared by the section forms and by the pipeline when a
+# section has never been submitted in this session.
+GEOMETRY_DEFAULTS = {
+    "Do": 0.025,
+    "pitch": 0.03125,
+    "angle": 30,
+    "Ntp": 2,
+    "N": 928,
+    "material": "CS",
+    "L_unsupported": 0.75,
+}
+CLEARANCE_DEFAULTS = {
+    "mode": "Diamètre faisceau",
+    "DBundle": None,
+    "DShell": 1.25,
+}
+PNTU_DEFAULTS = {
+    "m1": 5.2,
+    "Cp1": 1860.0,
+    "T1i": 130.0,
+    "m2": 1.45,
+    "Cp2": 1900.0,
+    "T2i": 15.0,
+    "UA": 3000.0,
+    "subtype": "E",
+    "Ntp": 2,
+}
+ML_DEFAULTS = {
+    "runtime_since_cleaning_hr": 100,
+    "deltaT_hot_C": 18.0,
+    "deltaT_cold_C": 16.0,
+    "deltaP_shell_kPa": 20.0,
+    "hot_inlet_temp_C": 140,
+    "cold_inlet_temp_C": 30,
+    "hot_flow_kg_s": 15.0,
+    "cold_flow_kg_s": 15.0,
+    "hot_visc_cP": 0.4,
+    "cold_visc_cP": 0.9,
+    "solids_ppm": 50,
+}
+# Bounds of the ML form controls.
+ML_RANGES = {
+    "runtime_since_cleaning_hr": (0, 7*365*24),
+    "deltaT_hot_C": (0.0, 40.0),
+    "deltaT_cold_C": (0.0, 40.0),
+    "deltaP_shell_kPa": (0.0, 150.0),
+    "hot_inlet_temp_C": (80, 180),
+    "cold_inlet_temp_C": (5, 70),
+    "hot_flow_kg_s": (5.0, 30.0),
+    "cold_flow_kg_s": (5.0, 30.0),
+    "hot_visc_cP": (0.1, 10.0),
+    "cold_visc_cP": (0.1, 10.0),
+    "solids_ppm": (0, 300),
+}
+
+
+def validate_geometry(g: dict) -> str | None:
+    error = None
+    if g["pitch"] <= g["Do"]:
+        error = "Le pas triangulaire doit être supérieur au diamètre extérieur du tube."
+    if g["L_unsupported"] < 0.1 or g["L_unsupported"] > 10.0:
+        error = "La longueur non supportée doit être comprise entre 0.1 m et 10 m."
+    if g["N"] < 1:
+        error = "Le nombre de tubes doit être au moins 1."
+    return error
+
+
+@instrument("ht.geometry")
+def compute_geometry(g: dict) -> dict:
+    Do, pitch, angle, Ntp, N = g["Do"], g["pitch"], g["angle"], g["Ntp"], g["N"]
+    DB_Perry = size_bundle_from_tubecount(N, Do, pitch, Ntp, angle)
+    DB_HEDH = DBundle_for_Ntubes_HEDH(N, Do, pitch, angle)
+    return {
+        "DB_Perry": DB_Perry,
+        "N_Perry": Ntubes(DB_Perry, Do, pitch, Ntp, angle),
+        "DB_HEDH": DB_HEDH,
+        "DB_Phadkeb": DBundle_for_Ntubes_Phadkeb(N, Do, pitch, Ntp, angle),
+        "DB_VDI": D_for_Ntubes_VDI(N, Ntp, Do, pitch, angle),
+        "DShell_min": DBundle_min(Do),
+        "clearance_auto": shell_clearance(DBundle=DB_HEDH),
+        "dB_hole": D_baffle_holes(Do, g["L_unsupported"]),
+        "L_max": L_unsupported_max(Do, g["material"]),
+    }
+
+
+@instrument("ht.shell_clearance")
+def compute_clearance(c: dict) -> float:
+    if c["mode"] == "Diamètre faisceau":
+        return shell_clearance(DBundle=c["DBundle"])
+    return shell_clearance(DShell=c["DShell"])
+
+
+@instrument("ht.P_NTU_method")
+def compute_pntu(p: dict) -> dict:
+    return P_NTU_method(
+        p["m1"],
+        p["m2"],
+        p["Cp1"],
+        p["Cp2"],
+        T1i=p["T1i"],
+        T2i=p["T2i"],
+        UA=p["UA"],
+        subtype=p["subtype"],
+        Ntp=p["Ntp"],
+    )
+
+
+@instrument("model.predict")
+def predict_fouling(features: dict, m_foul, m_ttc) -> tuple[float, float]:
+    from utils.models import predict_fouling_ttc
+    fouling, ttc = predict_fouling_ttc(features, m_foul, m_ttc)
+    return fouling[0], ttc[0]
+
+
+def summary_table(values: dict) -> dict:
+    g = values["inputs_geometry"]
+    p = values["inputs_pntu"]
+    return {
+        "Paramètre": [
+            "Do [m]", "pitch [m]", "angle [°]", "Ntp", "N", "Matériau", "L_unsupported [m]",
+            "DB_Perry [m]", "N_Perry", "DB_HEDH [m]", "DB_Phadkeb [m]", "DB_VDI [m]",
+            "DShell_min [m]", "Clearance auto [m]", "dB_hole [m]", "L_max [m]",
+            "Débit m1 [kg/s]", "Cp1 [J/kg.K]", "T1 entrée [°C]",
+            "Débit m2 [kg/s]", "Cp2 [J/kg.K]", "T2 entrée [°C]",
+            "UA [W/K]", "Subtype HX", "Ntp (P-NTU)",
+        ],
+        "Valeur": [
+            g["Do"], g["pitch"], g["angle"], g["Ntp"], g["N"], g["material"], g["L_unsupported"],
+            values["DB_Perry"], values["N_Perry"], values["DB_HEDH"],
+            values["DB_Phadkeb"], values["DB_VDI"], values["DShell_min"],
+            values["clearance_auto"], values["dB_hole"], values["L_max"],
+            p["m1"], p["Cp1"], p["T1i"], p["m2"], p["Cp2"], p["T2i"], p["UA"], p["subtype"], p["Ntp"],
+        ],
+    }
@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from utils.calc import GEOMETRY_DEFAULTS
+from utils.engine import PNTU_COLUMNS, evaluate_case
+
+# Batch runner over utils/engine.py, without Streamlit:
+#   python -m utils.cli cases.csv -o results.parquet --workers 8
+# Sections run when their columns are present in the case file (or as
+# given by --sections); results are appended as new columns plus `error`.
+SECTIONS = ("geometry", "clearance", "pntu", "ml")
+CHUNK_SIZE = 500
+
+
+def read_table(path: str) -> pd.DataFrame:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".parquet", ".pq"):
+        return pd.read_parquet(path)
+    if ext == ".jsonl":
+        return pd.read_json(path, lines=True)
+    if ext == ".json":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get("cases", [data])
+        return pd.DataFrame(data)
+    return pd.read_csv(path)
+
+
+def write_table(df: pd.DataFrame, path: str) -> None:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".parquet", ".pq"):
+        df.to_parquet(path, index=False)
+    elif ext == ".jsonl":
+        df.to_json(path, orient="records", lines=True, force_ascii=False)
+    elif ext == ".json":
+        df.to_json(path, orient="records", indent=1, force_ascii=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def detect_sections(columns) -> list[str]:
+    from utils.models import FEATURE_COLUMNS
+    cols = set(columns)
+    found = []
+    if cols & set(GEOMETRY_DEFAULTS):
+        found.append("geometry")
+    if cols & {"DBundle", "DShell"}:
+        found.append("clearance")
+    if cols & set(PNTU_COLUMNS):
+        found.append("pntu")
+    if cols >= set(FEATURE_COLUMNS):
+        found.append("ml")
+    return found
+
+
+def run_chunk(chunk: pd.DataFrame, sections: list[str]) -> pd.DataFrame:
+    # Runs in a worker process. The physics sections go row by row; the ML
+    # models score the whole chunk in one predict call.
+    row_sections = [s for s in sections if s != "ml"]
+    rows = []
+    for case in chunk.to_dict("records"):
+        case = {k: v for k, v in case.items() if not (isinstance(v, float) and pd.isna(v))}
+        rows.append(evaluate_case(case, row_sections))
+    out = pd.DataFrame(rows, index=chunk.index)
+    if "ml" in sections:
+        from utils.batch_scoring import score_chunk
+        from utils.models import get_models
+        try:
+            scored = score_chunk(chunk, *get_models())
+            for col in ("fouling_prediction", "ttc_prediction", "status"):
+                out[col] = scored[col].to_numpy()
+        except Exception as e:
+            msg = f"ml: {type(e).__name__}: {e}"
+            out["error"] = [f"{err}; {msg}" if err else msg for err in out["error"]]
+    return out
+
+
+def run_cases(df: pd.DataFrame, sections: list[str], workers: int | None = None,
+              chunk_size: int = CHUNK_SIZE, progress=None) -> tuple[pd.DataFrame, dict]:
+    cases = df.reset_index(drop=True)
+    workers = workers or os.cpu_count() or 1
+    chunks = [cases.iloc[i:i + chunk_size] for i in range(0, len(cases), chunk_size)]
+    start = time.perf_counter()
+    parts = []
+    if workers == 1 or len(chunks) <= 1:
+        for k, chunk in enumerate(chunks):
+            parts.append(run_chunk(chunk, sections))
+            if progress is not None:
+                progress((k + 1)/len(chunks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_chunk, chunk, sections) for chunk in chunks]
+            # Collected in submission order, so rows keep the input order.
+            for k, future in enumerate(futures):
+                parts.append(future.result())
+                if progress is not None:
+                    progress((k + 1)/len(chunks))
+    elapsed = time.perf_counter() - start
+    results = pd.concat(parts) if parts else pd.DataFrame(columns=["error"])
+    out = pd.concat([cases.drop(columns=[c for c in results.columns if c in cases.columns]), results], axis=1)
+    stats = {
+        "cases": len(out),
+        "errors": int((out["error"] != "").sum()) if len(out) else 0,
+        "sections": sections,
+        "workers": workers,
+        "seconds": elapsed,
+        "cases_per_s": len(out)/elapsed if elapsed > 0 else 0.0,
+    }
+    return out, stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.cli",
+        description="Évalue un fichier de cas (JSON, JSONL, CSV ou Parquet) sans Streamlit.",
+    )
+    parser.add_argument("input", help="Fichier de cas")
+    parser.add_argument("-o", "--output", required=True, help="Fichier de résultats (format selon l'extension)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Processus (défaut : nombre de CPU)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Cas par bloc envoyé à un processus")
+    parser.add_argument("--sections", nargs="+", choices=SECTIONS, default=None,
+                        help="Sections à calculer (défaut : selon les colonnes présentes)")
+    args = parser.parse_args(argv)
+
+    df = read_table(args.input)
+    sections = args.sections or detect_sections(df.columns)
+    if not sections:
+        parser.error("aucune colonne reconnue dans le fichier de cas")
+
+    def progress(fraction):
+        print(f"\r{fraction:6.1%}", end="", file=sys.stderr, flush=True)
+
+    results, stats = run_cases(df, sections, workers=args.workers, chunk_size=args.chunk_size,
+                               progress=progress)
+    print(file=sys.stderr)
+    write_table(results, args.output)
+    print(
+        f"{stats['cases']} cas ({', '.join(sections)}) en {stats['seconds']:.2f} s "
+        f"({stats['cases_per_s']:,.0f} cas/s, {stats['workers']} processus), "
+        f"{stats['errors']} erreur(s) -> {args.output}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
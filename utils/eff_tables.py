@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
+import ht
+from ht import hx
+from utils.effectiveness_np import vectorized
+
+# Precomputed P1(R1, NTU1) surfaces, one per exchanger configuration.
+# Each table is a GRID_SIZE x GRID_SIZE float32 array on a log-spaced grid
+# covering the effectiveness page input ranges, saved as .npy under
+# TABLE_DIR and memory-mapped on load. Lookups interpolate bilinearly in
+# (log R1, log NTU1); the error is measured against the exact relation at
+# every cell centre when the table is built and stored alongside it. A
+# table whose measured error exceeds MAX_ERROR is never used for lookups.
+TABLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "eff_tables")
+GRID_SIZE = 512
+R1_RANGE = (0.01, 10.0)
+NTU_RANGE = (0.01, 20.0)
+MAX_ERROR = 1e-4
+
+_lock = threading.Lock()
+_tables: dict[str, "EffectivenessTable"] = {}
+_key_locks: dict[str, threading.Lock] = {}
+_building: set[str] = set()
+_failed: set[str] = set()
+
+
+def _key(func, kwargs: dict) -> str:
+    spec = {
+        "func": func.__name__,
+        "kwargs": {k: kwargs[k] for k in sorted(kwargs)},
+        "grid": [GRID_SIZE, R1_RANGE, NTU_RANGE],
+        "ht": ht.__version__,
+    }
+    digest = hashlib.sha1(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"{func.__name__}-{digest}"
+
+
+class EffectivenessTable:
+    def __init__(self, func, kwargs: dict, values: np.ndarray, max_error: float):
+        self.func = func
+        self.kwargs = kwargs
+        self.values = values
+        self.max_error = max_error
+        self.log_r = np.log(R1_RANGE[0]), np.log(R1_RANGE[1])
+        self.log_t = np.log(NTU_RANGE[0]), np.log(NTU_RANGE[1])
+        self.usable = max_error <= MAX_ERROR
+
+    @staticmethod
+    def grid():
+        return np.geomspace(*R1_RANGE, GRID_SIZE), np.geomspace(*NTU_RANGE, GRID_SIZE)
+
+    def _interpolate(self, R1, NTU1):
+        n = GRID_SIZE - 1
+        u = (np.log(R1) - self.log_r[0])/(self.log_r[1] - self.log_r[0])*n
+        v = (np.log(NTU1) - self.log_t[0])/(self.log_t[1] - self.log_t[0])*n
+        i = np.clip(np.floor(u).astype(np.intp), 0, n - 1)
+        j = np.clip(np.floor(v).astype(np.intp), 0, n - 1)
+        fu = u - i
+        fv = v - j
+        T = self.values
+        return ((1 - fu)*(1 - fv)*T[i, j] + fu*(1 - fv)*T[i + 1, j]
+                + (1 - fu)*fv*T[i, j + 1] + fu*fv*T[i + 1, j + 1])
+
+    def lookup(self, R1, NTU1, exact: bool = False):
+        R1, NTU1 = np.broadcast_arrays(np.asarray(R1, dtype=float), np.asarray(NTU1, dtype=float))
+        if exact or not self.usable:
+            return vectorized(self.func)(R1, NTU1, **self.kwargs)
+        inside = ((R1 >= R1_RANGE[0]) & (R1 <= R1_RANGE[1])
+                  & (NTU1 >= NTU_RANGE[0]) & (NTU1 <= NTU_RANGE[1]))
+        P1 = np.full(R1.shape, np.nan)
+        if inside.any():
+            P1[inside] = self._interpolate(R1[inside], NTU1[inside])
+        # Out of range, or a cell touching a point where the correlation
+        # itself is undefined: evaluate the exact relation instead.
+        fallback = ~np.isfinite(P1)
+        if fallback.any():
+            P1[fallback] = vectorized(self.func)(R1[fallback], NTU1[fallback], **self.kwargs)
+        return P1[()] if P1.ndim == 0 else P1
+
+
+def build_table(func, **kwargs) -> EffectivenessTable:
+    r, t = EffectivenessTable.grid()
+    R1, NTU1 = np.meshgrid(r, t, indexing="ij")
+    values = np.asarray(vectorized(func)(R1, NTU1, **kwargs), dtype=np.float32)
+    table = EffectivenessTable(func, kwargs, values, 0.0)
+    # Cell centres are the worst case for bilinear interpolation.
+    rm = np.sqrt(r[:-1]*r[1:])
+    tm = np.sqrt(t[:-1]*t[1:])
+    R1m, NTU1m = np.meshgrid(rm, tm, indexing="ij")
+    exact = np.asarray(vectorized(func)(R1m, NTU1m, **kwargs))
+    approx = table._interpolate(R1m, NTU1m)
+    err = np.abs(exact - approx)
+    table.max_error = float(np.max(err[np.isfinite(err)])) if np.isfinite(err).any() else 0.0
+    table.usable = table.max_error <= MAX_ERROR
+    return table
+
+
+def _save(key: str, table: EffectivenessTable) -> None:
+    os.makedirs(TABLE_DIR, exist_ok=True)
+    tmp = os.path.join(TABLE_DIR, f"{key}.tmp.npy")
+    np.save(tmp, table.values)
+    os.replace(tmp, os.path.join(TABLE_DIR, f"{key}.npy"))
+    meta = {
+        "func": table.func.__name__,
+        "kwargs": table.kwargs,
+        "grid_size": GRID_SIZE,
+        "R1_range": R1_RANGE,
+        "NTU_range": NTU_RANGE,
+        "max_error": table.max_error,
+        "ht": ht.__version__,
+    }
+    with open(os.path.join(TABLE_DIR, f"{key}.json"), "w") as f:
+        json.dump(meta, f, indent=2, default=str)
+
+
+def _load(key: str, func, kwargs: dict):
+    path = os.path.join(TABLE_DIR, f"{key}.npy")
+    meta_path = os.path.join(TABLE_DIR, f"{key}.json")
+    if not (os.path.exists(path) and os.path.exists(meta_path)):
+        return None
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        values = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if values.shape != (GRID_SIZE, GRID_SIZE):
+        return None
+    return EffectivenessTable(func, kwargs, values, meta["max_error"])
+
+
+def _key_lock(key: str) -> threading.Lock:
+    with _lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def get_table(func, **kwargs) -> EffectivenessTable:
+    # Loads or builds the table. Only callers of the same configuration wait
+    # on each other.
+    key = _key(func, kwargs)
+    table = _tables.get(key)
+    if table is not None:
+        return table
+    with _key_lock(key):
+        table = _tables.get(key) or _load(key, func, kwargs)
+        if table is None:
+            table = build_table(func, **kwargs)
+            try:
+                _save(key, table)
+            except OSError:
+                pass
+        _tables[key] = table
+    return table
+
+
+def _build(key: str, func, kwargs: dict) -> None:
+    try:
+        get_table(func, **kwargs)
+    except Exception:
+        with _lock:
+            _failed.add(key)
+    finally:
+        with _lock:
+            _building.discard(key)
+
+
+def ready_table(func, **kwargs) -> EffectivenessTable | None:
+    # The table if it is in memory or on disk. Otherwise None, and the table
+    # is built in a background thread (crossflow takes several seconds)
+    # instead of holding up the page that asked for it.
+    key = _key(func, kwargs)
+    table = _tables.get(key)
+    if table is not None:
+        return table
+    lock = _key_lock(key)
+    if not lock.acquire(blocking=False):
+        return None
+    try:
+        table = _load(key, func, kwargs)
+        if table is not None:
+            _tables[key] = table
+            return table
+    finally:
+        lock.release()
+    with _lock:
+        if key in _building or key in _failed:
+            return None
+        _building.add(key)
+    threading.Thread(target=_build, args=(key, func, kwargs), name=f"hx-eff-table-{key}", daemon=True).start()
+    return None
+
+
+def effectiveness(func, R1, NTU1, exact: bool = False, **kwargs):
+    # The exact relation until the table is available.
+    table = ready_table(func, **kwargs)
+    if table is None:
+        R1, NTU1 = np.broadcast_arrays(np.asarray(R1, dtype=float), np.asarray(NTU1, dtype=float))
+        return vectorized(func)(R1, NTU1, **kwargs)
+    return table.lookup(R1, NTU1, exact=exact)
+
+
+# The configurations reachable from the effectiveness page.
+STANDARD_CONFIGS = (
+    [(hx.temperature_effectiveness_basic, {"subtype": s}) for s in (
+        "counterflow", "parallel", "crossflow",
+        "crossflow, mixed 1", "crossflow, mixed 2", "crossflow, mixed 1&2")]
+    + [(hx.temperature_effectiveness_TEMA_E, {"Ntp": n, "optimal": o})
+       for n in (1, 2, 3, 4) for o in (True, False)]
+    + [(f, {"Ntp": n, "optimal": o})
+       for f in (hx.temperature_effectiveness_TEMA_G, hx.temperature_effectiveness_TEMA_H)
+       for n in (1, 2) for o in (True, False)]
+    + [(hx.temperature_effectiveness_TEMA_J, {"Ntp": n}) for n in (1, 2, 4)]
+    + [(hx.temperature_effectiveness_plate, {"Np1": a, "Np2": b, "counterflow": c, "passes_counterflow": pc})
+       for a in range(1, 5) for b in range(1, 5) for c in (True, False) for pc in (True, False)
+       if (a, b) not in ((3, 3), (3, 4), (4, 3), (4, 4))]
+    + [(hx.temperature_effectiveness_air_cooler, {"rows": r, "passes": p})
+       for r in range(1, 7) for p in range(1, 6)]
+)
+
+
+def build_all(configs=STANDARD_CONFIGS) -> list:
+    report = []
+    for func, kwargs in configs:
+        start = time.perf_counter()
+        table = get_table(func, **kwargs)
+        report.append((func.__name__, kwargs, table.max_error, time.perf_counter() - start))
+    return report
+
+
+if __name__ == "__main__":
+    worst = 0.0
+    for name, kwargs, err, seconds in build_all():
+        if err <= MAX_ERROR:
+            worst = max(worst, err)
+            note = ""
+        else:
+            note = " -> exact fallback"
+        print(f"{name} {kwargs} max_error={err:.2e} ({seconds:.2f} s){note}")
+    print(f"worst tabulated max_error={worst:.2e} (bound {MAX_ERROR:.0e})")
@@ -0,0 +1,494 @@
+import sys
+import numpy as np
+from numpy import exp, tanh
+from ht import hx
+
+# Array-native ports of the ht.hx epsilon-NTU relations used by the
+# effectiveness page. Signatures mirror ht.hx so the kernels are drop-in
+# replacements; R1 and NTU1 may be scalars or broadcastable arrays while the
+# configuration arguments (Ntp, optimal, rows, ...) stay scalar.
+# Every kernel matches its scalar ht.hx counterpart to within TOLERANCE
+# (absolute, on P1) -- run `python -m utils.effectiveness_np` to check.
+TOLERANCE = 1e-9
+
+
+def _arrays(R1, NTU1):
+    R1, NTU1 = np.broadcast_arrays(np.asarray(R1, dtype=float), np.asarray(NTU1, dtype=float))
+    return R1, NTU1
+
+
+def _result(P1):
+    return P1[()] if P1.ndim == 0 else P1
+
+
+def P_NTU_Pc(x, y):
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        term = exp(-x*(1. - y))
+        den = 1. - y*term
+        return np.where(den == 0.0, x/(1. + x), (1. - term)/den)
+
+
+def P_NTU_Pp(x, y):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(y == -1.0, x, (1. - exp(-x*(1. + y)))/(1. + y))
+
+
+def _crossflow(R1, NTU1):
+    # Unmixed/unmixed crossflow as the double series of Mason (1954):
+    # P1 = 1/(R1*NTU1) * sum_n gammainc(n+1, NTU1)*gammainc(n+1, R1*NTU1),
+    # equivalent to the Bessel integral ht.hx evaluates with quad.
+    from scipy.special import gammainc
+    x1 = NTU1
+    x2 = R1*NTU1
+    lo = np.minimum(x1, x2)
+    lo_max = float(lo.max()) if lo.size else 0.0
+    n_terms = int(lo_max + 12.*lo_max**0.5 + 40)
+    total = np.zeros_like(x1)
+    for n in range(n_terms):
+        total += gammainc(n + 1., x1)*gammainc(n + 1., x2)
+    return total/x2
+
+
+def temperature_effectiveness_basic(R1, NTU1, subtype="crossflow"):
+    R1, NTU1 = _arrays(R1, NTU1)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        if subtype == "counterflow":
+            e = exp(-NTU1*(1 - R1))
+            P1 = np.where(R1 == 1.0, NTU1/(NTU1 + 1.0), (1.0 - e)/(1.0 - R1*e))
+        elif subtype == "parallel":
+            P1 = (1.0 - exp(-NTU1*(1 + R1)))/(1.0 + R1)
+        elif subtype == "crossflow approximate":
+            P1 = 1.0 - exp(NTU1**0.22/R1*(exp(-R1*NTU1**0.78) - 1.))
+        elif subtype == "crossflow":
+            P1 = _crossflow(R1, NTU1)
+        elif subtype == "crossflow, mixed 1":
+            K = 1 - exp(-R1*NTU1)
+            P1 = 1 - exp(-K/R1)
+        elif subtype == "crossflow, mixed 2":
+            K = 1 - exp(-NTU1)
+            P1 = (1 - exp(-K*R1))/R1
+        elif subtype == "crossflow, mixed 1&2":
+            K1 = 1. - exp(-NTU1)
+            K2 = 1. - exp(-R1*NTU1)
+            P1 = (1./K1 + R1/K2 - 1./NTU1)**-1
+        else:
+            raise ValueError("Subtype not recognized.")
+    return _result(P1)
+
+
+def temperature_effectiveness_TEMA_E(R1, NTU1, Ntp=1, optimal=True):
+    R1, NTU1 = _arrays(R1, NTU1)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        if Ntp == 1:
+            e = exp(-NTU1*(1 - R1))
+            P1 = np.where(R1 != 1, (1 - e)/(1 - R1*e), NTU1/(1. + NTU1))
+        elif Ntp == 2 and optimal:
+            E = (1. + R1**2)**0.5
+            P1 = 2./(1 + R1 + E/tanh(E*NTU1/2.))
+        elif Ntp == 2 and not optimal:
+            A = exp(NTU1)
+            B = exp(-NTU1*R1/2.)
+            P1 = np.where(
+                R1 != 2,
+                1/R1*(1 - (2 - R1)*(2*A + R1*B)/(2 + R1)/(2*A - R1/B)),
+                0.5*(1 - (1 + A**-2)/2./(1 + NTU1)),
+            )
+        elif Ntp == 3 and optimal:
+            lambda3 = R1
+            root = (2.25 + R1*(R1 - 1))**0.5
+            lambda2 = -1.5 - root
+            lambda1 = -1.5 + root
+            delta = lambda1 - lambda2
+            X1 = exp(lambda1*NTU1/3.)/2/delta
+            X2 = exp(lambda2*NTU1/3.)/2/delta
+            X3 = exp(lambda3*NTU1/3.)/2/delta
+            C = X2*(3*R1 + lambda1) - X1*(3*R1 + lambda2) + X3*delta
+            B = X1*(R1 - lambda2) - X2*(R1 - lambda1) + X3*delta
+            A = np.where(
+                R1 != 1,
+                X1*(R1 + lambda1)*(R1 - lambda2)/2/lambda1 - X3*delta
+                - X2*(R1 + lambda2)*(R1 - lambda1)/2/lambda2 + 1./(1 - R1),
+                -exp(-NTU1)/18 - exp(NTU1/3.)/2 + (NTU1 + 5)/9.,
+            )
+            P1 = 1./R1*(1. - C/(A*C + B*B))
+        elif Ntp == 3 and not optimal:
+            R1_orig = R1
+            NTU1 = NTU1*R1_orig
+            R1 = 1./R1_orig
+            delta = (9*R1**2 + 4*(1 - R1))**0.5/R1
+            l1 = (-3 + delta)/2.
+            l2 = (-3 - delta)/2.
+            chi1 = exp(l1*R1*NTU1/3.)/2/delta
+            chi2 = exp(l2*R1*NTU1/3.)/2/delta
+            E = 0.5*exp(NTU1/3.)
+            C = -chi1*(3 + R1*l2)/R1 + chi2*(3 + R1*l1)/R1 + E
+            B = chi1*(1 - R1*l2)/R1 - chi2*(1 - R1*l1)/R1 + E
+            A = (chi1*(1 + R1*l1)*(1 - R1*l2)/(2*R1**2*l1) - E
+                 - chi2*(1 + R1*l2)*(1 - R1*l1)/(2*R1**2*l2) + R1*(R1 - 1))
+            P1 = (1 - C/(A*C + B**2))/R1_orig
+            # ht.hx divides by zero at R1 == 1 and has no limit form for it.
+            P1 = np.where(R1_orig == 1, np.nan, P1)
+        elif Ntp == 4 or Ntp % 2 == 0:
+            R1_orig = R1
+            NTU1 = NTU1*R1_orig
+            R1 = 1./R1_orig
+            N1 = Ntp/2.
+            C = 1/N1*(1 + N1**2*R1**2)**0.5/tanh(NTU1/(2*N1)*(1 + N1**2*R1**2)**0.5)
+            B = -1/N1/tanh(NTU1/(2*N1))
+            A = 1 + R1 + 1/tanh(NTU1/2.)
+            P1 = 2/(A + B + C)/R1_orig
+        else:
+            raise ValueError("For TEMA E shells with an odd number of tube passes more than 3, no solution is implemented.")
+    return _result(P1)
+
+
+def temperature_effectiveness_TEMA_G(R1, NTU1, Ntp, optimal=True):
+    R1, NTU1 = _arrays(R1, NTU1)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        if Ntp == 1:
+            D = exp(-NTU1*(1. - R1)/2.)
+            B = np.where(R1 != 1, (1. - D)/(1. - R1*D), NTU1/(2. + NTU1))
+            A = 1./(1. + R1)*(1. - exp(-NTU1*(1. + R1)/2.))
+            P1 = A + B - A*B*(1. + R1) + R1*A*B**2
+        elif Ntp == 2 and optimal:
+            beta = exp(-NTU1*(2. - R1)/2.)
+            alpha = exp(-NTU1*(2. + R1)/4.)
+            B = (4. - beta*(2. + R1))/(2. - R1)
+            A = -2.*R1*(1 - alpha)**2/(2. + R1)
+            alpha2 = exp(-NTU1)
+            P1 = np.where(
+                R1 != 2,
+                (B - alpha**2)/(A + 2. + R1*B),
+                (1. + 2.*NTU1 - alpha2**2)/(4. + 4.*NTU1 - (1. - alpha2)**2),
+            )
+        elif Ntp == 2 and not optimal:
+            R1_orig = R1
+            NTU1 = NTU1*R1_orig
+            R1 = 1./R1_orig
+            beta = exp(-NTU1*(2.*R1 + 1.)/2.)
+            alpha = exp(-NTU1*(2.*R1 - 1.)/4.)
+            B = (4.*R1 - beta*(2.*R1 - 1.))/(2.*R1 + 1.)
+            A = (1. - alpha)**2/(R1 - 0.5)
+            beta2 = exp(-2.*R1*NTU1)
+            P1 = np.where(
+                R1 != 0.5,
+                (B - alpha**2)/(R1*(A - alpha**2/R1 + 2.)),
+                (1. + 2.*R1*NTU1 - beta2)/R1/(4. + 4.*R1*NTU1 + R1**2*NTU1**2),
+            )
+            P1 = P1/R1_orig
+        else:
+            raise ValueError("Supported numbers of tube passes are 1 and 2.")
+    return _result(P1)
+
+
+def temperature_effectiveness_TEMA_H(R1, NTU1, Ntp, optimal=True):
+    R1, NTU1 = _arrays(R1, NTU1)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        if Ntp == 1:
+            A = 1./(1 + R1/2.)*(1. - exp(-NTU1*(1. + R1/2.)/2.))
+            D = exp(-NTU1*(1. - R1/2.)/2.)
+            B = np.where(R1 != 2, (1. - D)/(1. - R1*D/2.), NTU1/(2. + NTU1))
+            E = (A + B - A*B*R1/2.)/2.
+            P1 = E*(1. + (1. - B*R1/2.)*(1. - A*R1/2. + A*B*R1)) - A*B*(1. - B*R1/2.)
+        elif Ntp == 2 and optimal:
+            alpha = NTU1*(4. + R1)/8.
+            beta = NTU1*(4. - R1)/8.
+            D = (1. - exp(-alpha))/(4./R1 + 1)
+            E = np.where(R1 != 4, (1. - exp(-beta))/(4./R1 - 1.), NTU1/2.)
+            H = np.where(R1 != 4, (1. - exp(-2.*beta))/(4./R1 - 1.), NTU1)
+            G = (1 - D)**2*(D**2 + E**2) + D**2*(1 + E)**2
+            B = (1. + H)*(1. + E)**2
+            P1 = 1./R1*(1. - (1. - D)**4/(B - 4.*G/R1))
+        elif Ntp == 2 and not optimal:
+            R1_orig = R1
+            NTU1 = NTU1*R1_orig
+            R1 = 1./R1_orig
+            beta = NTU1*(4.*R1 + 1)/8.
+            alpha = NTU1/8.*(4.*R1 - 1.)
+            H = (exp(-2.*beta) - 1.)/(4.*R1 + 1.)
+            E = (exp(-beta) - 1.)/(4.*R1 + 1.)
+            B = (1. + H)*(1. + E)**2
+            D = np.where(R1 != 0.25, (1. - exp(-alpha))/(1. - 4.*R1), -NTU1/8.)
+            G = (1. - D)**2*(D**2 + E**2) + D**2*(1. + E)**2
+            P1 = (1. - (B + 4.*G*R1)/(1. - D)**4)/R1_orig
+        else:
+            raise ValueError("Supported numbers of tube passes are 1 and 2.")
+    return _result(P1)
+
+
+def temperature_effectiveness_TEMA_J(R1, NTU1, Ntp):
+    R1, NTU1 = _arrays(R1, NTU1)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        if Ntp == 1:
+            A = exp(NTU1)
+            B = exp(-NTU1*R1/2.)
+            P1 = np.where(
+                R1 != 2,
+                1./R1*(1. - (2. - R1)*(2.*A + R1*B)/(2. + R1)/(2.*A - R1/B)),
+                0.5*(1. - (1. + A**-2)/2./(1. + NTU1)),
+            )
+        elif Ntp == 2:
+            lambda1 = (1. + R1*R1/4.)**0.5
+            A = exp(NTU1)
+            Al = A**lambda1
+            D = 1. + lambda1*A**((lambda1 - 1.)/2.)/(Al - 1.)
+            C = A**((1 + lambda1)/2.)/(lambda1 - 1. + (1. + lambda1)*Al)
+            B = (Al + 1.)/(Al - 1.)
+            P1 = 1./(1. + R1/2. + lambda1*B - 2.*lambda1*C*D)
+        elif Ntp == 4:
+            lambda1 = (1. + R1**2/16.)**0.5
+            E = exp(R1*NTU1/2.)
+            A = exp(NTU1)
+            Al = A**lambda1
+            D = 1. + lambda1*A**((lambda1 - 1)/2.)/(Al - 1.)
+            C = A**((1 + lambda1)/2.)/(lambda1 - 1. + (1. + lambda1)*Al)
+            B = (Al + 1.)/(Al - 1)
+            P1 = 1./(1. + R1/4.*(1. + 3.*E)/(1. + E) + lambda1*B - 2.*lambda1*C*D)
+        else:
+            raise ValueError("Supported numbers of tube passes are 1, 2, and 4.")
+    return _result(P1)
+
+
+def _air_cooler_coerce(rows, passes):
+    if passes > rows:
+        passes = rows
+    new_passes, new_rows = passes, rows
+    if passes > 5:
+        new_passes = passes = 5
+    if rows > 5:
+        new_rows = rows = 5
+    if rows - 1 == passes:
+        new_rows, new_passes = rows - 1, passes
+    elif (passes in (2, 3, 5)) and rows >= 4:
+        new_rows, new_passes = 4, 2
+    return new_rows, new_passes
+
+
+def temperature_effectiveness_air_cooler(R1, NTU1, rows, passes, coerce=True):
+    R1, NTU1 = _arrays(R1, NTU1)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        if passes == 1:
+            N = int(rows)
+            K = 1. - exp(-NTU1/N)
+            NKR1 = N*K*R1
+            top = N*exp(NKR1)
+            factorials = [float(np.prod(np.arange(1, i + 1))) for i in range(N)]
+            # final_speed[j] = K**j * sum_{k<=j} NKR1**k/k!
+            partial = np.zeros_like(K)
+            final_speed = []
+            for j in range(N):
+                partial = partial + NKR1**j/factorials[j]
+                final_speed.append(K**j*partial)
+            tot = np.zeros_like(K)
+            for i in range(1, N):
+                for j in range(i + 1):
+                    prod = factorials[i]/(factorials[i - j]*factorials[j])
+                    tot = tot + prod*exp((j - i)*NTU1/N)*final_speed[j]
+            P1 = 1./R1*(1. - 1./(top/(1. + tot)))
+        elif rows == passes == 2:
+            K = 1. - exp(-0.5*NTU1)
+            xi = 0.5*K + (1. - 0.5*K)*exp(2.*K*R1)
+            P1 = 1./R1*(1. - 1./xi)
+        elif rows == passes == 3:
+            K = 1. - exp(-NTU1/3.)
+            xi = (K*(1. - 0.25*K - R1*K*(1. - 0.5*K))*exp(K*R1)
+                  + exp(3.*K*R1)*(1. - 0.5*K)**2)
+            P1 = 1./R1*(1. - 1./xi)
+        elif rows == passes == 4:
+            K = 1. - exp(-0.25*NTU1)
+            xi = (0.5*K*(1. - 0.5*K + 0.25*K**2)
+                  + K*(1. - 0.5*K)*(1. - 0.125*R1*K*(1. - 0.5*K)*exp(2.*K*R1))
+                  + exp(4.*K*R1)*(1. - 0.5*K)**3)
+            P1 = 1./R1*(1. - 1./xi)
+        elif rows == passes == 5:
+            K = 1. - exp(-0.2*NTU1)
+            K2 = K*K
+            K3 = K2*K
+            xi = (K*(1. - .75*K + .5*K2 - .125*K3)
+                  - R1*K2*(1. - K + .75*K2 - .25*K3
+                  - .5*R1*K2*(1. - .5*K)**2))*exp(K*R1)
+            xi += ((K*(1. - .75*K + 1/16.*K3) - 3*R1*K2*(1. - .5*K)**3)
+                   * exp(3*K*R1) + (1. - .5*K)**4*exp(5*K*R1))
+            P1 = 1./R1*(1. - 1./xi)
+        elif rows == 4 and passes == 2:
+            K = 1. - exp(-0.25*NTU1)
+            xi = (0.5*R1*K**3*(4. - K + 2.*R1*K**2) + exp(4.*K*R1) + K*(1. - 0.5*K
+                  + 0.125*K**2)*(1 - exp(4.*K*R1)))*(1. + R1*K**2)**-2
+            P1 = 1./R1*(1. - 1./xi)
+        elif coerce:
+            new_rows, new_passes = _air_cooler_coerce(rows, passes)
+            return temperature_effectiveness_air_cooler(R1, NTU1, new_rows, new_passes)
+        else:
+            raise ValueError("Number of passes and rows not supported.")
+    return _result(P1)
+
+
+def temperature_effectiveness_plate(R1, NTU1, Np1, Np2, counterflow=True,
+                                    passes_counterflow=True, reverse=False):
+    R1, NTU1 = _arrays(R1, NTU1)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        P1 = _plate(R1, NTU1, Np1, Np2, counterflow, passes_counterflow)
+        if P1 is None and not reverse:
+            # Asymmetric arrangements are solved from the other side.
+            R2 = 1./R1
+            P2 = temperature_effectiveness_plate(R2, NTU1*R1, Np2, Np1, counterflow,
+                                                 passes_counterflow, reverse=True)
+            P1 = np.asarray(P2)*R2
+    if P1 is None:
+        raise ValueError("Supported number of passes does not have a formula available")
+    return _result(np.asarray(P1))
+
+
+def _plate(R1, NTU1, Np1, Np2, counterflow, passes_counterflow):
+    if Np1 == 1 and Np2 == 1:
+        return P_NTU_Pc(NTU1, R1) if counterflow else P_NTU_Pp(NTU1, R1)
+    if Np1 == 1 and Np2 == 2:
+        A = P_NTU_Pp(NTU1, 0.5*R1)
+        B = P_NTU_Pc(NTU1, 0.5*R1)
+        return 0.5*(A + B - 0.5*A*B*R1)
+    if Np1 == 1 and Np2 == 3:
+        A = P_NTU_Pp(NTU1, R1/3.)
+        B = P_NTU_Pc(NTU1, R1/3.)
+        if counterflow:
+            return 1/3.*(A + B*(1. - R1*A/3.)*(2. - R1*B/3.))
+        return 1/3.*(B + A*(1. - R1*B/3.)*(2. - R1*A/3.))
+    if Np1 == 1 and Np2 == 4:
+        A = P_NTU_Pp(NTU1, 0.25*R1)
+        B = P_NTU_Pc(NTU1, 0.25*R1)
+        t3 = (1. - 0.25*A*R1)*(1. - 0.25*B*R1)
+        return (1. - t3*t3)/R1
+    if Np1 == 2 and Np2 == 2:
+        if counterflow and passes_counterflow:
+            return P_NTU_Pc(NTU1, R1)
+        if counterflow:
+            A = P_NTU_Pp(0.5*NTU1, R1)
+            return (2.*A - A*A*(1. + R1))/(1. - R1*A*A)
+        if passes_counterflow:
+            B = P_NTU_Pc(0.5*NTU1, R1)
+            return B*(2. - B*(1. + R1))
+        return P_NTU_Pp(NTU1, R1)
+    if Np1 == 2 and Np2 == 3:
+        if counterflow:
+            H = P_NTU_Pp(0.5*NTU1, 2./3.*R1)
+            G = P_NTU_Pc(0.5*NTU1, 2./3.*R1)
+            E = 1./(2./3.*R1*G)
+            F = 1./(2./3.*R1*H)
+            E2 = E*E
+            F2 = F*F
+            A = (2.*R1*E*F2 - 2.*E*F + F - F2)/(2.*R1*E2*F2 - E2 - F2 - 2.*E*F + E + F)
+            C = (1. - A)/E
+            D = R1*E*E*C - R1*E + R1 - 0.5*C
+            B = A*(E - 1.)/F
+            return (A + 0.5*B + 0.5*C + D)/R1
+        D = 2*R1/3.
+        A = P_NTU_Pp(NTU1/2, D)
+        B = P_NTU_Pc(NTU1/2, D)
+        return (A + B - (2/9. + D/3.)*(A*A + B*B)
+                - (5./9. + 4./3.*D)*A*B
+                + D*(1. + D)*A*B*(A + B)/3.
+                - D*D*A*A*B*B/9.)
+    if Np1 == 2 and Np2 == 4:
+        A = P_NTU_Pp(0.5*NTU1, 0.5*R1)
+        B = P_NTU_Pc(0.5*NTU1, 0.5*R1)
+        D = 0.5*(A + B - 0.5*A*B*R1)
+        if counterflow:
+            return (2.*D - (1. + R1)*D*D)/(1. - D*D*R1)
+        return 2.*D - ((1. + R1)*D*D)
+    return None
+
+
+KERNELS = {
+    hx.temperature_effectiveness_basic: temperature_effectiveness_basic,
+    hx.temperature_effectiveness_TEMA_E: temperature_effectiveness_TEMA_E,
+    hx.temperature_effectiveness_TEMA_G: temperature_effectiveness_TEMA_G,
+    hx.temperature_effectiveness_TEMA_H: temperature_effectiveness_TEMA_H,
+    hx.temperature_effectiveness_TEMA_J: temperature_effectiveness_TEMA_J,
+    hx.temperature_effectiveness_air_cooler: temperature_effectiveness_air_cooler,
+    hx.temperature_effectiveness_plate: temperature_effectiveness_plate,
+}
+
+
+def vectorized(func):
+    # Array-native kernel for an ht.hx function, or a np.vectorize wrapper for
+    # anything that has not been ported.
+    kernel = KERNELS.get(func)
+    if kernel is not None:
+        return kernel
+    return np.vectorize(func, excluded={"Ntp", "optimal", "subtype", "rows", "passes",
+                                        "Np1", "Np2", "counterflow", "passes_counterflow"})
+
+
+def _exact(func, R1, NTU1, **kwargs):
+    try:
+        return func(R1, NTU1, **kwargs)
+    except (OverflowError, ZeroDivisionError):
+        return np.nan
+
+
+class UnsupportedCase(Exception):
+    # The exact ht.hx function rejects the configuration (ValueError).
+    pass
+
+
+def max_deviation(func, R1, NTU1, **kwargs) -> float:
+    R1, NTU1 = _arrays(R1, NTU1)
+    try:
+        exact = np.array([_exact(func, float(r), float(n), **kwargs)
+                          for r, n in zip(R1.ravel(), NTU1.ravel())], dtype=float)
+    except ValueError as e:
+        raise UnsupportedCase(str(e)) from e
+    # Errors raised by the kernel itself are failures, not unsupported cases.
+    fast = np.asarray(KERNELS[func](R1, NTU1, **kwargs), dtype=float).ravel()
+    # Points where the scalar function itself breaks down must break down here too.
+    both_bad = ~np.isfinite(fast) & ~np.isfinite(exact)
+    dev = np.where(both_bad, 0.0, np.abs(fast - exact))
+    return float(np.max(np.where(np.isnan(dev), np.inf, dev)))
+
+
+VERIFY_CASES = (
+    [(hx.temperature_effectiveness_basic, {"subtype": s}) for s in (
+        "counterflow", "parallel", "crossflow", "crossflow approximate",
+        "crossflow, mixed 1", "crossflow, mixed 2", "crossflow, mixed 1&2")]
+    + [(hx.temperature_effectiveness_TEMA_E, {"Ntp": n, "optimal": o})
+       for n in (1, 2, 3, 4, 6) for o in (True, False)]
+    + [(f, {"Ntp": n, "optimal": o})
+       for f in (hx.temperature_effectiveness_TEMA_G, hx.temperature_effectiveness_TEMA_H)
+       for n in (1, 2) for o in (True, False)]
+    + [(hx.temperature_effectiveness_TEMA_J, {"Ntp": n}) for n in (1, 2, 4)]
+    + [(hx.temperature_effectiveness_air_cooler, {"rows": r, "passes": p})
+       for r in range(1, 7) for p in range(1, 6)]
+    + [(hx.temperature_effectiveness_plate, {"Np1": a, "Np2": b, "counterflow": c, "passes_counterflow": pc})
+       for a in range(1, 5) for b in range(1, 5) for c in (True, False) for pc in (True, False)
+       if (a, b) not in ((3, 3), (3, 4), (4, 3), (4, 4))]
+)
+
+
+def verify_grid(n: int = 25) -> tuple:
+    # The UI ranges (R1 0.01-10, NTU 0.01-20) plus the exact special values
+    # the correlations branch on.
+    r = np.unique(np.concatenate([np.geomspace(0.01, 10.0, n), [0.25, 0.5, 1.0, 2.0, 4.0]]))
+    t = np.geomspace(0.01, 20.0, n)
+    return np.meshgrid(r, t)
+
+
+def verify(n: int = 25) -> list:
+    R1, NTU1 = verify_grid(n)
+    report = []
+    for func, kwargs in VERIFY_CASES:
+        exact_ok = True
+        try:
+            dev = max_deviation(func, R1, NTU1, **kwargs)
+        except UnsupportedCase:
+            exact_ok = False
+            dev = 0.0
+        report.append((func.__name__, kwargs, dev, exact_ok))
+    return report
+
+
+if __name__ == "__main__":
+    failed = 0
+    for name, kwargs, dev, ok in verify():
+        flag = "OK " if dev <= TOLERANCE else "FAIL"
+        failed += dev > TOLERANCE
+        print(f"{flag} {name} {kwargs} max|dP1|={dev:.2e}" + ("" if ok else " (unsupported)"))
+    sys.exit(1 if failed else 0)
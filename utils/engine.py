@@ -0,0 +1,206 @@
+from dataclasses import asdict, dataclass, field, fields
+from ht.hx import (
+    temperature_effectiveness_basic,
+    temperature_effectiveness_TEMA_E,
+    temperature_effectiveness_TEMA_G,
+    temperature_effectiveness_TEMA_H,
+    temperature_effectiveness_TEMA_J,
+    temperature_effectiveness_air_cooler,
+    temperature_effectiveness_plate,
+)
+from utils.calc import (
+    CLEARANCE_DEFAULTS, GEOMETRY_DEFAULTS, ML_DEFAULTS, PNTU_DEFAULTS,
+    compute_clearance, compute_geometry, compute_pntu, predict_fouling, validate_geometry,
+)
+from utils.rating import pntu_effectiveness
+
+# Typed records over utils/calc.py, for use outside Streamlit. The UI and
+# the "Calculer tout" pipeline call the same calc functions with plain dicts.
+
+# Flat case tables (batch CLI, bulk reports) name the P-NTU pass count
+# `Ntp_pntu`, `Ntp` being the geometry one.
+PNTU_COLUMNS = {("Ntp_pntu" if k == "Ntp" else k): k for k in PNTU_DEFAULTS}
+
+EFFECTIVENESS_METHODS = {
+    "basic": temperature_effectiveness_basic,
+    "TEMA_E": temperature_effectiveness_TEMA_E,
+    "TEMA_G": temperature_effectiveness_TEMA_G,
+    "TEMA_H": temperature_effectiveness_TEMA_H,
+    "TEMA_J": temperature_effectiveness_TEMA_J,
+    "air_cooler": temperature_effectiveness_air_cooler,
+    "plate": temperature_effectiveness_plate,
+}
+
+
+@dataclass(frozen=True)
+class GeometryInput:
+    Do: float = GEOMETRY_DEFAULTS["Do"]
+    pitch: float = GEOMETRY_DEFAULTS["pitch"]
+    angle: int = GEOMETRY_DEFAULTS["angle"]
+    Ntp: int = GEOMETRY_DEFAULTS["Ntp"]
+    N: int = GEOMETRY_DEFAULTS["N"]
+    material: str = GEOMETRY_DEFAULTS["material"]
+    L_unsupported: float = GEOMETRY_DEFAULTS["L_unsupported"]
+
+
+@dataclass(frozen=True)
+class GeometryResult:
+    DB_Perry: float
+    N_Perry: int
+    DB_HEDH: float
+    DB_Phadkeb: float
+    DB_VDI: float
+    DShell_min: float
+    clearance_auto: float
+    dB_hole: float
+    L_max: float
+
+
+@dataclass(frozen=True)
+class ClearanceInput:
+    DBundle: float | None = None
+    DShell: float | None = None
+
+
+@dataclass(frozen=True)
+class ClearanceResult:
+    clearance: float
+
+
+@dataclass(frozen=True)
+class EffectivenessInput:
+    method: str
+    R1: float
+    NTU1: float
+    params: dict = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class EffectivenessResult:
+    P1: float
+
+
+@dataclass(frozen=True)
+class PNTUInput:
+    m1: float = PNTU_DEFAULTS["m1"]
+    Cp1: float = PNTU_DEFAULTS["Cp1"]
+    T1i: float = PNTU_DEFAULTS["T1i"]
+    m2: float = PNTU_DEFAULTS["m2"]
+    Cp2: float = PNTU_DEFAULTS["Cp2"]
+    T2i: float = PNTU_DEFAULTS["T2i"]
+    UA: float = PNTU_DEFAULTS["UA"]
+    subtype: str = PNTU_DEFAULTS["subtype"]
+    Ntp: int = PNTU_DEFAULTS["Ntp"]
+
+
+@dataclass(frozen=True)
+class PNTUResult:
+    T1o: float
+    T2o: float
+    Q: float
+    P1: float
+    P2: float
+    R1: float
+    R2: float
+    NTU1: float
+    NTU2: float
+    effectiveness: float
+
+
+@dataclass(frozen=True)
+class FoulingInput:
+    runtime_since_cleaning_hr: float = ML_DEFAULTS["runtime_since_cleaning_hr"]
+    deltaT_hot_C: float = ML_DEFAULTS["deltaT_hot_C"]
+    deltaT_cold_C: float = ML_DEFAULTS["deltaT_cold_C"]
+    deltaP_shell_kPa: float = ML_DEFAULTS["deltaP_shell_kPa"]
+    hot_inlet_temp_C: float = ML_DEFAULTS["hot_inlet_temp_C"]
+    cold_inlet_temp_C: float = ML_DEFAULTS["cold_inlet_temp_C"]
+    hot_flow_kg_s: float = ML_DEFAULTS["hot_flow_kg_s"]
+    cold_flow_kg_s: float = ML_DEFAULTS["cold_flow_kg_s"]
+    hot_visc_cP: float = ML_DEFAULTS["hot_visc_cP"]
+    cold_visc_cP: float = ML_DEFAULTS["cold_visc_cP"]
+    solids_ppm: float = ML_DEFAULTS["solids_ppm"]
+
+
+@dataclass(frozen=True)
+class FoulingResult:
+    fouling: float
+    ttc: float
+    status: str
+
+
+def from_dict(cls, values: dict):
+    # Builds a record from a mapping that may carry extra keys. Integer
+    # fields are cast, since CSV columns with gaps are read as floats.
+    kwargs = {}
+    for f in fields(cls):
+        if f.name in values:
+            v = values[f.name]
+            kwargs[f.name] = int(v) if f.type is int else v
+    return cls(**kwargs)
+
+
+def geometry(inp: GeometryInput) -> GeometryResult:
+    g = asdict(inp)
+    error = validate_geometry(g)
+    if error:
+        raise ValueError(error)
+    return GeometryResult(**compute_geometry(g))
+
+
+def clearance(inp: ClearanceInput) -> ClearanceResult:
+    if inp.DBundle is not None:
+        c = {"mode": CLEARANCE_DEFAULTS["mode"], "DBundle": inp.DBundle, "DShell": None}
+    elif inp.DShell is not None:
+        c = {"mode": "Diamètre calandre", "DBundle": None, "DShell": inp.DShell}
+    else:
+        raise ValueError("DBundle ou DShell doit être renseigné.")
+    return ClearanceResult(compute_clearance(c))
+
+
+def effectiveness(inp: EffectivenessInput) -> EffectivenessResult:
+    try:
+        func = EFFECTIVENESS_METHODS[inp.method]
+    except KeyError:
+        raise ValueError(f"Méthode inconnue : {inp.method}") from None
+    return EffectivenessResult(func(inp.R1, inp.NTU1, **inp.params))
+
+
+def pntu(inp: PNTUInput) -> PNTUResult:
+    r = compute_pntu(asdict(inp))
+    eff = pntu_effectiveness(r)
+    return PNTUResult(
+        T1o=r["T1o"], T2o=r["T2o"], Q=r["Q"], P1=r["P1"], P2=r["P2"],
+        R1=r["R1"], R2=r["R2"], NTU1=r["NTU1"], NTU2=r["NTU2"], effectiveness=eff,
+    )
+
+
+def fouling(inp: FoulingInput, m_foul=None, m_ttc=None) -> FoulingResult:
+    from utils.models import fouling_status, get_models
+    if m_foul is None or m_ttc is None:
+        m_foul, m_ttc = get_models()
+    f, ttc = predict_fouling(asdict(inp), m_foul, m_ttc)
+    return FoulingResult(float(f), float(ttc), str(fouling_status(f)))
+
+
+def evaluate_case(case: dict, sections) -> dict:
+    # One flat row in, one flat row out. A failing section is reported in
+    # `error` and the other sections still run.
+    out = {}
+    errors = []
+    for section in sections:
+        try:
+            if section == "geometry":
+                out.update(asdict(geometry(from_dict(GeometryInput, case))))
+            elif section == "clearance":
+                out.update(asdict(clearance(from_dict(ClearanceInput, case))))
+            elif section == "pntu":
+                p = {k: case[col] for col, k in PNTU_COLUMNS.items() if col in case}
+                out.update(asdict(pntu(from_dict(PNTUInput, p))))
+            elif section == "ml":
+                r = fouling(from_dict(FoulingInput, case))
+                out.update(fouling_prediction=r.fouling, ttc_prediction=r.ttc, status=r.status)
+        except Exception as e:
+            errors.append(f"{section}: {type(e).__name__}: {e}")
+    out["error"] = "; ".join(errors)
+    return out
@@ -1,6 +1,8 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
+from utils.eff_tables import effectiveness
+from utils.metrics import instrument
 
 def show_metric(label: str, value: float, unit: str = "") -> None:
     formatted = f"{value:.5f} {unit}" if unit else f"{value:.5f}"
@@ -14,8 +16,9 @@ def show_metric(label: str, value: float, unit: str = "") -> None:
         unsafe_allow_html=True
     )
 
+@instrument("chart.effectiveness")
 def effectiveness_chart(func, R1: float, **kwargs) -> None:
     NTU_range = np.linspace(0.1, 10.0, 50)
-    effs = [func(R1, NTU, **kwargs) for NTU in NTU_range]
+    effs = effectiveness(func, R1, NTU_range, **kwargs)
     df = pd.DataFrame({"NTU": NTU_range, "Effectiveness": effs}).set_index("NTU")
     st.line_chart(df) 
\ No newline at end of file
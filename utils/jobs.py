@@ -0,0 +1,162 @@
+import inspect
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from utils.metrics import observe
+
+# Background jobs for long computations (sweeps, batch ratings, bulk scoring,
+# bulk reports). Jobs run on a process-wide thread pool, so they survive
+# reruns and page changes; the heavy work inside them still goes to the
+# process pools of the functions they call.
+#
+# MAX_RUNNING jobs run at once for the whole server, further jobs wait in
+# the queue; one session may hold at most MAX_PER_OWNER queued or running
+# jobs, so a single user cannot fill the queue.
+MAX_RUNNING = int(os.environ.get("HX_MAX_JOBS", "2"))
+MAX_PER_OWNER = int(os.environ.get("HX_MAX_JOBS_PER_SESSION", "2"))
+# The CPUs are shared among the jobs that can run at once: the `workers`
+# argument of a job function (its process pool) is capped at this.
+WORKERS_PER_JOB = max(1, (os.cpu_count() or 1)//MAX_RUNNING)
+# Finished jobs stay available this long for their results to be picked up.
+KEEP_S = 3600
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "en attente", "en cours", "terminé", "erreur", "annulé"
+ACTIVE = (QUEUED, RUNNING)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobLimitError(RuntimeError):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    owner: str
+    name: str
+    status: str = QUEUED
+    progress: float | None = 0.0
+    count: int | None = None
+    result: object = None
+    error: str = ""
+    created: float = field(default_factory=time.time)
+    started: float | None = None
+    finished: float | None = None
+    # Files the job writes, deleted if it is cancelled or fails.
+    outputs: tuple = ()
+    cancel_requested: threading.Event = field(default_factory=threading.Event)
+
+    def report(self, fraction=None, count=None) -> None:
+        # Passed to the job function as its `progress` callback; raising here
+        # is how a cancellation reaches the work between two blocks.
+        if self.cancel_requested.is_set():
+            raise JobCancelled()
+        self.progress = fraction
+        self.count = count
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+_lock = threading.Lock()
+_jobs: dict[str, Job] = {}
+_ids = itertools.count(1)
+_pool: ThreadPoolExecutor | None = None
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_RUNNING, thread_name_prefix="hx-job")
+        return _pool
+
+
+def _prune() -> None:
+    cutoff = time.time() - KEEP_S
+    with _lock:
+        for job_id in [k for k, j in _jobs.items() if j.finished is not None and j.finished < cutoff]:
+            del _jobs[job_id]
+
+
+def _remove_outputs(job: Job) -> None:
+    for path in job.outputs:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _run(job: Job, fn, args, kwargs) -> None:
+    if job.cancel_requested.is_set():
+        job.status, job.finished = CANCELLED, time.time()
+        _remove_outputs(job)
+        return
+    job.status, job.started = RUNNING, time.time()
+    try:
+        job.result = fn(*args, progress=job.report, **kwargs)
+        job.status, job.progress = DONE, 1.0
+    except JobCancelled:
+        job.status = CANCELLED
+        _remove_outputs(job)
+    except Exception as e:
+        job.status, job.error = FAILED, str(e)
+        _remove_outputs(job)
+    job.finished = time.time()
+    observe(f"job.{job.name}", job.finished - job.started)
+
+
+def submit(owner: str, name: str, fn, *args, outputs=(), **kwargs) -> str:
+    # `fn` must accept a `progress(fraction, count=None)` keyword argument.
+    # `outputs`: paths of the files it writes (see Job.outputs).
+    _prune()
+    if "workers" in inspect.signature(fn).parameters:
+        kwargs["workers"] = min(int(kwargs.get("workers") or WORKERS_PER_JOB), WORKERS_PER_JOB)
+    with _lock:
+        active = sum(1 for j in _jobs.values() if j.owner == owner and j.status in ACTIVE)
+        if active >= MAX_PER_OWNER:
+            raise JobLimitError(
+                f"{active} tâche(s) déjà en cours pour cette session (maximum {MAX_PER_OWNER})."
+            )
+        job = Job(id=f"{next(_ids):04d}", owner=owner, name=name, outputs=tuple(outputs))
+        _jobs[job.id] = job
+    _executor().submit(_run, job, fn, args, kwargs)
+    return job.id
+
+
+def get(job_id: str | None) -> Job | None:
+    if job_id is None:
+        return None
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def cancel(job_id: str) -> None:
+    job = get(job_id)
+    if job is not None and job.status in ACTIVE:
+        job.cancel_requested.set()
+        if job.status == QUEUED:
+            job.status, job.finished = CANCELLED, time.time()
+            _remove_outputs(job)
+
+
+def list_jobs(owner: str | None = None) -> list[Job]:
+    with _lock:
+        jobs = [j for j in _jobs.values() if owner is None or j.owner == owner]
+    return sorted(jobs, key=lambda j: j.created)
+
+
+def queue_stats() -> dict:
+    with _lock:
+        statuses = [j.status for j in _jobs.values()]
+    return {"running": statuses.count(RUNNING), "queued": statuses.count(QUEUED), "max_running": MAX_RUNNING,
+            "workers_per_job": WORKERS_PER_JOB}
@@ -0,0 +1,141 @@
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Lightweight timing instrumentation. `timed(name)` records a duration into
+# process-wide histograms (all sessions) and into the current rerun's
+# breakdown, if a rerun is being recorded on this thread.
+#
+# Export, when the environment asks for it:
+#   HX_METRICS_PROM=path   Prometheus text format, rewritten after each rerun
+#   HX_METRICS_JSONL=path  one JSON line per rerun with its breakdown
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROM_PATH = os.environ.get("HX_METRICS_PROM")
+JSONL_PATH = os.environ.get("HX_METRICS_JSONL")
+
+_lock = threading.Lock()
+_histograms: dict[str, dict] = {}
+_local = threading.local()
+_gauges: dict[str, object] = {}
+_export_error: tuple | None = None
+
+
+def observe(name: str, seconds: float) -> None:
+    with _lock:
+        h = _histograms.get(name)
+        if h is None:
+            h = _histograms[name] = {"count": 0, "sum": 0.0, "buckets": [0]*len(BUCKETS)}
+        h["count"] += 1
+        h["sum"] += seconds
+        # Cumulative buckets, as in Prometheus: each counts durations <= bound.
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h["buckets"][i] += 1
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        rerun.append((name, seconds))
+
+
+@contextmanager
+def timed(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def instrument(name: str):
+    # Decorator form of timed().
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def begin_rerun() -> None:
+    _local.rerun = []
+    _local.rerun_start = time.perf_counter()
+
+
+def end_rerun(page: str = "") -> dict | None:
+    rerun = getattr(_local, "rerun", None)
+    if rerun is None:
+        return None
+    total = time.perf_counter() - _local.rerun_start
+    _local.rerun = None
+    observe("rerun", total)
+    record = {
+        "ts": time.time(),
+        "page": page,
+        "total_s": total,
+        "timings": [{"name": n, "seconds": s} for n, s in rerun],
+    }
+    export(record)
+    return record
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {
+            name: {"count": h["count"], "sum": h["sum"], "buckets": list(h["buckets"])}
+            for name, h in _histograms.items()
+        }
+
+
+def register_gauges(name: str, source) -> None:
+    # source() -> dict; its numeric values are exported as hx_<name>_<key>.
+    _gauges[name] = source
+
+
+def prometheus_text() -> str:
+    lines = [
+        "# HELP hx_duration_seconds Durée des sections et appels instrumentés.",
+        "# TYPE hx_duration_seconds histogram",
+    ]
+    for name, h in sorted(snapshot().items()):
+        for bound, n in zip(BUCKETS, h["buckets"]):
+            lines.append(f'hx_duration_seconds_bucket{{name="{name}",le="{bound}"}} {n}')
+        lines.append(f'hx_duration_seconds_bucket{{name="{name}",le="+Inf"}} {h["count"]}')
+        lines.append(f'hx_duration_seconds_sum{{name="{name}"}} {h["sum"]:.6f}')
+        lines.append(f'hx_duration_seconds_count{{name="{name}"}} {h["count"]}')
+    for name, source in sorted(_gauges.items()):
+        for key, value in source().items():
+            if isinstance(value, (int, float)):
+                lines.append(f"hx_{name}_{key} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def export(record: dict | None = None) -> None:
+    # Concurrent reruns each write their own temporary file, renamed over
+    # PROM_PATH in one step. A failure does not break the rerun; it is kept
+    # for the profiling panel (export_errors()).
+    global _export_error
+    try:
+        if PROM_PATH:
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(PROM_PATH)), suffix=".prom.tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(prometheus_text())
+                os.replace(tmp, PROM_PATH)
+            except BaseException:
+                os.remove(tmp)
+                raise
+        if JSONL_PATH and record is not None:
+            with _lock, open(JSONL_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        with _lock:
+            _export_error = (time.time(), str(e))
+
+
+def export_errors() -> tuple | None:
+    # (time, message) of the last failed export, if any.
+    return _export_error
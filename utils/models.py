@@ -0,0 +1,258 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODEL_FILES = {
+    "fouling": "model_fouling.pkl",
+    "ttc": "model_ttc.pkl",
+}
+# Retrained versions (utils/training.py) live in MODEL_DIR/<version>/ as
+# native boosters; CURRENT_FILE names the version served, HX_MODEL_VERSION
+# overrides it. Without either, the shipped pickles above are served.
+MODEL_DIR = os.environ.get("HX_MODEL_DIR", os.path.join(ROOT, "models"))
+CURRENT_FILE = os.path.join(MODEL_DIR, "CURRENT")
+
+FEATURE_COLUMNS = [
+    "runtime_since_cleaning_hr",
+    "deltaT_hot_C", "deltaT_cold_C", "deltaP_shell_kPa",
+    "hot_inlet_temp_C", "cold_inlet_temp_C",
+    "hot_flow_kg_s", "cold_flow_kg_s",
+    "hot_visc_cP", "cold_visc_cP",
+    "solids_ppm",
+]
+
+# Fouling level bands: OK below FOULING_WARNING, Attention up to
+# FOULING_CRITICAL, Critique above.
+FOULING_WARNING = 0.60
+FOULING_CRITICAL = 0.85
+STATUS_LABELS = ["OK", "Attention", "Critique"]
+
+
+def fouling_status(fouling) -> np.ndarray:
+    fouling = np.asarray(fouling)
+    return np.select(
+        [fouling < FOULING_WARNING, fouling < FOULING_CRITICAL],
+        STATUS_LABELS[:2],
+        STATUS_LABELS[2],
+    )
+
+
+# Process-wide: every Streamlit session in this server shares the same
+# (read-only) model objects instead of unpickling its own copy per rerun.
+_lock = threading.Lock()
+_registry: dict[str, dict] = {}
+
+
+def served_version() -> str | None:
+    version = os.environ.get("HX_MODEL_VERSION")
+    if version:
+        return version
+    try:
+        with open(CURRENT_FILE, encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+NATIVE_FORMATS = ("ubj", "json")
+
+
+def version_file(version: str, name: str) -> str:
+    # Native booster of `name` in a version directory (UBJSON preferred).
+    for fmt in NATIVE_FORMATS:
+        path = os.path.join(MODEL_DIR, version, f"model_{name}.{fmt}")
+        if os.path.exists(path):
+            return path
+    return os.path.join(MODEL_DIR, version, f"model_{name}.{NATIVE_FORMATS[0]}")
+
+
+def model_path(name: str) -> str:
+    version = served_version()
+    if version:
+        return version_file(version, name)
+    return os.path.join(ROOT, MODEL_FILES[name])
+
+
+def _signature(path: str) -> tuple:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _resident_size(model) -> int:
+    get_booster = getattr(model, "get_booster", None)
+    if get_booster is not None:
+        return len(get_booster().save_raw())
+    return len(pickle.dumps(model))
+
+
+class BoosterModel:
+    # A native booster behind the predict()/get_booster() interface of the
+    # shipped XGBRegressor pickles (without requiring scikit-learn).
+    def __init__(self, booster):
+        self._booster = booster
+
+    def get_booster(self):
+        return self._booster
+
+    def predict(self, X):
+        return self._booster.inplace_predict(X)
+
+
+def load_model_file(path: str):
+    # Native boosters (retrained versions) or the shipped joblib pickles.
+    if path.endswith((".ubj", ".json")):
+        import xgboost as xgb
+        return BoosterModel(xgb.Booster(model_file=path))
+    import joblib
+    return joblib.load(path)
+
+
+def feature_matrix(X) -> np.ndarray:
+    # The 11 features as one C-contiguous float32 array, in FEATURE_COLUMNS
+    # order: a DataFrame (extra columns ignored), a dict of scalars or
+    # columns, or an array already in that order.
+    if hasattr(X, "columns"):
+        # Column selection costs more than a small prediction; skip it when
+        # the frame is already in order.
+        if list(X.columns) != FEATURE_COLUMNS:
+            X = X[FEATURE_COLUMNS]
+        X = X.to_numpy(dtype=np.float32)
+    elif isinstance(X, dict):
+        X = np.column_stack([np.atleast_1d(np.asarray(X[c], dtype=np.float32)) for c in FEATURE_COLUMNS])
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    if X.shape[1] != len(FEATURE_COLUMNS):
+        raise ValueError(f"{len(FEATURE_COLUMNS)} features attendues, {X.shape[1]} reçues.")
+    return X
+
+
+def _booster(model):
+    booster = model.get_booster()
+    names = booster.feature_names
+    if names is not None and list(names) != FEATURE_COLUMNS:
+        raise ValueError("Le modèle n'a pas été entraîné sur FEATURE_COLUMNS dans cet ordre.")
+    return booster
+
+
+def predict_fouling_ttc(X, m_foul=None, m_ttc=None) -> tuple[np.ndarray, np.ndarray]:
+    # Fused inference: the input is converted to float32 once and both
+    # boosters run inplace_predict on that buffer, instead of each model's
+    # predict() validating and converting its own DataFrame. TTC is clipped
+    # at 0 as everywhere else.
+    if m_foul is None or m_ttc is None:
+        m_foul, m_ttc = get_models()
+    A = feature_matrix(X)
+    fouling = _booster(m_foul).inplace_predict(A, validate_features=False)
+    ttc = np.maximum(_booster(m_ttc).inplace_predict(A, validate_features=False), 0)
+    return fouling, ttc
+
+
+def export_native(out_dir: str, fmt: str = "ubj", models: tuple | None = None) -> list[str]:
+    # Writes the served boosters in xgboost's own format: no pickle, no
+    # dependency on the joblib/xgboost versions that wrote them.
+    if fmt not in NATIVE_FORMATS:
+        raise ValueError(f"Format inconnu : {fmt} ({', '.join(NATIVE_FORMATS)})")
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for name, model in zip(MODEL_FILES, models or get_models()):
+        path = os.path.join(out_dir, f"model_{name}.{fmt}")
+        model.get_booster().save_model(path)
+        paths.append(path)
+    return paths
+
+
+def _load(name: str, path: str, signature: tuple) -> dict:
+    # joblib (and xgboost, through the pickles) is imported on first load,
+    # not when the app starts.
+    from utils.metrics import observe
+    start = time.perf_counter()
+    model = load_model_file(path)
+    load_time = time.perf_counter() - start
+    observe("model.load", load_time)
+    previous = _registry.get(name)
+    return {
+        "model": model,
+        "path": path,
+        "signature": signature,
+        "load_time_s": load_time,
+        "size_bytes": _resident_size(model),
+        "loaded_at": time.time(),
+        "loads": previous["loads"] + 1 if previous else 1,
+    }
+
+
+def get_model(name: str):
+    path = model_path(name)
+    signature = _signature(path)
+    entry = _registry.get(name)
+    if entry is not None and entry["path"] == path and entry["signature"] == signature:
+        return entry["model"]
+    with _lock:
+        # Another session may have (re)loaded it while we waited on the lock.
+        entry = _registry.get(name)
+        if entry is None or entry["path"] != path or entry["signature"] != signature:
+            entry = _load(name, path, signature)
+            _registry[name] = entry
+    return entry["model"]
+
+
+def get_models() -> tuple:
+    return get_model("fouling"), get_model("ttc")
+
+
+_versions: dict[tuple, str] = {}
+
+
+def model_version() -> str:
+    # Content hash of the model files, stable across restarts; recomputed
+    # only when a file's (mtime, size) changes.
+    signatures = tuple((name, model_path(name), _signature(model_path(name))) for name in MODEL_FILES)
+    version = _versions.get(signatures)
+    if version is None:
+        h = hashlib.sha256()
+        for name in MODEL_FILES:
+            with open(model_path(name), "rb") as f:
+                h.update(f.read())
+        version = h.hexdigest()[:16]
+        _versions.clear()
+        _versions[signatures] = version
+    return version
+
+
+def warm_up() -> None:
+    for name in MODEL_FILES:
+        get_model(name)
+
+
+_warm_up_thread: threading.Thread | None = None
+
+
+def warm_up_async() -> None:
+    # Loads the models in a background thread, once per process, so the
+    # first page render does not wait for them.
+    global _warm_up_thread
+    if _warm_up_thread is None:
+        with _lock:
+            if _warm_up_thread is None:
+                _warm_up_thread = threading.Thread(target=warm_up, name="hx-model-warm-up", daemon=True)
+                _warm_up_thread.start()
+
+
+def model_stats() -> list[dict]:
+    return [
+        {
+            "model": name,
+            "path": entry["path"],
+            "load_time_s": round(entry["load_time_s"], 4),
+            "size_bytes": entry["size_bytes"],
+            "loaded_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["loaded_at"])),
+            "loads": entry["loads"],
+        }
+        for name, entry in _registry.items()
+    ]
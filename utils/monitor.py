@@ -0,0 +1,331 @@
+import argparse
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+import pandas as pd
+from utils.models import FEATURE_COLUMNS, FOULING_CRITICAL, FOULING_WARNING, STATUS_LABELS, predict_fouling_ttc
+
+# Live fouling monitor. A data logger appends rows (CSV with a header line,
+# or JSON lines) with the 11 feature columns and optionally a `timestamp`;
+# the monitor tails the file, scores only the new complete lines in
+# micro-batches and keeps the last WINDOW_ROWS predictions in fixed-size
+# ring buffers, so memory stays constant however long it runs.
+#
+#   python -m utils.monitor capteurs.csv   # alerts on stdout
+WINDOW_ROWS = 20_000
+MAX_ALERTS = 500
+POLL_S = 0.5
+# Upper bound on what one poll reads, so a large backlog (monitor started
+# on an old file) is caught up in bounded steps.
+MAX_READ_BYTES = 8 << 20
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Files the UI may tail: only under this directory (relative paths are taken
+# from it), so a visitor cannot make the server read any file.
+MONITOR_DIR = os.environ.get("HX_MONITOR_DIR", os.path.join(ROOT, "data"))
+# How often a running monitor drops the watchers whose session has ended.
+REAP_S = 10.0
+
+
+class FileTail:
+    # Returns the complete lines appended since the last call. A file that
+    # shrinks or is replaced (log rotation) is read again from the start.
+    def __init__(self, path: str, from_start: bool = True):
+        self.path = path
+        self.jsonl = path.lower().endswith((".jsonl", ".ndjson", ".json"))
+        self.header = None
+        self.offset = 0
+        self.inode = None
+        self.partial = b""
+        self.skip_existing = not from_start
+
+    def read_lines(self, max_bytes: int = MAX_READ_BYTES) -> list[bytes]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            self.inode, self.offset, self.partial, self.header = stat.st_ino, 0, b"", None
+        if stat.st_size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            if self.header is None and not self.jsonl:
+                self.header = f.readline()
+                if not self.header.endswith(b"\n"):
+                    self.header = None
+                    return []
+                self.offset = max(self.offset, f.tell())
+            if self.skip_existing:
+                # Start at the end of the file: only rows written from now on.
+                self.skip_existing = False
+                self.offset = stat.st_size
+                return []
+            f.seek(self.offset)
+            data = f.read(max_bytes)
+        self.offset += len(data)
+        data = self.partial + data
+        end = data.rfind(b"\n") + 1
+        self.partial = data[end:]
+        return data[:end].splitlines() if end else []
+
+    def parse(self, lines: list[bytes]) -> pd.DataFrame:
+        if self.jsonl:
+            return pd.DataFrame.from_records([json.loads(line) for line in lines if line.strip()])
+        return pd.read_csv(io.BytesIO(self.header + b"\n".join(lines)))
+
+
+class Monitor:
+    def __init__(self, path: str, window: int = WINDOW_ROWS, from_start: bool = True):
+        self.path = path
+        self.tail = FileTail(path, from_start)
+        self.window = window
+        self._lock = threading.Lock()
+        self._x = np.zeros(window)
+        self._fouling = np.zeros(window, dtype=np.float32)
+        self._ttc = np.zeros(window, dtype=np.float32)
+        self._size = 0
+        self._next = 0
+        self.rows = 0
+        self.errors = 0
+        self.last_error = ""
+        self.alerts: deque = deque(maxlen=MAX_ALERTS)
+        self.alert_count = 0
+        self.timestamped = False
+        self.status = STATUS_LABELS[0]
+        self.status_counts = dict.fromkeys(STATUS_LABELS, 0)
+        self.started = time.time()
+        self.busy_s = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _push(self, x: np.ndarray, fouling: np.ndarray, ttc: np.ndarray) -> None:
+        n = len(x)
+        if n >= self.window:
+            x, fouling, ttc, n = x[-self.window:], fouling[-self.window:], ttc[-self.window:], self.window
+        idx = (self._next + np.arange(n)) % self.window
+        self._x[idx] = x
+        self._fouling[idx] = fouling
+        self._ttc[idx] = ttc
+        self._next = (self._next + n) % self.window
+        self._size = min(self._size + n, self.window)
+
+    def _alerts(self, x: np.ndarray, fouling: np.ndarray, status: np.ndarray) -> None:
+        # One alert per change of band (not per row), including the return to OK.
+        changed = np.flatnonzero(status[1:] != status[:-1]) + 1
+        first = [0] if status[0] != self.status else []
+        for i in [*first, *changed.tolist()]:
+            self.alerts.append({
+                "x": float(x[i]), "ligne": self.rows + i + 1,
+                "statut": str(status[i]), "fouling": float(fouling[i]),
+            })
+            self.alert_count += 1
+        self.status = str(status[-1])
+
+    def poll(self) -> int:
+        # Scores whatever complete rows were appended since the last poll.
+        start = time.perf_counter()
+        lines = self.tail.read_lines()
+        if not lines:
+            return 0
+        try:
+            df = self.tail.parse(lines)
+            features = df[FEATURE_COLUMNS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float32)
+        except Exception as e:
+            self.errors += len(lines)
+            self.last_error = str(e)
+            return 0
+        # Incomplete or non-numeric rows are counted as errors, not scored.
+        valid = np.isfinite(features).all(axis=1)
+        if not valid.all():
+            self.errors += int((~valid).sum())
+            self.last_error = f"{int((~valid).sum())} ligne(s) incomplète(s)"
+            df, features = df[valid], features[valid]
+            if not len(df):
+                return 0
+        fouling, ttc = predict_fouling_ttc(features)
+        status = np.select(
+            [fouling < FOULING_WARNING, fouling < FOULING_CRITICAL],
+            STATUS_LABELS[:2], STATUS_LABELS[2],
+        )
+        self.timestamped = "timestamp" in df.columns
+        if self.timestamped:
+            x = pd.to_datetime(df["timestamp"], errors="coerce").to_numpy(dtype="datetime64[ms]").astype(float)/1000
+        else:
+            x = np.arange(self.rows + 1, self.rows + len(df) + 1, dtype=float)
+        with self._lock:
+            self._alerts(x, fouling, status)
+            self._push(x, fouling, ttc)
+            for label in STATUS_LABELS:
+                self.status_counts[label] += int((status == label).sum())
+            self.rows += len(df)
+            self.busy_s += time.perf_counter() - start
+        return len(df)
+
+    def window_frame(self, max_points: int | None = None) -> pd.DataFrame:
+        with self._lock:
+            order = (self._next - self._size + np.arange(self._size)) % self.window
+            x, f, t = self._x[order], self._fouling[order], self._ttc[order]
+        if max_points and len(x) > max_points:
+            step = -(-len(x)//max_points)
+            x, f, t = x[::step], f[::step], t[::step]
+        index = pd.to_datetime(x, unit="s") if self.timestamped else pd.Index(x.astype(np.int64))
+        return pd.DataFrame({"fouling_prediction": f, "ttc_prediction": t},
+                            index=index.rename("timestamp" if self.timestamped else "ligne"))
+
+    def stats(self) -> dict:
+        elapsed = max(time.time() - self.started, 1e-9)
+        return {
+            "path": self.path,
+            "rows": self.rows,
+            "window": self._size,
+            "rows_per_s": self.rows/elapsed,
+            # Rows scored per second of actual work: the sustainable rate.
+            "capacity_rows_per_s": self.rows/self.busy_s if self.busy_s > 0 else 0.0,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "status": self.status,
+            "status_counts": dict(self.status_counts),
+            "running": self.running,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self, interval: float) -> None:
+        last_reap = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                n = self.poll()
+            except Exception as e:
+                self.last_error, n = str(e), 0
+            if time.monotonic() - last_reap >= REAP_S:
+                last_reap = time.monotonic()
+                reap()
+            # Keep reading without pause while catching up on a backlog.
+            if n == 0:
+                self._stop.wait(interval)
+
+    def start(self, interval: float = POLL_S) -> None:
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval,),
+                                            name="hx-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        # reap() may stop a monitor from its own thread.
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+
+# Process-wide: sessions watching the same file share one monitor, which
+# runs while at least one of them watches it.
+_lock = threading.Lock()
+_monitors: dict[str, Monitor] = {}
+_watchers: dict[str, set[str]] = {}
+_session_alive = None
+
+
+def allowed_path(path: str) -> str:
+    root = os.path.realpath(MONITOR_DIR)
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([full, root]) != root:
+        raise ValueError(f"Seuls les fichiers de {MONITOR_DIR} peuvent être surveillés.")
+    return full
+
+
+def get_monitor(path: str, window: int = WINDOW_ROWS, from_start: bool = True) -> Monitor:
+    path = os.path.abspath(path)
+    with _lock:
+        monitor = _monitors.get(path)
+        if monitor is None or monitor.window != window:
+            if monitor is not None:
+                monitor.stop()
+            monitor = _monitors[path] = Monitor(path, window, from_start)
+    return monitor
+
+
+def find_monitor(path: str) -> Monitor | None:
+    with _lock:
+        return _monitors.get(os.path.abspath(path))
+
+
+def stop_monitor(path: str) -> None:
+    # Stops the monitor for every watcher.
+    with _lock:
+        _watchers.pop(os.path.abspath(path), None)
+        monitor = _monitors.pop(os.path.abspath(path), None)
+    if monitor is not None:
+        monitor.stop()
+
+
+def watch(path: str, watcher: str, window: int = WINDOW_ROWS, from_start: bool = True) -> Monitor:
+    # Registers `watcher` (a session id) on the monitor of `path` and starts it.
+    monitor = get_monitor(path, window, from_start)
+    with _lock:
+        _watchers.setdefault(os.path.abspath(path), set()).add(watcher)
+    monitor.start()
+    return monitor
+
+
+def release(path: str, watcher: str) -> None:
+    # The monitor stops when its last watcher leaves.
+    path = os.path.abspath(path)
+    monitor = None
+    with _lock:
+        watchers = _watchers.get(path, set())
+        watchers.discard(watcher)
+        if not watchers:
+            _watchers.pop(path, None)
+            monitor = _monitors.pop(path, None)
+    if monitor is not None:
+        monitor.stop()
+
+
+def set_session_check(alive) -> None:
+    # alive(watcher) -> bool, used by reap().
+    global _session_alive
+    _session_alive = alive
+
+
+def reap() -> None:
+    alive = _session_alive
+    if alive is None:
+        return
+    with _lock:
+        pairs = [(path, w) for path, watchers in _watchers.items() for w in watchers]
+    for path, watcher in pairs:
+        if not alive(watcher):
+            release(path, watcher)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Surveillance en continu d'un fichier capteurs.")
+    parser.add_argument("path", help="Fichier CSV ou JSON lines alimenté par l'enregistreur")
+    parser.add_argument("--window", type=int, default=WINDOW_ROWS)
+    parser.add_argument("--interval", type=float, default=POLL_S)
+    parser.add_argument("--from-end", action="store_true", help="Ignorer les lignes déjà présentes")
+    args = parser.parse_args(argv)
+    monitor = Monitor(args.path, args.window, from_start=not args.from_end)
+    seen = 0
+    try:
+        while True:
+            monitor.poll()
+            new = min(monitor.alert_count - seen, len(monitor.alerts))
+            seen = monitor.alert_count
+            for a in list(monitor.alerts)[len(monitor.alerts) - new:]:
+                print(f"ligne {a['ligne']:>10}  {a['statut']:<9}  fouling={a['fouling']:.3f}", flush=True)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        s = monitor.stats()
+        print(f"{s['rows']:,} lignes, {s['capacity_rows_per_s']:,.0f} lignes/s de capacité, {s['errors']} erreurs")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
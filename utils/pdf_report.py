@@ -4,9 +4,60 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import cm
-import streamlit as st
+import threading
+from collections import OrderedDict
+from utils.pipeline import fingerprint
+from utils.metrics import instrument
 
-def generate_pdf_report():
+# Session keys the report reads; their hash is the cache key.
+REPORT_KEYS = [
+    "inputs_geometry", "DB_Perry", "N_Perry", "DB_HEDH", "DB_Phadkeb", "DB_VDI",
+    "DShell_min", "clearance_auto", "dB_hole", "L_max",
+    "clearance_result", "inputs_pntu", "fouling_prediction", "ttc_prediction",
+]
+# Process-wide LRU shared by all sessions, bounded by count and total size.
+MAX_REPORTS = 32
+MAX_BYTES = 32*1024*1024
+
+_lock = threading.Lock()
+_reports: OrderedDict[str, bytes] = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def report_values(state) -> dict:
+    return {k: state.get(k) for k in REPORT_KEYS}
+
+
+def cached_pdf_report(values: dict) -> bytes:
+    key = fingerprint(values)
+    with _lock:
+        pdf = _reports.get(key)
+        if pdf is not None:
+            _reports.move_to_end(key)
+            _stats["hits"] += 1
+            return pdf
+        _stats["misses"] += 1
+    # Built outside the lock; two sessions racing on the same key both build
+    # and the second insert wins, which is harmless.
+    pdf = generate_pdf_report(values).getvalue()
+    with _lock:
+        _reports[key] = pdf
+        _reports.move_to_end(key)
+        total = sum(len(v) for v in _reports.values())
+        while len(_reports) > 1 and (len(_reports) > MAX_REPORTS or total > MAX_BYTES):
+            _, evicted = _reports.popitem(last=False)
+            total -= len(evicted)
+            _stats["evictions"] += 1
+    return pdf
+
+
+def report_cache_stats() -> dict:
+    with _lock:
+        return dict(_stats, entries=len(_reports), bytes=sum(len(v) for v in _reports.values()))
+
+
+@instrument("pdf.build")
+def generate_pdf_report(values: dict):
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
     elements = []
@@ -20,22 +71,22 @@ def generate_pdf_report():
     elements.append(Spacer(1, 12))
 
     # Geometry Section
-    g = st.session_state.get("inputs_geometry")
+    g = values.get("inputs_geometry")
     if g:
         elements.append(Paragraph("Section Géométrie", section_style))
         geo_data = [["Paramètre", "Valeur"]]
         for k, v in g.items():
             geo_data.append([str(k), str(v)])
         geo_data += [
-            ["DB_Perry", str(st.session_state.get('DB_Perry'))],
-            ["N_Perry", str(st.session_state.get('N_Perry'))],
-            ["DB_HEDH", str(st.session_state.get('DB_HEDH'))],
-            ["DB_Phadkeb", str(st.session_state.get('DB_Phadkeb'))],
-            ["DB_VDI", str(st.session_state.get('DB_VDI'))],
-            ["DShell_min", str(st.session_state.get('DShell_min'))],
-            ["Clearance auto", str(st.session_state.get('clearance_auto'))],
-            ["Ø trou chicane", str(st.session_state.get('dB_hole'))],
-            ["L_max sans support", str(st.session_state.get('L_max'))],
+            ["DB_Perry", str(values.get('DB_Perry'))],
+            ["N_Perry", str(values.get('N_Perry'))],
+            ["DB_HEDH", str(values.get('DB_HEDH'))],
+            ["DB_Phadkeb", str(values.get('DB_Phadkeb'))],
+            ["DB_VDI", str(values.get('DB_VDI'))],
+            ["DShell_min", str(values.get('DShell_min'))],
+            ["Clearance auto", str(values.get('clearance_auto'))],
+            ["Ø trou chicane", str(values.get('dB_hole'))],
+            ["L_max sans support", str(values.get('L_max'))],
         ]
         geo_table = Table(geo_data, hAlign='LEFT')
         geo_table.setStyle(TableStyle([
@@ -50,9 +101,9 @@ def generate_pdf_report():
         elements.append(Spacer(1, 12))
 
     # Clearance Section
-    if st.session_state.get("clearance_result") is not None:
+    if values.get("clearance_result") is not None:
         elements.append(Paragraph("Section Jeu Calandre-Faisceau", section_style))
-        clearance_data = [["Paramètre", "Valeur"], ["Jeu recommandé", str(st.session_state.get('clearance_result'))]]
+        clearance_data = [["Paramètre", "Valeur"], ["Jeu recommandé", str(values.get('clearance_result'))]]
         clearance_table = Table(clearance_data, hAlign='LEFT')
         clearance_table.setStyle(TableStyle([
             ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
@@ -66,7 +117,7 @@ def generate_pdf_report():
         elements.append(Spacer(1, 12))
 
     # Effectiveness Section
-    p = st.session_state.get("inputs_pntu")
+    p = values.get("inputs_pntu")
     if p:
         elements.append(Paragraph("Section Efficacité", section_style))
         eff_data = [["Paramètre", "Valeur"]]
@@ -85,13 +136,13 @@ def generate_pdf_report():
         elements.append(Spacer(1, 12))
 
     # ML Prediction Section
-    if st.session_state.get("fouling_prediction") is not None or st.session_state.get("ttc_prediction") is not None:
+    if values.get("fouling_prediction") is not None or values.get("ttc_prediction") is not None:
         elements.append(Paragraph("Section Prédiction ML", section_style))
         ml_data = [["Paramètre", "Valeur"]]
-        if st.session_state.get("fouling_prediction") is not None:
-            ml_data.append(["Niveau d'encrassement", str(st.session_state.get('fouling_prediction'))])
-        if st.session_state.get("ttc_prediction") is not None:
-            ml_data.append(["Heures avant nettoyage", str(st.session_state.get('ttc_prediction'))])
+        if values.get("fouling_prediction") is not None:
+            ml_data.append(["Niveau d'encrassement", str(values.get('fouling_prediction'))])
+        if values.get("ttc_prediction") is not None:
+            ml_data.append(["Heures avant nettoyage", str(values.get('ttc_prediction'))])
         ml_table = Table(ml_data, hAlign='LEFT')
         ml_table.setStyle(TableStyle([
             ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
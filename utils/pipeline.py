@@ -0,0 +1,137 @@
+import hashlib
+import json
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+import numpy as np
+from utils.calc import (
+    CLEARANCE_DEFAULTS, GEOMETRY_DEFAULTS, ML_DEFAULTS, PNTU_DEFAULTS,
+    summary_table, validate_geometry,
+)
+from utils.result_store import stored_clearance, stored_geometry, stored_pntu, stored_prediction
+
+GEOMETRY_OUTPUTS = [
+    "DB_Perry", "N_Perry", "DB_HEDH", "DB_Phadkeb", "DB_VDI",
+    "DShell_min", "clearance_auto", "dB_hole", "L_max",
+]
+
+
+@dataclass
+class Stage:
+    name: str
+    label: str
+    inputs: list[str]
+    outputs: list[str]
+    run: Callable[[dict], dict]
+    defaults: dict = field(default_factory=dict)
+
+
+def _geometry(values: dict) -> dict:
+    error = validate_geometry(values["inputs_geometry"])
+    if error:
+        raise ValueError(error)
+    return stored_geometry(values["inputs_geometry"])
+
+
+def _clearance(values: dict) -> dict:
+    c = dict(values["inputs_clearance"])
+    if c["mode"] == "Diamètre faisceau" and c.get("DBundle") is None:
+        # Same fallback as the clearance form: the geometry result, else 1.2 m.
+        c["DBundle"] = values["DB_Perry"] or 1.2
+    return {"clearance_result": stored_clearance(c)}
+
+
+def _effectiveness(values: dict) -> dict:
+    return {"pntu_result": stored_pntu(values["inputs_pntu"])}
+
+
+def _ml(values: dict) -> dict:
+    fouling, ttc = stored_prediction(values["inputs_ml"])
+    return {"fouling_prediction": fouling, "ttc_prediction": ttc}
+
+
+def _summary(values: dict) -> dict:
+    return {"summary_table": summary_table(values)}
+
+
+# Declared in dependency order: a stage only reads keys written by the
+# stages above it (or by the forms).
+STAGES = [
+    Stage("geometry", "Géométrie", ["inputs_geometry"], GEOMETRY_OUTPUTS, _geometry,
+          {"inputs_geometry": GEOMETRY_DEFAULTS}),
+    Stage("clearance", "Jeu Calandre", ["inputs_clearance", "DB_Perry"], ["clearance_result"], _clearance,
+          {"inputs_clearance": CLEARANCE_DEFAULTS}),
+    Stage("effectiveness", "Efficacité", ["inputs_pntu"], ["pntu_result"], _effectiveness,
+          {"inputs_pntu": PNTU_DEFAULTS}),
+    Stage("ml", "Prédiction ML", ["inputs_ml"], ["fouling_prediction", "ttc_prediction"], _ml,
+          {"inputs_ml": ML_DEFAULTS}),
+    Stage("summary", "Résumé",
+          ["inputs_geometry", "inputs_pntu", *GEOMETRY_OUTPUTS],
+          ["summary_table"], _summary),
+]
+
+
+def _canonical(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+
+def fingerprint(values: dict) -> str:
+    payload = json.dumps(_canonical(values), sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def run_pipeline(state, stages=STAGES) -> list[dict]:
+    # `state` is st.session_state (or any dict-like). Each stage runs only if
+    # the fingerprint of its inputs changed since its last successful run.
+    # A stage that fails has its outputs cleared, and the stages reading
+    # them are skipped (outputs cleared too) rather than run on stale values.
+    fingerprints = state.get("pipeline_fingerprints") or {}
+    timings = []
+    failed = {}  # output key -> label of the stage that did not produce it
+    for stage in stages:
+        for key, default in stage.defaults.items():
+            if state.get(key) is None:
+                state[key] = dict(default)
+        upstream = next((failed[key] for key in stage.inputs if key in failed), None)
+        if upstream is not None:
+            _discard(state, fingerprints, stage, failed, upstream)
+            timings.append({"stage": stage.label, "status": "ignoré (étape amont en erreur)",
+                            "seconds": 0.0, "error": f"non calculé, {upstream} en erreur"})
+            continue
+        values = {key: state.get(key) for key in stage.inputs}
+        fp = fingerprint(values)
+        outputs_present = all(state.get(key) is not None for key in stage.outputs)
+        if fingerprints.get(stage.name) == fp and outputs_present:
+            timings.append({"stage": stage.label, "status": "inchangé", "seconds": 0.0, "error": ""})
+            continue
+        start = time.perf_counter()
+        try:
+            for key, value in stage.run(values).items():
+                state[key] = value
+            fingerprints[stage.name] = fp
+            status, error = "exécuté", ""
+        except Exception as e:
+            _discard(state, fingerprints, stage, failed, stage.label)
+            status, error = "erreur", str(e)
+        timings.append({
+            "stage": stage.label,
+            "status": status,
+            "seconds": time.perf_counter() - start,
+            "error": error,
+        })
+    state["pipeline_fingerprints"] = fingerprints
+    state["pipeline_timings"] = timings
+    return timings
+
+
+def _discard(state, fingerprints: dict, stage: Stage, failed: dict, label: str) -> None:
+    fingerprints.pop(stage.name, None)
+    for key in stage.outputs:
+        state[key] = None
+        failed[key] = label
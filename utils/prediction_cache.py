@@ -0,0 +1,121 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.metrics import register_gauges
+from utils.models import FEATURE_COLUMNS, feature_matrix, model_version, predict_fouling_ttc
+
+# In-memory LRU of fouling/TTC predictions, shared by every session of the
+# process, in front of the models (and of the SQLite store for the form).
+# Keys are the feature vector quantized to the resolution of the ML form
+# controls, so values that differ by less than a slider step share an
+# entry; the prediction is made on the quantized vector, so a key always
+# maps to the same value whichever query filled it. The whole cache is
+# dropped when model_version() changes (file replaced, version promoted).
+RESOLUTION = {
+    "runtime_since_cleaning_hr": 1.0,
+    "deltaT_hot_C": 0.1,
+    "deltaT_cold_C": 0.1,
+    "deltaP_shell_kPa": 0.1,
+    "hot_inlet_temp_C": 1.0,
+    "cold_inlet_temp_C": 1.0,
+    "hot_flow_kg_s": 0.01,
+    "cold_flow_kg_s": 0.01,
+    "hot_visc_cP": 0.01,
+    "cold_visc_cP": 0.01,
+    "solids_ppm": 1.0,
+}
+CAPACITY = int(os.environ.get("HX_PREDICTION_CACHE_SIZE", 100_000))
+
+_step = np.array([RESOLUTION[c] for c in FEATURE_COLUMNS])
+_lock = threading.Lock()
+_entries: OrderedDict[bytes, tuple[float, float]] = OrderedDict()
+_capacity = CAPACITY
+_version: str | None = None
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+
+def quantize(X) -> np.ndarray:
+    # Feature rows as integer multiples of RESOLUTION.
+    return np.rint(feature_matrix(X).astype(np.float64)/_step).astype(np.int64)
+
+
+def _check_version() -> None:
+    global _version
+    version = model_version()
+    if version != _version:
+        with _lock:
+            if version != _version:
+                if _version is not None:
+                    _stats["invalidations"] += 1
+                _entries.clear()
+                _version = version
+
+
+def _evict() -> None:
+    while len(_entries) > _capacity:
+        _entries.popitem(last=False)
+        _stats["evictions"] += 1
+
+
+def cached_predict(X, compute=None) -> tuple[np.ndarray, np.ndarray]:
+    # Fouling and TTC for each row of X (same inputs as predict_fouling_ttc).
+    # Only the rows missing from the cache are predicted, in one call of
+    # compute(quantized rows as features) -> (fouling, ttc).
+    _check_version()
+    Q = quantize(X)
+    keys = Q.view(np.dtype((np.void, Q.shape[1]*Q.itemsize))).ravel().tolist()
+    fouling = np.empty(len(keys))
+    ttc = np.empty(len(keys))
+    missing = []
+    with _lock:
+        for i, key in enumerate(keys):
+            value = _entries.get(key)
+            if value is None:
+                missing.append(i)
+            else:
+                _entries.move_to_end(key)
+                fouling[i], ttc[i] = value
+        _stats["hits"] += len(keys) - len(missing)
+        _stats["misses"] += len(missing)
+    if missing:
+        snapped = (Q[missing]*_step).astype(np.float32)
+        f, t = (compute or predict_fouling_ttc)(snapped)
+        fouling[missing] = f
+        ttc[missing] = t
+        if _capacity > 0:
+            with _lock:
+                for i in dict.fromkeys(missing):
+                    _entries[keys[i]] = (float(fouling[i]), float(ttc[i]))
+                    _entries.move_to_end(keys[i])
+                _evict()
+    return fouling, ttc
+
+
+def cached_prediction(features: dict, compute=None) -> tuple[float, float]:
+    fouling, ttc = cached_predict(features, compute)
+    return float(fouling[0]), float(ttc[0])
+
+
+def configure(capacity: int) -> None:
+    global _capacity
+    with _lock:
+        _capacity = max(int(capacity), 0)
+        _evict()
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+
+
+def cache_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        stats.update(size=len(_entries), capacity=_capacity, version=_version)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"]/lookups if lookups else 0.0
+    return stats
+
+
+register_gauges("prediction_cache", cache_stats)
@@ -0,0 +1,107 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from ht.hx import P_NTU_method
+
+REQUIRED_COLUMNS = ["m1", "m2", "Cp1", "Cp2", "T1i", "T2i", "UA"]
+OPTIONAL_COLUMNS = {"subtype": "E", "Ntp": 1, "optimal": True}
+RESULT_COLUMNS = ["T1o", "T2o", "Q", "P1", "effectiveness"]
+CHUNK_SIZE = 2_000
+
+
+def read_cases(source, name: str) -> pd.DataFrame:
+    if name.lower().endswith((".parquet", ".pq")):
+        return pd.read_parquet(source)
+    return pd.read_csv(source)
+
+
+def prepare_cases(df: pd.DataFrame) -> pd.DataFrame:
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes : {', '.join(missing)}")
+    cases = df.reset_index(drop=True)
+    for col, default in OPTIONAL_COLUMNS.items():
+        if col not in cases.columns:
+            cases[col] = default
+    # A bad value fails its own row in rate_chunk, not the whole batch.
+    cases["Ntp"] = pd.to_numeric(cases["Ntp"], errors="coerce")
+    cases["optimal"] = cases["optimal"].astype(bool)
+    cases["subtype"] = cases["subtype"].astype(str)
+    return cases
+
+
+def pntu_effectiveness(r: dict) -> float:
+    # Q/Qmax of a P_NTU_method result. With equal inlet temperatures nothing
+    # is exchanged (Q = 0) and the effectiveness is undefined: NaN, not an
+    # error.
+    dT = abs(r["T1i"] - r["T2i"])
+    if dT == 0:
+        return float("nan")
+    return r["Q"]/(min(r["C1"], r["C2"])*dT)
+
+
+def rate_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    # Runs in a worker process: one P_NTU_method call per row, errors are
+    # recorded per row instead of aborting the chunk.
+    n = len(chunk)
+    out = {c: np.full(n, np.nan) for c in RESULT_COLUMNS}
+    errors = [""]*n
+    rows = zip(*(chunk[c].to_numpy() for c in REQUIRED_COLUMNS + list(OPTIONAL_COLUMNS)))
+    for i, (m1, m2, Cp1, Cp2, T1i, T2i, UA, subtype, Ntp, optimal) in enumerate(rows):
+        try:
+            r = P_NTU_method(
+                float(m1), float(m2), float(Cp1), float(Cp2),
+                T1i=float(T1i), T2i=float(T2i), UA=float(UA),
+                subtype=subtype, Ntp=int(Ntp), optimal=bool(optimal),
+            )
+            out["T1o"][i] = r["T1o"]
+            out["T2o"][i] = r["T2o"]
+            out["Q"][i] = r["Q"]
+            out["P1"][i] = r["P1"]
+            out["effectiveness"][i] = pntu_effectiveness(r)
+        except Exception as e:
+            errors[i] = f"{type(e).__name__}: {e}"
+    result = pd.DataFrame(out, index=chunk.index)
+    result["error"] = errors
+    return result
+
+
+def rate_cases(df: pd.DataFrame, workers: int | None = None, chunk_size: int = CHUNK_SIZE,
+               progress=None) -> tuple[pd.DataFrame, dict]:
+    cases = prepare_cases(df)
+    workers = workers or os.cpu_count() or 1
+    chunks = [cases.iloc[i:i + chunk_size] for i in range(0, len(cases), chunk_size)]
+    start = time.perf_counter()
+    parts = []
+    if workers == 1 or len(chunks) <= 1:
+        for k, chunk in enumerate(chunks):
+            parts.append(rate_chunk(chunk))
+            if progress is not None:
+                progress((k + 1)/len(chunks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(rate_chunk, chunk) for chunk in chunks]
+            try:
+                for k, future in enumerate(as_completed(futures)):
+                    parts.append(future.result())
+                    if progress is not None:
+                        progress((k + 1)/len(chunks))
+            except BaseException:
+                # E.g. a cancelled job: drop the chunks not started yet
+                # instead of waiting for them on pool shutdown.
+                for future in futures:
+                    future.cancel()
+                raise
+    elapsed = time.perf_counter() - start
+    results = pd.concat(parts).sort_index() if parts else pd.DataFrame(columns=RESULT_COLUMNS + ["error"])
+    out = pd.concat([cases, results], axis=1)
+    stats = {
+        "cases": len(out),
+        "errors": int((out["error"] != "").sum()),
+        "workers": workers,
+        "seconds": elapsed,
+        "cases_per_s": len(out)/elapsed if elapsed > 0 else 0.0,
+    }
+    return out, stats
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import ht
+import numpy as np
+
+# Persistent memo of calculation results, shared by every session and kept
+# across restarts. Keys hash the calculation kind, its canonical inputs, the
+# ht version and, for ML, the model version. Values are stored as JSON.
+# SQLite in WAL mode lets concurrent sessions read while one writes.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_PATH = os.environ.get("HX_RESULT_STORE", os.path.join(ROOT, ".cache", "results.sqlite"))
+MAX_BYTES = 64*1024*1024
+# The total size is checked every EVICT_EVERY writes; eviction then drops the
+# least recently used rows down to EVICT_TO of MAX_BYTES.
+EVICT_EVERY = 100
+EVICT_TO = 0.9
+# Hits only update last_used/hits in memory; the pending updates are written
+# in one transaction on the next put or eviction (or once FLUSH_AT keys are
+# pending), so reads never write to the shared file.
+FLUSH_AT = 1000
+
+_local = threading.local()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+_writes_since_check = 0
+_touched: dict[str, list] = {}  # key -> [last_used, hits]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results(last_used);
+"""
+
+
+def _connect() -> sqlite3.Connection:
+    # One connection per thread; Streamlit runs each session's script in
+    # its own thread.
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(STORE_PATH), exist_ok=True)
+        conn = sqlite3.connect(STORE_PATH, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _count(name: str, n: int = 1) -> None:
+    with _lock:
+        _stats[name] += n
+
+
+def _json_default(value):
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} non sérialisable")
+
+
+def result_key(kind: str, inputs, versions: dict | None = None) -> str:
+    payload = json.dumps(
+        [kind, inputs, {"ht": ht.__version__, **(versions or {})}],
+        sort_keys=True, default=_json_default,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get(key: str):
+    conn = _connect()
+    row = conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    with _lock:
+        touched = _touched.setdefault(key, [0.0, 0])
+        touched[0] = time.time()
+        touched[1] += 1
+        flush = len(_touched) >= FLUSH_AT
+    if flush:
+        _flush(conn)
+    return json.loads(row[0])
+
+
+def _flush(conn: sqlite3.Connection) -> None:
+    global _touched
+    with _lock:
+        if not _touched:
+            return
+        pending, _touched = _touched, {}
+    try:
+        conn.execute("BEGIN")
+        conn.executemany(
+            "UPDATE results SET last_used = MAX(last_used, ?), hits = hits + ? WHERE key = ?",
+            [(last_used, hits, key) for key, (last_used, hits) in pending.items()],
+        )
+        conn.execute("COMMIT")
+    except sqlite3.Error:
+        # The updates are only a recency hint: they are dropped.
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+
+def put(key: str, kind: str, value) -> None:
+    global _writes_since_check
+    data = json.dumps(value, default=_json_default)
+    now = time.time()
+    conn = _connect()
+    _flush(conn)
+    conn.execute(
+        "INSERT OR REPLACE INTO results (key, kind, value, size, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+        (key, kind, data, len(data), now, now),
+    )
+    _count("writes")
+    with _lock:
+        _writes_since_check += 1
+        check = _writes_since_check >= EVICT_EVERY
+        if check:
+            _writes_since_check = 0
+    if check:
+        evict()
+
+
+def evict(max_bytes: int = MAX_BYTES) -> int:
+    conn = _connect()
+    _flush(conn)
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+    if total <= max_bytes:
+        return 0
+    target = total - int(max_bytes*EVICT_TO)
+    # Oldest-used rows until enough bytes are freed.
+    cur = conn.execute(
+        """DELETE FROM results WHERE key IN (
+               SELECT key FROM (
+                   SELECT key, size, SUM(size) OVER (ORDER BY last_used, key) AS freed FROM results
+               ) WHERE freed - size < ?
+           )""",
+        (target,),
+    )
+    removed = cur.rowcount
+    _count("evictions", removed)
+    return removed
+
+
+def memoize(kind: str, inputs, compute, versions: dict | None = None):
+    # Returns the stored result for these inputs, or computes and stores it.
+    # Any store failure (locked, corrupt, read-only disk) falls back to
+    # computing without the store.
+    try:
+        key = result_key(kind, inputs, versions)
+        value = get(key)
+    except (sqlite3.Error, OSError, ValueError):
+        _count("errors")
+        return compute()
+    if value is not None:
+        _count("hits")
+        return value
+    _count("misses")
+    value = compute()
+    try:
+        put(key, kind, value)
+    except (sqlite3.Error, OSError, TypeError, ValueError):
+        _count("errors")
+    return value
+
+
+def store_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"]/lookups if lookups else 0.0
+    try:
+        rows, size = _connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+    except sqlite3.Error:
+        rows, size = None, None
+    stats.update(rows=rows, bytes=size, path=STORE_PATH)
+    return stats
+
+
+def clear() -> None:
+    with _lock:
+        _touched.clear()
+    _connect().execute("DELETE FROM results")
+
+
+# Stored variants of the utils/calc.py functions, used by the forms and the
+# "Calculer tout" pipeline.
+
+def stored_geometry(g: dict) -> dict:
+    from utils.calc import compute_geometry
+    return memoize("geometry", g, lambda: compute_geometry(g))
+
+
+def stored_clearance(c: dict) -> float:
+    from utils.calc import compute_clearance
+    return memoize("clearance", c, lambda: compute_clearance(c))
+
+
+def stored_pntu(p: dict) -> dict:
+    from utils.calc import compute_pntu
+    return memoize("pntu", p, lambda: compute_pntu(p))
+
+
+def stored_prediction(features: dict) -> tuple[float, float]:
+    # The in-memory cache (utils/prediction_cache.py) first; on a miss, the
+    # stored value for the quantized features, else the models.
+    from utils.models import FEATURE_COLUMNS, model_version, predict_fouling_ttc
+    from utils.prediction_cache import cached_prediction
+
+    def compute(snapped):
+        inputs = {c: round(float(v), 6) for c, v in zip(FEATURE_COLUMNS, snapped[0])}
+        value = memoize(
+            "ml", inputs,
+            lambda: [float(v[0]) for v in predict_fouling_ttc(snapped)],
+            versions={"models": model_version()},
+        )
+        return [value[0]], [value[1]]
+
+    return cached_prediction(features, compute)
@@ -0,0 +1,296 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from utils.calc import ML_DEFAULTS
+from utils.models import FEATURE_COLUMNS, FOULING_CRITICAL, predict_fouling_ttc
+
+# Fleet cleaning calendar driven by the fouling and TTC models.
+#
+# Each unit keeps its current operating conditions while
+# runtime_since_cleaning_hr advances step by step. Both models are evaluated
+# once on the whole (unit x runtime step) grid, one batched call each. A
+# unit is due for cleaning once its runtime reaches the earliest predicted
+# cleaning date along that trajectory (runtime + TTC), or once its fouling
+# reaches FOULING_CRITICAL.
+#
+# The calendar minimises the capacity-hours lost to fouling plus the hours
+# lost to cleaning downtime (weighted per unit), with a heavy penalty for
+# running past due, and at most `crews` units being cleaned at once. Without
+# the crew limit each unit is an independent dynamic programme over the
+# state "steps since cleaning", solved for all units at once with array
+# operations; the shared limit is priced in by Lagrangian relaxation (a
+# per-step price raised where too many cleanings overlap), and what is left
+# is dispatched greedily, most urgent unit first.
+#
+#   python -m utils.schedule flotte.csv --years 3 --crews 4 -o calendrier.csv
+UNIT_COLUMN = "unit"
+DOWNTIME_H = 48.0
+STEP_H = 24.0
+HORIZON_YEARS = 3.0
+CREWS = 4
+OVERDUE_PENALTY = 1000.0
+# Runtime covered by the projection; predictions are held constant beyond.
+MAX_RUNTIME_H = 8760.0
+LAGRANGE_ITERATIONS = 20
+# Crew price step, as a fraction of the median cleaning cost.
+PRICE_STEP = 0.05
+# Memory for the DP decisions (one bit per step, unit and state). A 1 h step
+# over 3 years would need several GB for 120 units: such problems are
+# refused rather than allocated in the server process.
+DP_MAX_BYTES = 256*1024*1024
+
+
+def prepare_fleet(df: pd.DataFrame) -> pd.DataFrame:
+    fleet = df.copy()
+    if UNIT_COLUMN not in fleet.columns:
+        fleet[UNIT_COLUMN] = [f"HX-{i + 1:03d}" for i in range(len(fleet))]
+    for c in FEATURE_COLUMNS:
+        if c not in fleet.columns:
+            fleet[c] = ML_DEFAULTS[c]
+    if "downtime_h" not in fleet.columns:
+        fleet["downtime_h"] = DOWNTIME_H
+    if "weight" not in fleet.columns:
+        fleet["weight"] = 1.0
+    return fleet.reset_index(drop=True)
+
+
+def project(fleet: pd.DataFrame, step_h: float, n_steps: int, m_foul=None, m_ttc=None) -> tuple:
+    # fouling[u, k] and ttc[u, k]: predictions for unit u, k steps after a
+    # cleaning. One predict call per model for the whole fleet.
+    U = len(fleet)
+    X = np.repeat(fleet[FEATURE_COLUMNS].to_numpy(dtype=np.float32), n_steps, axis=0)
+    X[:, FEATURE_COLUMNS.index("runtime_since_cleaning_hr")] = np.tile(
+        np.arange(n_steps, dtype=np.float32)*step_h, U)
+    fouling, ttc = predict_fouling_ttc(X, m_foul, m_ttc)
+    return fouling.astype(float).reshape(U, n_steps), ttc.astype(float).reshape(U, n_steps)
+
+
+def due_runtime(fouling: np.ndarray, ttc: np.ndarray, step_h: float) -> np.ndarray:
+    # Runtime at which each unit is due: the earliest predicted cleaning
+    # date along its trajectory (runtime + TTC), or critical fouling if that
+    # comes first.
+    grid_h = np.arange(fouling.shape[1])*step_h
+    due = (grid_h + ttc).min(axis=1)
+    critical = fouling >= FOULING_CRITICAL
+    return np.where(critical.any(axis=1), np.minimum(due, grid_h[critical.argmax(axis=1)]), due)
+
+
+def _occupancy(starts: np.ndarray, d: np.ndarray) -> np.ndarray:
+    # Units under cleaning per step, for cleanings starting at `starts`.
+    T = starts.shape[1]
+    occ = np.zeros(T)
+    for span in np.unique(d):
+        occ += np.convolve(starts[d == span].sum(axis=0), np.ones(span))[:T]
+    return occ
+
+
+def _solve_units(run_cost, clean_cost, d, k0, price):
+    # Backward DP for all units at once. run_cost[u, k]: cost of running a
+    # step k steps after cleaning; a cleaning costs clean_cost[u] plus the
+    # crew price of the d[u] steps it takes, after which the unit restarts
+    # at k = 0. Returns the cleaning starts of the optimal plan. Decisions
+    # are kept as bits, (T, U, ceil(K/8)) bytes.
+    U, K = run_cost.shape
+    T = len(price)
+    rows = np.arange(U)
+    P = np.zeros(T + d.max() + 1)
+    P[1:T + 1] = np.cumsum(price)
+    P[T + 1:] = P[T]
+    V0 = np.zeros((T + d.max() + 1, U))
+    V = np.zeros((U, K))
+    clean = np.zeros((T, U, (K + 7)//8), dtype=np.uint8)
+    nxt = np.minimum(np.arange(K) + 1, K - 1)
+    for t in range(T - 1, -1, -1):
+        cont = run_cost + V[:, nxt]
+        cl = (clean_cost + P[t + d] - P[t] + V0[t + d, rows])[:, None]
+        decision = cl < cont
+        clean[t] = np.packbits(decision, axis=1)
+        V = np.where(decision, cl, cont)
+        V0[t] = V[:, 0]
+    k, busy = k0.copy(), np.zeros(U, dtype=int)
+    starts = np.zeros((U, T), dtype=bool)
+    for t in range(T):
+        starts[:, t] = (busy == 0) & ((clean[t, rows, k >> 3] >> (7 - (k & 7))) & 1).astype(bool)
+        busy = np.where(starts[:, t], d, busy)
+        k = np.where(busy > 0, 0, np.minimum(k + 1, K - 1))
+        busy = np.maximum(busy - 1, 0)
+    return starts
+
+
+def _dispatch(fouling, overdue, d, k0, crews, plan=None):
+    # Runs the fleet forward under the crew limit. Units ask for a cleaning
+    # once they are due, or earlier when `plan` says so; requests
+    # that do not fit are carried to the next step, overdue and most fouled
+    # units first. Returns the cleaning starts, the fouling trajectory (NaN
+    # while a unit is down) and the steps each unit ran past due.
+    U, K = fouling.shape
+    T = len(crews)
+    rows = np.arange(U)
+    capacity = np.concatenate([crews, np.full(d.max(), crews[-1])])
+    occ = np.zeros(len(capacity))
+    starts = np.zeros((U, T), dtype=bool)
+    traj = np.empty((U, T))
+    k, busy = k0.copy(), np.zeros(U, dtype=int)
+    waiting = np.zeros(U, dtype=bool)
+    late = np.zeros(U, dtype=int)
+    for t in range(T):
+        ask = overdue[rows, k] if plan is None else overdue[rows, k] | plan[:, t]
+        waiting |= ask & (busy == 0)
+        candidates = np.flatnonzero(waiting)
+        if len(candidates):
+            urgency = overdue[candidates, k[candidates]] + fouling[candidates, k[candidates]]
+            for u in candidates[np.argsort(-urgency, kind="stable")]:
+                if occ[t] >= capacity[t]:
+                    break
+                span = slice(t, t + d[u])
+                if (occ[span] < capacity[span]).all():
+                    occ[span] += 1
+                    starts[u, t] = True
+                    busy[u] = d[u]
+                    waiting[u] = False
+        down = busy > 0
+        traj[:, t] = np.where(down, np.nan, fouling[rows, k])
+        late += ~down & overdue[rows, k]
+        k = np.where(down, 0, np.minimum(k + 1, K - 1))
+        busy = np.maximum(busy - 1, 0)
+    return starts, traj, late
+
+
+def optimize(fleet: pd.DataFrame, horizon_years: float = HORIZON_YEARS, step_h: float = STEP_H,
+             crews=CREWS, start=None, m_foul=None, m_ttc=None,
+             iterations: int = LAGRANGE_ITERATIONS, progress=None) -> dict:
+    t0 = time.perf_counter()
+    fleet = prepare_fleet(fleet)
+    U = len(fleet)
+    T = int(round(horizon_years*8760/step_h))
+    crews = np.broadcast_to(np.asarray(crews, dtype=int), (T,)).copy()
+    if U == 0 or T == 0:
+        raise ValueError("Flotte vide ou horizon nul.")
+    if (crews < 1).all():
+        raise ValueError("Au moins une équipe de nettoyage est nécessaire.")
+    runtime = fleet["runtime_since_cleaning_hr"].to_numpy(dtype=float)
+    k_now = np.round(runtime/step_h).astype(int)
+    n_steps = min(int(k_now.max()) + T, int(MAX_RUNTIME_H/step_h)) + 1
+    k_now = np.minimum(k_now, n_steps - 1)
+    fouling, ttc = project(fleet, step_h, n_steps, m_foul, m_ttc)
+    predict_s = time.perf_counter() - t0
+
+    grid_h = np.arange(n_steps)*step_h
+    due_h = due_runtime(fouling, ttc, step_h)
+    overdue = grid_h >= due_h[:, None]
+    # Beyond the last step where anything changes, the state "steps since
+    # cleaning" can be capped without changing the problem.
+    changing = np.flatnonzero((np.diff(fouling, axis=1) != 0).any(axis=0) | (np.diff(overdue, axis=1)).any(axis=0))
+    K = min(n_steps, int(changing.max()) + 2 if len(changing) else 1)
+    fouling, overdue = fouling[:, :K], overdue[:, :K]
+    k0 = np.minimum(k_now, K - 1)
+    dp_bytes = T*U*((K + 7)//8)
+    if dp_bytes > DP_MAX_BYTES:
+        # T and K both scale with 1/step_h.
+        min_step = step_h*np.sqrt(dp_bytes/DP_MAX_BYTES)
+        raise ValueError(
+            f"Problème trop grand ({U} échangeurs × {T:,} pas × {K:,} états, {dp_bytes/1e9:.1f} Go) : "
+            f"pas de temps d'au moins {np.ceil(min_step):g} h, horizon plus court ou flotte plus petite."
+        )
+
+    weight = fleet["weight"].to_numpy(dtype=float)
+    downtime = fleet["downtime_h"].to_numpy(dtype=float)
+    d = np.maximum(np.ceil(downtime/step_h).astype(int), 1)
+    run_cost = weight[:, None]*step_h*(fouling + OVERDUE_PENALTY*overdue)
+    clean_cost = weight*downtime
+
+    def evaluate(plan):
+        starts, traj, late = _dispatch(fouling, overdue, d, k0, crews, plan)
+        cost = weight*(np.nansum(traj, axis=1)*step_h + downtime*starts.sum(axis=1))
+        return starts, traj, late, cost, cost.sum() + OVERDUE_PENALTY*step_h*(weight*late).sum()
+
+    # Subgradient ascent on the per-step crew prices. The iterates do not
+    # settle exactly, so each plan is dispatched and the best calendar kept,
+    # the due-date-only calendar included.
+    reactive = evaluate(None)
+    best = reactive
+    price = np.zeros(T)
+    scale = PRICE_STEP*(float(np.median(clean_cost)) or step_h)
+    for i in range(iterations):
+        plan = _solve_units(run_cost, clean_cost, d, k0, price)
+        result = evaluate(plan)
+        if result[4] < best[4]:
+            best = result
+        if progress is not None:
+            progress((i + 1)/iterations)
+        excess = _occupancy(plan, d) - crews
+        if (excess <= 0).all():
+            break
+        price = np.maximum(price + scale/np.sqrt(1 + i)*excess, 0.0)
+    starts, traj, planned_late, planned_cost, _ = best
+    _, _, reactive_late, reactive_cost, _ = reactive
+
+    units = fleet[UNIT_COLUMN].astype(str).to_numpy()
+    u_idx, t_idx = np.nonzero(starts)
+    before = np.where(t_idx > 0, traj[u_idx, np.maximum(t_idx - 1, 0)], fouling[u_idx, k0[u_idx]])
+    calendar = pd.DataFrame({
+        UNIT_COLUMN: units[u_idx],
+        "step": t_idx,
+        "start_h": t_idx*step_h,
+        "downtime_h": downtime[u_idx],
+        "fouling_before": before,
+    })
+    if start is not None:
+        calendar.insert(2, "date", pd.Timestamp(start) + pd.to_timedelta(calendar["start_h"], unit="h"))
+    calendar = calendar.sort_values(["step", UNIT_COLUMN]).reset_index(drop=True)
+    per_unit = pd.DataFrame({
+        UNIT_COLUMN: units,
+        "runtime_h": runtime,
+        "fouling_now": fouling[np.arange(U), k0],
+        "ttc_now_h": ttc[np.arange(U), k_now],
+        "due_runtime_h": due_h,
+        "cleanings": starts.sum(axis=1),
+        "max_fouling": np.nanmax(traj, axis=1),
+        "late_steps": planned_late,
+        "cost_h": planned_cost,
+        "reactive_cost_h": reactive_cost,
+    })
+    return {
+        "calendar": calendar,
+        "units": per_unit,
+        "trajectories": traj,
+        "crew_usage": _occupancy(starts, d),
+        "crews": crews,
+        "step_h": step_h,
+        "steps": T,
+        "cost_h": float(planned_cost.sum()),
+        "reactive_cost_h": float(reactive_cost.sum()),
+        "late_steps": int(planned_late.sum()),
+        "reactive_late_steps": int(reactive_late.sum()),
+        "reactive_cleanings": int(reactive[0].sum()),
+        "model_rows": U*n_steps,
+        "predict_s": predict_s,
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def main(argv=None) -> int:
+    from utils.rating import read_cases
+    parser = argparse.ArgumentParser(description="Calendrier de nettoyage d'une flotte d'échangeurs.")
+    parser.add_argument("input", help="Flotte (CSV/Parquet) : une ligne par échangeur avec les features ML")
+    parser.add_argument("-o", "--output", default=None, help="Calendrier CSV")
+    parser.add_argument("--years", type=float, default=HORIZON_YEARS)
+    parser.add_argument("--step-h", type=float, default=STEP_H)
+    parser.add_argument("--crews", type=int, default=CREWS, help="Nettoyages simultanés possibles")
+    parser.add_argument("--start", default=None, help="Date de début (AAAA-MM-JJ)")
+    args = parser.parse_args(argv)
+    with open(args.input, "rb") as f:
+        fleet = read_cases(f, args.input)
+    r = optimize(fleet, args.years, args.step_h, args.crews, args.start)
+    print(f"{len(r['units'])} échangeurs, {r['steps']} pas de {r['step_h']:g} h : "
+          f"{len(r['calendar'])} nettoyages en {r['seconds']:.2f} s ({r['model_rows']:,} prédictions par modèle)")
+    print(f"Heures perdues : {r['cost_h']:,.0f} (nettoyage à l'échéance : {r['reactive_cost_h']:,.0f}), "
+          f"pas en retard : {r['late_steps']} (à l'échéance : {r['reactive_late_steps']})")
+    if args.output:
+        r["calendar"].to_csv(args.output, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,151 @@
+import argparse
+import itertools
+import time
+import numpy as np
+import pandas as pd
+from utils.calc import ML_DEFAULTS, ML_RANGES
+from utils.models import FEATURE_COLUMNS, feature_matrix, get_models, predict_fouling_ttc
+
+# Sensitivity of the fouling and TTC models around an operating point.
+# One-way grids move each feature over its form range with the others held
+# at the point; two-way grids do the same for a pair of features. Every
+# grid of a report is stacked into one feature matrix and scored in a
+# single fused predict call (11 one-way grids and the 55 pairs: ~25 000
+# rows), so the whole report costs about as much as one batch prediction.
+POINTS = 41       # per one-way grid
+PAIR_POINTS = 21  # per axis of a two-way grid
+OUTPUTS = ["fouling", "ttc_h"]
+
+
+def grid(name: str, points: int) -> np.ndarray:
+    lo, hi = ML_RANGES[name]
+    return np.linspace(lo, hi, points)
+
+
+def contributions(X, m_foul=None, m_ttc=None, approx: bool = False) -> dict[str, pd.DataFrame]:
+    # Per-feature SHAP contributions (xgboost pred_contribs) of every row of
+    # X, for both models, plus the bias column; a row sums to the raw model
+    # output (before TTC is clipped at 0). Exact TreeSHAP costs ~3 ms per row
+    # and model here; approx (Saabas) is ~70x faster.
+    import xgboost as xgb
+    if m_foul is None or m_ttc is None:
+        m_foul, m_ttc = get_models()
+    A = feature_matrix(X)
+    dmatrix = xgb.DMatrix(A, feature_names=FEATURE_COLUMNS)
+    columns = FEATURE_COLUMNS + ["bias"]
+    return {
+        output: pd.DataFrame(model.get_booster().predict(dmatrix, pred_contribs=True, approx_contribs=approx),
+                             columns=columns)
+        for output, model in zip(OUTPUTS, (m_foul, m_ttc))
+    }
+
+
+def analyze(features: dict | None = None, names: list[str] | None = None, pairs="all",
+            points: int = POINTS, pair_points: int = PAIR_POINTS, m_foul=None, m_ttc=None) -> dict:
+    # pairs: "all" (every pair of `names`), a list of (x, y) names, or None.
+    start = time.perf_counter()
+    features = {**ML_DEFAULTS, **(features or {})}
+    names = list(names or FEATURE_COLUMNS)
+    if pairs == "all":
+        pairs = list(itertools.combinations(names, 2))
+    pairs = list(pairs or [])
+    for name in names + [n for pair in pairs for n in pair]:
+        if name not in ML_RANGES:
+            raise ValueError(f"Feature inconnue : {name}")
+    if m_foul is None or m_ttc is None:
+        m_foul, m_ttc = get_models()
+    column = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+    base = np.array([float(features[c]) for c in FEATURE_COLUMNS])
+
+    blocks = [base[None, :]]
+    for name in names:
+        block = np.repeat(base[None, :], points, axis=0)
+        block[:, column[name]] = grid(name, points)
+        blocks.append(block)
+    for x, y in pairs:
+        gx, gy = np.meshgrid(grid(x, pair_points), grid(y, pair_points))
+        block = np.repeat(base[None, :], gx.size, axis=0)
+        block[:, column[x]] = gx.ravel()
+        block[:, column[y]] = gy.ravel()
+        blocks.append(block)
+    X = np.concatenate(blocks)
+    fouling, ttc = predict_fouling_ttc(X, m_foul, m_ttc)
+
+    base_fouling, base_ttc = float(fouling[0]), float(ttc[0])
+    i = 1
+    one_way = []
+    for name in names:
+        one_way.append(pd.DataFrame({
+            "feature": name, "value": X[i:i + points, column[name]],
+            "fouling": fouling[i:i + points], "ttc_h": ttc[i:i + points],
+        }))
+        i += points
+    one_way = pd.concat(one_way, ignore_index=True) if one_way else pd.DataFrame(
+        columns=["feature", "value", "fouling", "ttc_h"])
+    two_way = {}
+    n = pair_points*pair_points
+    for x, y in pairs:
+        two_way[(x, y)] = {
+            "x": grid(x, pair_points), "y": grid(y, pair_points),
+            "fouling": fouling[i:i + n].reshape(pair_points, pair_points),
+            "ttc_h": ttc[i:i + n].reshape(pair_points, pair_points),
+        }
+        i += n
+
+    # Tornado: output range over each feature's grid, widest swing first.
+    grouped = one_way.groupby("feature", sort=False)
+    tornado = pd.DataFrame({
+        "fouling_min": grouped["fouling"].min(),
+        "fouling_max": grouped["fouling"].max(),
+        "ttc_min_h": grouped["ttc_h"].min(),
+        "ttc_max_h": grouped["ttc_h"].max(),
+    })
+    tornado["fouling_swing"] = tornado["fouling_max"] - tornado["fouling_min"]
+    tornado["ttc_swing_h"] = tornado["ttc_max_h"] - tornado["ttc_min_h"]
+    tornado = tornado.sort_values("fouling_swing", ascending=False)
+
+    contrib = contributions(base, m_foul, m_ttc)
+    return {
+        "features": features,
+        "base": {"fouling": base_fouling, "ttc_h": base_ttc},
+        "one_way": one_way,
+        "tornado": tornado,
+        "two_way": two_way,
+        "contributions": pd.DataFrame({output: df.iloc[0] for output, df in contrib.items()}),
+        "rows": len(X),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main(argv=None) -> int:
+    from utils.rating import read_cases
+    parser = argparse.ArgumentParser(description="Sensibilité des modèles d'encrassement et de TTC.")
+    parser.add_argument("--input", default=None,
+                        help="Fichier CSV/Parquet : contributions par feature de chaque ligne (sinon rapport "
+                             "de sensibilité au point par défaut)")
+    parser.add_argument("-o", "--output", default=None, help="CSV de sortie")
+    parser.add_argument("--points", type=int, default=POINTS)
+    parser.add_argument("--pair-points", type=int, default=PAIR_POINTS)
+    parser.add_argument("--approx", action="store_true", help="Contributions approchées (Saabas), plus rapides")
+    args = parser.parse_args(argv)
+    if args.input:
+        with open(args.input, "rb") as f:
+            cases = read_cases(f, args.input)
+        start = time.perf_counter()
+        contrib = contributions(cases, approx=args.approx)
+        out = pd.concat({output: df for output, df in contrib.items()}, axis=1)
+        out.columns = [f"{output}.{name}" for output, name in out.columns]
+        print(f"{len(cases):,} lignes en {time.perf_counter() - start:.2f} s")
+    else:
+        r = analyze(points=args.points, pair_points=args.pair_points)
+        out = r["tornado"]
+        print(f"{r['rows']:,} prédictions en {r['seconds']:.2f} s "
+              f"(encrassement {r['base']['fouling']:.3f}, TTC {r['base']['ttc_h']:,.0f} h)")
+        print(out.round(3).to_string())
+    if args.output:
+        out.to_csv(args.output, index=not args.input)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
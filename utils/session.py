@@ -4,7 +4,10 @@ def init_session_state() -> None:
         "DB_Perry", "N_Perry", "DB_HEDH", "DB_Phadkeb", "DB_VDI",
         "DShell_min", "clearance_auto", "dB_hole", "L_max",
         "inputs_geometry", "inputs_pntu", "clearance_result",
-        "fouling_prediction", "ttc_prediction"
+        "fouling_prediction", "ttc_prediction",
+        "inputs_clearance", "inputs_ml", "pntu_result", "summary_table",
+        "pipeline_fingerprints", "pipeline_timings", "pntu_uncertainty",
+        "pntu_degradation", "sensitivity"
     ]
     for k in keys:
         if k not in st.session_state:
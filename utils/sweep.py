@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import product
+import numpy as np
+import pandas as pd
+from ht.hx import DBundle_for_Ntubes_Phadkeb
+
+SWEEP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "sweeps")
+
+INCH = 0.0254
+# Standard TEMA tube outside diameters, 1/4" to 2".
+STANDARD_DO = [round(x*INCH, 6) for x in (0.25, 0.375, 0.5, 0.625, 0.75, 0.875, 1.0, 1.25, 1.5, 2.0)]
+PITCH_RATIOS = [1.25, 1.30, 1.35, 1.40, 1.45, 1.50]
+ANGLES = [30, 45, 60, 90]
+PASSES = [1, 2]
+N_MAX = 2000
+
+COLUMNS = ["Do", "pitch_ratio", "pitch", "angle", "Ntp", "N",
+           "DB_Perry", "DB_HEDH", "DB_Phadkeb", "DB_VDI"]
+
+
+def sweep_block(pitch_ratio: float, angle: int, Ntp: int, Do_values: list, N_max: int) -> pd.DataFrame:
+    # One (pitch ratio, angle, passes) block for every Do and N = 1..N_max.
+    # Phadkeb's tube count depends on the bundle only through (D - Do)/pitch,
+    # so at a fixed pitch ratio its bisection result scales linearly with Do:
+    # it is solved once per N at Do = 1 m and rescaled, instead of once per
+    # (Do, N). HEDH and VDI are closed-form and evaluated as arrays.
+    N = np.arange(1, N_max + 1)
+    phadkeb_unit = np.array([
+        DBundle_for_Ntubes_Phadkeb(int(n), 1.0, pitch_ratio, Ntp, angle) for n in N
+    ])
+    Do = np.repeat(np.asarray(Do_values, dtype=float), len(N))
+    NN = np.tile(N, len(Do_values))
+    pitch = Do*pitch_ratio
+    C1 = 13/15. if angle in (30, 60) else 1.
+    f1 = 1.1 if angle in (30, 60) else 1.3
+    f2 = {1: 0., 2: 22., 4: 70., 6: 90., 8: 105.}[Ntp]
+    db_hedh = Do + (1./.78)**0.5*pitch*(C1*NN)**0.5
+    db_vdi = (f1*NN*(pitch*1000)**2 + f2*NN**0.5*pitch*1000 + Do*1000)**0.5/1000.
+    db_phadkeb = Do*np.tile(phadkeb_unit, len(Do_values))
+    return pd.DataFrame({
+        "Do": Do,
+        "pitch_ratio": np.full(len(Do), pitch_ratio),
+        "pitch": pitch,
+        "angle": np.full(len(Do), angle, dtype=np.int16),
+        "Ntp": np.full(len(Do), Ntp, dtype=np.int8),
+        "N": NN.astype(np.int32),
+        # size_bundle_from_tubecount() with its default Method is Phadkeb,
+        # which is what the geometry page reports as "Perry".
+        "DB_Perry": db_phadkeb,
+        "DB_HEDH": db_hedh,
+        "DB_Phadkeb": db_phadkeb,
+        "DB_VDI": db_vdi,
+    })
+
+
+def sweep_path(Do_values, pitch_ratios, angles, passes, N_max) -> str:
+    spec = json.dumps([list(Do_values), list(pitch_ratios), list(angles), list(passes), N_max])
+    digest = hashlib.sha1(spec.encode()).hexdigest()[:12]
+    return os.path.join(SWEEP_DIR, f"bundle_sweep_{digest}.parquet")
+
+
+def run_sweep(Do_values=STANDARD_DO, pitch_ratios=PITCH_RATIOS, angles=ANGLES, passes=PASSES,
+              N_max: int = N_MAX, output_path: str | None = None, workers: int | None = None,
+              progress=None) -> dict:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    output_path = output_path or sweep_path(Do_values, pitch_ratios, angles, passes, N_max)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    blocks = list(product(pitch_ratios, angles, passes))
+    workers = workers or os.cpu_count() or 1
+    tmp_path = output_path + ".tmp"
+    writer = None
+    rows = 0
+    start = time.perf_counter()
+
+    def write(df):
+        nonlocal writer, rows
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(tmp_path, table.schema)
+        writer.write_table(table)
+        rows += len(df)
+
+    try:
+        if workers == 1:
+            for k, (ratio, angle, Ntp) in enumerate(blocks):
+                write(sweep_block(ratio, angle, Ntp, list(Do_values), N_max))
+                if progress is not None:
+                    progress((k + 1)/len(blocks))
+        else:
+            # Keep at most 2 blocks per worker in flight so finished results
+            # go to disk instead of piling up in memory.
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = set()
+                todo = iter(blocks)
+                done = 0
+                for ratio, angle, Ntp in todo:
+                    pending.add(pool.submit(sweep_block, ratio, angle, Ntp, list(Do_values), N_max))
+                    if len(pending) >= 2*workers:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for f in finished:
+                            write(f.result())
+                            done += 1
+                            if progress is not None:
+                                progress(done/len(blocks))
+                for f in pending:
+                    write(f.result())
+                    done += 1
+                    if progress is not None:
+                        progress(done/len(blocks))
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, output_path)
+    elapsed = time.perf_counter() - start
+    return {"path": output_path, "rows": rows, "seconds": elapsed}
+
+
+def sweep_N_max(path: str) -> int:
+    # Largest N of a sweep file, from the Parquet footer statistics (no data
+    # read), for the filters of the sweep actually run.
+    import pyarrow.parquet as pq
+    meta = pq.ParquetFile(path).metadata
+    column = meta.schema.names.index("N")
+    values = [meta.row_group(i).column(column).statistics for i in range(meta.num_row_groups)]
+    if values and all(v is not None and v.has_min_max for v in values):
+        return int(max(v.max for v in values))
+    return int(pq.read_table(path, columns=["N"])["N"].to_numpy().max(initial=1))
+
+
+def query_sweep(path: str, Do=None, pitch_ratio=None, angle=None, Ntp=None,
+                N_range=None, limit: int | None = None) -> pd.DataFrame:
+    # Reads only the rows matching the filters from the Parquet file.
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(path, format="parquet")
+    expr = None
+    for col, values in (("Do", Do), ("pitch_ratio", pitch_ratio), ("angle", angle), ("Ntp", Ntp)):
+        if values:
+            term = ds.field(col).isin(list(values))
+            expr = term if expr is None else expr & term
+    if N_range is not None:
+        term = (ds.field("N") >= N_range[0]) & (ds.field("N") <= N_range[1])
+        expr = term if expr is None else expr & term
+    if limit is not None:
+        return dataset.head(limit, filter=expr).to_pandas()
+    return dataset.to_table(filter=expr).to_pandas()
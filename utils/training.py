@@ -0,0 +1,321 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from utils.batch_scoring import detect_format, iter_chunks
+from utils.models import (
+    CURRENT_FILE, FEATURE_COLUMNS, FOULING_CRITICAL, FOULING_WARNING, MODEL_DIR, MODEL_FILES, NATIVE_FORMATS,
+    export_native, get_models, model_version, served_version, version_file,
+)
+
+# Continued training of the fouling and TTC models on plant data.
+#
+# Historian exports (CSV or Parquet, any number of files) are streamed chunk
+# by chunk through an xgboost.DataIter into an external-memory quantile
+# DMatrix, so the data never has to fit in RAM. Boosting continues from the
+# model currently served; every VALID_EVERY-th row is held out to validate
+# both the current and the retrained model. Each run writes a versioned
+# directory under models/ (native UBJSON boosters + report.json) that the
+# app serves once promoted:
+#
+#   python -m utils.training train historian/*.parquet --rounds 200 --promote
+#   python -m utils.training list
+#   python -m utils.training promote 20260301-101500
+#   python -m utils.training export --format ubj --promote   # served models, natively
+TARGET_COLUMNS = {"fouling": "fouling", "ttc": "ttc_hr"}
+VALID_EVERY = 10
+CHUNK_ROWS = 200_000
+ROUNDS = 100
+EARLY_STOPPING = 20
+PARAMS = {
+    "objective": "reg:squarederror",
+    "tree_method": "hist",
+    "eta": 0.1,
+    "max_depth": 6,
+    "max_bin": 256,
+    "nthread": 0,
+}
+
+
+def expand_paths(patterns) -> list[str]:
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        paths.extend(matches or [pattern])
+    missing = [p for p in paths if not os.path.exists(p)]
+    if missing:
+        raise FileNotFoundError(f"Fichiers introuvables : {', '.join(missing)}")
+    return paths
+
+
+def iter_split(paths, target: str, part: str, chunk_rows: int = CHUNK_ROWS):
+    # Yields (X float32, y) for the train or valid part. The split is on the
+    # global row number, so it is the same on every pass over the data.
+    offset = 0
+    for path in paths:
+        for chunk, _ in iter_chunks(path, detect_format(path), chunk_rows):
+            idx = offset + np.arange(len(chunk))
+            offset += len(chunk)
+            held_out = idx % VALID_EVERY == 0
+            chunk = chunk[held_out if part == "valid" else ~held_out]
+            missing = [c for c in (*FEATURE_COLUMNS, target) if c not in chunk.columns]
+            if missing:
+                raise ValueError(f"{path} : colonnes manquantes : {', '.join(missing)}")
+            chunk = chunk[chunk[target].notna()]
+            if len(chunk):
+                yield chunk[FEATURE_COLUMNS].to_numpy(dtype=np.float32), chunk[target].to_numpy(dtype=np.float32)
+
+
+def _data_iter(paths, target: str, part: str, cache_prefix: str, chunk_rows: int):
+    import xgboost as xgb
+
+    class ChunkIter(xgb.DataIter):
+        def __init__(self):
+            self._it = None
+            self.rows = 0
+            super().__init__(cache_prefix=cache_prefix)
+
+        def next(self, input_data) -> bool:
+            if self._it is None:
+                self._it = iter_split(paths, target, part, chunk_rows)
+                self.rows = 0
+            batch = next(self._it, None)
+            if batch is None:
+                return False
+            input_data(data=batch[0], label=batch[1], feature_names=FEATURE_COLUMNS)
+            self.rows += len(batch[1])
+            return True
+
+        def reset(self) -> None:
+            self._it = None
+
+    return ChunkIter()
+
+
+def _metrics(booster, paths, target, chunk_rows, status: bool) -> dict:
+    # Streaming RMSE / MAE / R² (and status-band agreement for fouling).
+    n = s_err2 = s_abs = s_y = s_y2 = 0.0
+    agree = 0
+    for X, y in iter_split(paths, target, "valid", chunk_rows):
+        pred = booster.inplace_predict(X)
+        err = pred - y
+        n += len(y)
+        s_err2 += float(np.dot(err, err))
+        s_abs += float(np.abs(err).sum())
+        s_y += float(y.sum())
+        s_y2 += float(np.dot(y, y))
+        if status:
+            bands = np.array([FOULING_WARNING, FOULING_CRITICAL])
+            agree += int((np.searchsorted(bands, pred, "right") == np.searchsorted(bands, y, "right")).sum())
+    if n == 0:
+        return {"rows": 0}
+    ss_tot = s_y2 - s_y*s_y/n
+    out = {
+        "rows": int(n),
+        "rmse": (s_err2/n)**0.5,
+        "mae": s_abs/n,
+        "r2": 1 - s_err2/ss_tot if ss_tot > 0 else float("nan"),
+    }
+    if status:
+        out["status_agreement"] = agree/n
+    return out
+
+
+def train_model(name: str, base_model, paths, target: str, rounds: int = ROUNDS,
+                params: dict | None = None, chunk_rows: int = CHUNK_ROWS, log=print) -> tuple:
+    import xgboost as xgb
+    params = {**PARAMS, **(params or {})}
+    base = base_model.get_booster()
+    with tempfile.TemporaryDirectory(prefix="hx_train_") as cache:
+        train_it = _data_iter(paths, target, "train", os.path.join(cache, "train"), chunk_rows)
+        valid_it = _data_iter(paths, target, "valid", os.path.join(cache, "valid"), chunk_rows)
+        start = time.perf_counter()
+        dtrain = xgb.ExtMemQuantileDMatrix(train_it, max_bin=params["max_bin"])
+        dvalid = xgb.ExtMemQuantileDMatrix(valid_it, ref=dtrain)
+        log(f"{name} : {dtrain.num_row():,} lignes d'entraînement, {dvalid.num_row():,} de validation "
+            f"({time.perf_counter() - start:.1f} s)")
+        history = {}
+        booster = xgb.train(
+            params, dtrain, num_boost_round=rounds, xgb_model=base,
+            evals=[(dvalid, "valid")], evals_result=history,
+            early_stopping_rounds=EARLY_STOPPING, verbose_eval=False,
+        )
+        booster = booster[:booster.best_iteration + 1]
+        seconds = time.perf_counter() - start
+        train_rows = int(dtrain.num_row())
+        # Release the external-memory pages before their cache directory goes.
+        del dtrain, dvalid
+    baseline = _metrics(base, paths, target, chunk_rows, status=name == "fouling")
+    candidate = _metrics(booster, paths, target, chunk_rows, status=name == "fouling")
+    report = {
+        "target": target,
+        "rounds_before": base.num_boosted_rounds(),
+        "rounds_after": booster.num_boosted_rounds(),
+        "train_rows": train_rows,
+        "train_seconds": seconds,
+        "valid_rmse_curve": history.get("valid", {}).get("rmse", []),
+        "baseline": baseline,
+        "candidate": candidate,
+        "improved": candidate.get("rmse", np.inf) <= baseline.get("rmse", np.inf),
+    }
+    return booster, report
+
+
+def _version_name() -> str:
+    name = time.strftime("%Y%m%d-%H%M%S")
+    while os.path.exists(os.path.join(MODEL_DIR, name)):
+        time.sleep(1)
+        name = time.strftime("%Y%m%d-%H%M%S")
+    return name
+
+
+def train(patterns, targets: dict = TARGET_COLUMNS, rounds: int = ROUNDS, params: dict | None = None,
+          chunk_rows: int = CHUNK_ROWS, promote_if_better: bool = False, log=print) -> dict:
+    paths = expand_paths(patterns)
+    first = next(iter_chunks(paths[0], detect_format(paths[0]), 1))[0]
+    names = [name for name in MODEL_FILES if targets.get(name) in first.columns]
+    if not names:
+        raise ValueError(f"Aucune colonne cible trouvée ({', '.join(targets.values())}).")
+    base_models = dict(zip(MODEL_FILES, get_models()))
+    version = _version_name()
+    out_dir = os.path.join(MODEL_DIR, version)
+    tmp_dir = out_dir + ".tmp"
+    os.makedirs(tmp_dir)
+    report = {
+        "version": version,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "base_version": model_version(),
+        "files": paths,
+        "params": {**PARAMS, **(params or {}), "rounds": rounds, "valid_every": VALID_EVERY},
+        "models": {},
+    }
+    try:
+        for name in MODEL_FILES:
+            if name in names:
+                booster, report["models"][name] = train_model(
+                    name, base_models[name], paths, targets[name], rounds, params, chunk_rows, log)
+                booster.save_model(os.path.join(tmp_dir, f"model_{name}.ubj"))
+            else:
+                # A target not present in the data: the served model is carried over.
+                base_models[name].get_booster().save_model(os.path.join(tmp_dir, f"model_{name}.ubj"))
+                report["models"][name] = {"target": targets.get(name), "retrained": False}
+        report["improved"] = all(r.get("improved", True) for r in report["models"].values())
+        with open(os.path.join(tmp_dir, "report.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1, ensure_ascii=False)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    os.replace(tmp_dir, out_dir)
+    if promote_if_better and report["improved"]:
+        promote(version)
+        report["promoted"] = True
+    return report
+
+
+def export(fmt: str = "ubj", promote_now: bool = False) -> str:
+    # Re-saves the served models (e.g. the shipped pickles) as a version of
+    # native boosters, which load without unpickling.
+    version = _version_name()
+    out_dir = os.path.join(MODEL_DIR, version)
+    tmp_dir = out_dir + ".tmp"
+    try:
+        export_native(tmp_dir, fmt)
+        report = {
+            "version": version,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "base_version": model_version(),
+            "exported": True,
+            "format": fmt,
+            "models": {name: {"retrained": False} for name in MODEL_FILES},
+        }
+        with open(os.path.join(tmp_dir, "report.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1, ensure_ascii=False)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    os.replace(tmp_dir, out_dir)
+    if promote_now:
+        promote(version)
+    return version
+
+
+def list_versions() -> list[dict]:
+    current = served_version()
+    versions = []
+    for name in sorted(os.listdir(MODEL_DIR)) if os.path.isdir(MODEL_DIR) else []:
+        path = os.path.join(MODEL_DIR, name, "report.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                report = json.load(f)
+            versions.append({"version": name, "current": name == current, **{
+                f"{m}_rmse": r.get("candidate", {}).get("rmse") for m, r in report["models"].items()
+            }, "improved": report.get("improved")})
+    return versions
+
+
+def promote(version: str | None) -> None:
+    # Points the app at `version` (None: back to the shipped pickles). Running
+    # servers pick it up on their next model access.
+    if version is None:
+        if os.path.exists(CURRENT_FILE):
+            os.remove(CURRENT_FILE)
+        return
+    for name in MODEL_FILES:
+        if not os.path.exists(version_file(version, name)):
+            raise FileNotFoundError(f"Version incomplète : {version}")
+    tmp = CURRENT_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(tmp, CURRENT_FILE)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Réentraînement des modèles d'encrassement et de TTC.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("train", help="Continuer l'entraînement sur de nouvelles données")
+    p.add_argument("inputs", nargs="+", help="Fichiers CSV/Parquet (motifs glob acceptés)")
+    p.add_argument("--rounds", type=int, default=ROUNDS)
+    p.add_argument("--eta", type=float, default=PARAMS["eta"])
+    p.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    p.add_argument("--fouling-col", default=TARGET_COLUMNS["fouling"])
+    p.add_argument("--ttc-col", default=TARGET_COLUMNS["ttc"])
+    p.add_argument("--promote", action="store_true", help="Promouvoir si la validation s'améliore")
+    sub.add_parser("list", help="Versions disponibles")
+    p = sub.add_parser("promote", help="Servir une version")
+    p.add_argument("version", help="Nom de version, ou 'shipped' pour les modèles d'origine")
+    p = sub.add_parser("export", help="Enregistrer les modèles servis au format natif xgboost")
+    p.add_argument("--format", choices=NATIVE_FORMATS, default=NATIVE_FORMATS[0])
+    p.add_argument("--promote", action="store_true", help="Servir la version exportée")
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        report = train(
+            args.inputs, {"fouling": args.fouling_col, "ttc": args.ttc_col}, args.rounds,
+            {"eta": args.eta}, args.chunk_rows, promote_if_better=args.promote,
+        )
+        for name, r in report["models"].items():
+            if "candidate" in r:
+                b, c = r["baseline"], r["candidate"]
+                print(f"{name:8s} RMSE {b['rmse']:.4f} -> {c['rmse']:.4f}   R² {b['r2']:.3f} -> {c['r2']:.3f}   "
+                      f"arbres {r['rounds_before']} -> {r['rounds_after']}")
+        print(f"Version {report['version']} "
+              f"({'promue' if report.get('promoted') else 'non promue'}) : {os.path.join(MODEL_DIR, report['version'])}")
+        return 0 if report["improved"] else 2
+    if args.command == "export":
+        version = export(args.format, args.promote)
+        print(f"Version {version} ({'promue' if args.promote else 'non promue'}) : {os.path.join(MODEL_DIR, version)}")
+        return 0
+    if args.command == "list":
+        for v in list_versions():
+            print(json.dumps(v, ensure_ascii=False))
+        return 0
+    promote(None if args.version == "shipped" else args.version)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
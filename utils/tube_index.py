@@ -0,0 +1,170 @@
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from itertools import product
+import numpy as np
+import ht
+from ht.hx import Ntubes_Perrys, shell_clearance, size_bundle_from_tubecount
+
+# Inverse tube-count index: for a layout (Do, pitch, angle, Ntp) and a
+# correlation, a monotone table D[N-1] = bundle diameter needed for N tubes,
+# N = 1..N_MAX. "Max tubes that fit in D" is then a binary search.
+#
+# Perry, HEDH and Phadkeb depend on the bundle only through D/Do at a fixed
+# pitch ratio, so their tables are stored once per (pitch/Do, angle, Ntp) in
+# units of Do and rescaled on lookup. VDI is dimensional and closed-form,
+# so it is evaluated directly. Tables live under INDEX_DIR/ht-<version>/ and
+# are rebuilt only when the ht version changes.
+#
+# The pitch ratio is rounded to RATIO_STEP (a 0.1 % change of the pitch),
+# so free-form pitch/Do pairs share tables; at most MAX_TABLES are kept in
+# memory. Building a table takes up to ~2 s and only blocks callers of the
+# same table.
+INDEX_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "tube_index")
+INDEX_DIR = os.path.join(INDEX_ROOT, f"ht-{ht.__version__}")
+METHODS = ("Perry", "HEDH", "Phadkeb", "VDI")
+N_MAX = 5000
+# Perry is a polynomial in D/Do; it is inverted on this D/Do grid.
+PERRY_GRID = np.arange(1.0, 200.0, 0.001)
+RATIO_STEP = 1e-3
+MAX_TABLES = 64
+
+_lock = threading.Lock()
+_unit_tables: OrderedDict[str, np.ndarray] = OrderedDict()
+_key_locks: dict[str, threading.Lock] = {}
+
+
+def _unit_key(method: str, ratio: float, angle: int, Ntp: int) -> str:
+    if method == "Perry":
+        # Perry's correlation has no pitch term.
+        return f"Perry_{angle}_{Ntp}"
+    return f"{method}_{ratio:.6f}_{angle}_{Ntp}"
+
+
+def _build_unit(method: str, ratio: float, angle: int, Ntp: int) -> np.ndarray:
+    N = np.arange(1, N_MAX + 1)
+    if method == "Perry":
+        # size_bundle_from_tubecount(Method="Perry") brackets far past the
+        # polynomial's increasing range and fails, so invert Ntubes_Perrys
+        # directly: smallest D/Do whose tube count reaches N.
+        counts = np.array([Ntubes_Perrys(x, 1.0, Ntp, angle) for x in PERRY_GRID], dtype=float)
+        peak = int(np.argmax(counts))
+        counts = np.maximum.accumulate(counts[:peak + 1])
+        idx = np.searchsorted(counts, N, side="left")
+        D = np.full(N_MAX, np.nan)
+        valid = idx <= peak
+        D[valid] = PERRY_GRID[idx[valid]]
+        return D
+    if method == "HEDH":
+        return size_bundle_from_tubecount(N, 1.0, ratio, Ntp, angle, Method="HEDH")
+    D = np.empty(N_MAX)
+    for i, n in enumerate(N):
+        D[i] = size_bundle_from_tubecount(int(n), 1.0, ratio, Ntp, angle, Method=method)
+    return D
+
+
+def _key_lock(key: str) -> threading.Lock:
+    with _lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def _cached(key: str) -> np.ndarray | None:
+    with _lock:
+        table = _unit_tables.get(key)
+        if table is not None:
+            _unit_tables.move_to_end(key)
+        return table
+
+
+def _unit_table(method: str, ratio: float, angle: int, Ntp: int) -> np.ndarray:
+    key = _unit_key(method, ratio, angle, Ntp)
+    table = _cached(key)
+    if table is not None:
+        return table
+    with _key_lock(key):
+        table = _cached(key)
+        if table is None:
+            path = os.path.join(INDEX_DIR, f"{key}.npy")
+            if os.path.exists(path):
+                table = np.load(path)
+            else:
+                table = _build_unit(method, ratio, angle, Ntp)
+                # Correlations may wobble; the index must be monotone for bisection.
+                finite = np.isfinite(table)
+                table[finite] = np.maximum.accumulate(table[finite])
+                _save(path, table)
+            with _lock:
+                _unit_tables[key] = table
+                while len(_unit_tables) > MAX_TABLES:
+                    _unit_tables.popitem(last=False)
+    return table
+
+
+def _save(path: str, table: np.ndarray) -> None:
+    try:
+        if not os.path.isdir(INDEX_DIR):
+            # A new ht version invalidates every table built with the old one.
+            if os.path.isdir(INDEX_ROOT):
+                for name in os.listdir(INDEX_ROOT):
+                    shutil.rmtree(os.path.join(INDEX_ROOT, name), ignore_errors=True)
+            os.makedirs(INDEX_DIR, exist_ok=True)
+        tmp = path + ".tmp.npy"
+        np.save(tmp, table)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def diameter_table(method: str, Do: float, pitch: float, angle: int, Ntp: int) -> np.ndarray:
+    if method == "VDI":
+        return size_bundle_from_tubecount(np.arange(1, N_MAX + 1), Do, pitch, Ntp, angle, Method="VDI")
+    ratio = round(round(pitch/Do/RATIO_STEP)*RATIO_STEP, 6)
+    return Do*_unit_table(method, ratio, angle, Ntp)
+
+
+def max_tubes(DBundle: float, Do: float, pitch: float, angle: int, Ntp: int, method: str) -> dict:
+    table = diameter_table(method, Do, pitch, angle, Ntp)
+    # Only the tail can be NaN (N beyond the correlation's range), and
+    # searchsorted orders NaN last, so the table stays sorted. The number of
+    # entries with D(N) <= DBundle is the largest N that fits.
+    N = int(np.searchsorted(table, DBundle, side="right"))
+    n_valid = int(np.isfinite(table).sum())
+    return {
+        "method": method,
+        "N": N,
+        "DBundle_N": float(table[N - 1]) if N else None,
+        "saturated": N >= n_valid,
+    }
+
+
+def max_tubes_in_shell(DShell: float, Do: float, pitch: float, angle: int, Ntp: int,
+                       methods=METHODS) -> list[dict]:
+    DBundle = DShell - shell_clearance(DShell=DShell)
+    results = []
+    for method in methods:
+        try:
+            r = max_tubes(DBundle, Do, pitch, angle, Ntp, method)
+        except ValueError as e:
+            r = {"method": method, "N": None, "DBundle_N": None, "saturated": False, "error": str(e)}
+        r["DBundle"] = DBundle
+        results.append(r)
+    return results
+
+
+def build_standard_index() -> int:
+    from utils.sweep import ANGLES, PASSES, PITCH_RATIOS
+    keys = [(m, r, a, n) for m, r, a, n in product(("Perry", "HEDH", "Phadkeb"), PITCH_RATIOS, ANGLES, PASSES)]
+    for method, ratio, angle, Ntp in keys:
+        try:
+            _unit_table(method, ratio, angle, Ntp)
+        except ValueError:
+            pass
+    return len(keys)
+
+
+if __name__ == "__main__":
+    import time
+    start = time.perf_counter()
+    n = build_standard_index()
+    print(f"{n} tables in {INDEX_DIR} ({time.perf_counter() - start:.1f} s)")
@@ -0,0 +1,159 @@
+import time
+import numpy as np
+from utils import effectiveness_np as enp
+
+# Monte Carlo propagation of input uncertainty through the P-NTU rating
+# (UA known, both inlet temperatures known -- the P_NTU_method path used by
+# the P-NTU tab). Samples are rated in batches with the array kernels of
+# utils.effectiveness_np, so one batch of 50 000 cases costs about as much as
+# a few scalar calls to ht.hx.P_NTU_method.
+UNCERTAIN_INPUTS = ["m1", "m2", "Cp1", "Cp2", "T1i", "T2i", "UA"]
+OUTPUTS = ["Q", "T1o", "T2o"]
+DISTRIBUTIONS = ["normal", "uniform", "triangular", "fixed"]
+# Spread per input: relative (fraction of the nominal value) for flows, heat
+# capacities and UA, absolute (°C) for temperatures. For "normal" the spread
+# is one standard deviation, for "uniform" and "triangular" the half-width.
+RELATIVE = {"m1", "m2", "Cp1", "Cp2", "UA"}
+DEFAULT_UNCERTAINTY = {
+    "m1": {"dist": "normal", "spread": 0.05},
+    "m2": {"dist": "normal", "spread": 0.05},
+    "Cp1": {"dist": "uniform", "spread": 0.05},
+    "Cp2": {"dist": "uniform", "spread": 0.05},
+    "T1i": {"dist": "normal", "spread": 1.0},
+    "T2i": {"dist": "normal", "spread": 1.0},
+    "UA": {"dist": "normal", "spread": 0.10},
+}
+PERCENTILES = (5, 50, 95)
+BATCH = 50_000
+MIN_SAMPLES = 100_000
+MAX_SAMPLES = 1_000_000
+# Converged when no band edge moved by more than RTOL of the 5-95 % width
+# between two checks, for STABLE_CHECKS checks in a row.
+RTOL = 0.005
+STABLE_CHECKS = 2
+HIST_BINS = 60
+
+
+def sample_inputs(p: dict, spec: dict, n: int, rng: np.random.Generator) -> dict:
+    samples = {}
+    for name in UNCERTAIN_INPUTS:
+        nominal = float(p[name])
+        s = spec.get(name, {"dist": "fixed"})
+        width = float(s.get("spread", 0.0))*(abs(nominal) if name in RELATIVE else 1.0)
+        dist = s.get("dist", "fixed")
+        if dist == "fixed" or width == 0.0:
+            x = np.full(n, nominal)
+        elif dist == "normal":
+            x = rng.normal(nominal, width, n)
+        elif dist == "uniform":
+            x = rng.uniform(nominal - width, nominal + width, n)
+        elif dist == "triangular":
+            x = rng.triangular(nominal - width, nominal, nominal + width, n)
+        else:
+            raise ValueError(f"Loi inconnue pour {name} : {dist}")
+        if name in RELATIVE:
+            # Flows, heat capacities and UA cannot go negative; a wide normal
+            # is truncated just above zero.
+            x = np.maximum(x, 1e-6*abs(nominal))
+        samples[name] = x
+    return samples
+
+
+def _kernel(subtype: str, Ntp: int, optimal: bool = True):
+    if subtype in ("counterflow", "parallel", "crossflow", "crossflow, mixed 1",
+                   "crossflow, mixed 2", "crossflow, mixed 1&2"):
+        return lambda R1, NTU1: enp.temperature_effectiveness_basic(R1, NTU1, subtype=subtype)
+    if subtype == "E":
+        return lambda R1, NTU1: enp.temperature_effectiveness_TEMA_E(R1, NTU1, Ntp=Ntp, optimal=optimal)
+    if subtype == "G":
+        return lambda R1, NTU1: enp.temperature_effectiveness_TEMA_G(R1, NTU1, Ntp=Ntp, optimal=optimal)
+    if subtype == "H":
+        return lambda R1, NTU1: enp.temperature_effectiveness_TEMA_H(R1, NTU1, Ntp=Ntp, optimal=optimal)
+    if subtype == "J":
+        return lambda R1, NTU1: enp.temperature_effectiveness_TEMA_J(R1, NTU1, Ntp=Ntp)
+    raise ValueError(f"Configuration non prise en charge : {subtype}")
+
+
+def rate_arrays(s: dict, subtype: str, Ntp: int) -> dict:
+    # Same relations as ht.hx.P_NTU_method with UA, T1i and T2i given.
+    C1 = s["m1"]*s["Cp1"]
+    C2 = s["m2"]*s["Cp2"]
+    R1 = C1/C2
+    NTU1 = s["UA"]/C1
+    P1 = np.asarray(_kernel(subtype, Ntp)(R1, NTU1), dtype=float)
+    dT = s["T1i"] - s["T2i"]
+    return {
+        "Q": np.abs(dT)*P1*C1,
+        "T1o": s["T1i"] - P1*dT,
+        "T2o": s["T2i"] + P1*R1*dT,
+    }
+
+
+def _bands(values: dict, n: int) -> dict:
+    return {k: np.percentile(v[:n], PERCENTILES) for k, v in values.items()}
+
+
+def _shift(new: dict, old: dict) -> float:
+    # Largest move of any band edge, relative to that output's 5-95 % width.
+    worst = 0.0
+    for k in new:
+        width = max(new[k][-1] - new[k][0], 1e-12*max(abs(new[k][1]), 1.0))
+        worst = max(worst, float(np.max(np.abs(new[k] - old[k])))/width)
+    return worst
+
+
+def run_monte_carlo(p: dict, spec: dict = DEFAULT_UNCERTAINTY, max_samples: int = MAX_SAMPLES,
+                    min_samples: int = MIN_SAMPLES, batch: int = BATCH, rtol: float = RTOL,
+                    seed: int | None = None, progress=None) -> dict:
+    rng = np.random.default_rng(seed)
+    kept = {k: np.empty(max_samples) for k in OUTPUTS}
+    n = drawn = stable = 0
+    bands = previous = None
+    history = []
+    converged = False
+    start = time.perf_counter()
+    while drawn < max_samples:
+        size = min(batch, max_samples - drawn)
+        out = rate_arrays(sample_inputs(p, spec, size, rng), p["subtype"], int(p["Ntp"]))
+        drawn += size
+        # Samples where the correlation breaks down are counted, not kept.
+        ok = np.logical_and.reduce([np.isfinite(v) for v in out.values()])
+        k = int(ok.sum())
+        for name in OUTPUTS:
+            kept[name][n:n + k] = out[name][ok]
+        n += k
+        if n == 0:
+            continue
+        bands = _bands(kept, n)
+        shift = _shift(bands, previous) if previous is not None else float("inf")
+        history.append({"samples": n, "shift": shift,
+                        **{f"{o}_p{q}": float(b) for o in OUTPUTS for q, b in zip(PERCENTILES, bands[o])}})
+        previous = bands
+        stable = stable + 1 if shift <= rtol else 0
+        if progress is not None:
+            progress(drawn/max_samples)
+        if n >= min_samples and stable >= STABLE_CHECKS:
+            converged = True
+            break
+    if n == 0:
+        raise ValueError("Aucun échantillon valide : vérifier les entrées et les lois.")
+    summary = {}
+    for name in OUTPUTS:
+        v = kept[name][:n]
+        counts, edges = np.histogram(v, bins=HIST_BINS)
+        summary[name] = {
+            **{f"p{q}": float(b) for q, b in zip(PERCENTILES, bands[name])},
+            "mean": float(v.mean()),
+            "std": float(v.std()),
+            "histogram": {"counts": counts.tolist(), "edges": edges.tolist()},
+        }
+    elapsed = time.perf_counter() - start
+    return {
+        "outputs": summary,
+        "samples": n,
+        "invalid": drawn - n,
+        "converged": converged,
+        "history": history,
+        "seconds": elapsed,
+        "samples_per_s": drawn/elapsed if elapsed > 0 else 0.0,
+    }